@@ -5,11 +5,22 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information see:
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Профиль ASGI (gunicorn с воркерами uvicorn, см. docker-compose.yml):
+асинхронные AJAX-представления не занимают поток на время запроса к БД.
+WhiteNoise в этом профиле отключен (settings.ASGI), статику отдает
+ASGIStaticFilesHandler или, при ASGI_SERVE_STATIC=0, nginx.
 """
 
 import os
-from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'abiturient_project.settings')
+os.environ['DJANGO_ASGI'] = '1'
+
+from django.conf import settings  # noqa: E402
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler  # noqa: E402
+from django.core.asgi import get_asgi_application  # noqa: E402
 
 application = get_asgi_application()
+if settings.ASGI_SERVE_STATIC:
+    application = ASGIStaticFilesHandler(application)
@@ -59,8 +59,16 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main_app.profiling.ProfilingMiddleware',
 ]
 
+# Профиль ASGI (asgi.py): WhiteNoise только синхронный, и из-за него Django переключал бы каждый
+# асинхронный запрос в поток — статику там отдает ASGIStaticFilesHandler (или nginx при ASGI_SERVE_STATIC=0)
+ASGI = os.environ.get('DJANGO_ASGI') == '1'
+ASGI_SERVE_STATIC = os.environ.get('ASGI_SERVE_STATIC', '1') == '1'
+if ASGI:
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'abiturient_project.urls'
 
 TEMPLATES = [
@@ -93,9 +101,58 @@ DATABASES = {
         'PORT': os.environ.get('DATABASE_PORT', '5432'),
         'OPTIONS': {
             'client_encoding': 'UTF8',
-        }
+        },
+        # Отчеты и экспорт читают строки через .iterator() — на PostgreSQL это серверные курсоры;
+        # отключать только за pgbouncer в режиме pool_mode=transaction
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True',
+    }
+}
+
+# Соединения с БД (профиль задается в .env, см. generate_env.py):
+# DB_POOL=True — пул psycopg 3 в каждом процессе (DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE соединений, ожидание
+# свободного — DB_POOL_TIMEOUT сек); обязателен для ASGI, где постоянные соединения не переиспользуются.
+# Без пула DB_CONN_MAX_AGE — сколько секунд держать соединение между запросами (0 — новое на каждый запрос),
+# DB_CONN_HEALTH_CHECKS — проверять его перед повторным использованием
+if os.environ.get('DB_POOL', 'False') == 'True':
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
     }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '0'))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+# Предел времени одного SQL-запроса в мс (0 — без предела): зависший отчет не держит соединение из пула
+DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT', '0'))
+if DB_STATEMENT_TIMEOUT:
+    DATABASES['default']['OPTIONS']['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT}'
+
+
+# --- 4а. КЭШ ---
+# Общий для всех процессов кэш (счетчики дашборда, подсказки, карточки, фрагменты страниц).
+# Блокировки и single-flight в приложении держатся на атомарном cache.add — его дают db и redis:
+# 'db' — таблица CACHE_LOCATION в основной БД (по умолчанию; создается миграцией 0015 или manage.py createcachetable),
+# 'redis' — CACHE_LOCATION вида redis://host:6379/1 (нужен пакет redis: pip install redis),
+# 'file' — каталог CACHE_LOCATION (.cache в проекте): add не атомарен, а каждая запись перебирает
+#          весь каталог при проверке MAX_ENTRIES — только для разработки на одной машине,
+# 'locmem' — память процесса, у каждого воркера свой кэш (только для разработки)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'db')
+CACHE_BACKENDS = {
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / '.cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'django_cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://localhost:6379/1'),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'abiturient'),
 }
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get('CACHE_LOCATION') or CACHE_BACKENDS[CACHE_BACKEND][1],
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'abiturient'),
+    }
+}
+if CACHE_BACKEND != 'redis':
+    # По умолчанию всего 300 записей — при переполнении удаляется треть кэша
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '20000'))}
 
 
 # --- 5. ПАРОЛИ И АВТОРИЗАЦИЯ ---
@@ -135,6 +192,15 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Ограничение размера данных (10 МБ)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760 
 
+# Сканы проверяются по ходу загрузки (размер и сигнатура, см. validators.UploadLimitHandler):
+# отброшенный файл дальше не попадает ни в память, ни во временный файл
+FILE_UPLOAD_HANDLERS = [
+    'validators.UploadLimitHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+UPLOAD_LIMITED_FIELDS = ['scan']
+
 
 # --- 8. НАСТРОЙКИ БЕЗОПАСНОСТИ ДЛЯ ПРОДАКШЕНА ---
 if not DEBUG:
@@ -162,4 +228,45 @@ if not DEBUG:
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Пагинация списков: 'offset' (номера страниц) или 'keyset' (по курсору)
+LIST_PAGINATION_MODE = os.environ.get('LIST_PAGINATION_MODE', 'offset')
+# Сколько секунд держать в кэше COUNT(*) для бейджа «Найдено: N»
+LIST_COUNT_CACHE_TIMEOUT = int(os.environ.get('LIST_COUNT_CACHE_TIMEOUT', '30'))
+# Время жизни закэшированных показателей дашборда (сбрасываются сигналами)
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', '300'))
+# Через сколько секунд задача отчета в статусе «Формируется» считается зависшей
+REPORT_JOB_TIMEOUT = int(os.environ.get('REPORT_JOB_TIMEOUT', '600'))
+# PDF-отчеты рендерятся кусками по REPORT_PDF_CHUNK_SIZE строк в REPORT_PDF_WORKERS процессах
+REPORT_PDF_CHUNK_SIZE = int(os.environ.get('REPORT_PDF_CHUNK_SIZE', '500'))
+REPORT_PDF_WORKERS = int(os.environ.get('REPORT_PDF_WORKERS', '0')) or None  # None = все ядра
+# Шаблон группы при массовом зачислении: {code} — код специальности, {year}/{yy} — год, {class} — класс
+ENROLLMENT_GROUP_PATTERN = os.environ.get('ENROLLMENT_GROUP_PATTERN', '{code}-{yy}{class}')
+# Доля запросов, которые замеряет ProfilingMiddleware (0 — выключено, 1 — все), и сколько последних замеров хранить на представление
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '1.0' if DEBUG else '0.05'))
+PROFILING_WINDOW = int(os.environ.get('PROFILING_WINDOW', '500'))
+# Подсказки поиска на дашборде: сколько секунд кэшировать набор кандидатов и сколько их брать на префикс
+TYPEAHEAD_CACHE_TIMEOUT = int(os.environ.get('TYPEAHEAD_CACHE_TIMEOUT', '30'))
+TYPEAHEAD_CANDIDATES = int(os.environ.get('TYPEAHEAD_CANDIDATES', '500'))
+# Время жизни снимка индекса автодополнения в кэше (обновляется сигналами, при промахе собирается из БД)
+AUTOCOMPLETE_CACHE_TIMEOUT = int(os.environ.get('AUTOCOMPLETE_CACHE_TIMEOUT', '86400'))
+# Время жизни кэшированной карточки абитуриента, секунды (сбрасывается сигналами при изменениях)
+STUDENT_CARD_CACHE_TIMEOUT = int(os.environ.get('STUDENT_CARD_CACHE_TIMEOUT', '600'))
+# Время жизни кэшированных фрагментов дашборда и списков, секунды (0 — не кэшировать; сбрасываются сигналами)
+FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', '300'))
+# Номера договоров: формат и сколько номеров процесс резервирует за раз (1 — без пропусков в нумерации)
+CONTRACT_NUMBER_FORMAT = os.environ.get('CONTRACT_NUMBER_FORMAT', '{series}-{year}-{number:04d}')
+CONTRACT_NUMBER_BATCH = int(os.environ.get('CONTRACT_NUMBER_BATCH', '10'))
+# Отдача сканов документов: '' — из Django, 'nginx' — X-Accel-Redirect на DOCUMENT_ACCEL_PREFIX, 'xsendfile' — X-Sendfile
+DOCUMENT_SENDFILE = os.environ.get('DOCUMENT_SENDFILE', '')
+DOCUMENT_ACCEL_PREFIX = os.environ.get('DOCUMENT_ACCEL_PREFIX', '/protected/')
+# Сколько секунд хранить файл скана, на который больше не ссылается ни один документ; размер превью, px
+DOCUMENT_GC_GRACE = int(os.environ.get('DOCUMENT_GC_GRACE', '3600'))
+THUMBNAIL_SIZE = int(os.environ.get('THUMBNAIL_SIZE', '320'))
+# Резервные копии (команды backup/restore): каталог, процессы выгрузки (0 — в одном процессе, пусто — по числу ядер),
+# строк на одно чтение из БД и строк в одной части таблицы
+BACKUP_ROOT = os.environ.get('BACKUP_ROOT', str(BASE_DIR / 'backups'))
+BACKUP_WORKERS = int(os.environ['BACKUP_WORKERS']) if os.environ.get('BACKUP_WORKERS') else None
+BACKUP_CHUNK_SIZE = int(os.environ.get('BACKUP_CHUNK_SIZE', '2000'))
+BACKUP_PART_ROWS = int(os.environ.get('BACKUP_PART_ROWS', '200000'))
@@ -1,5 +1,4 @@
 import subprocess
-import os
 from datetime import datetime
 
 def run_command(command, description):
@@ -13,19 +12,8 @@ def run_command(command, description):
         return False
 
 def create_backup():
-    print("\n--- 💾 Создание бэкапа базы данных ---")
-    if not os.path.exists('backups'):
-        os.makedirs('backups')
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = f"backups/db_backup_{timestamp}.json"
-    
-    try:
-        with open(backup_file, 'w', encoding='utf-8') as f:
-            subprocess.run(["python", "manage.py", "dumpdata", "--exclude", "auth.permission", "--exclude", "contenttypes"], stdout=f, check=True)
-        print(f"✅ Бэкап сохранен в: {backup_file}")
-    except Exception as e:
-        print(f"❌ Не удалось создать бэкап: {e}")
+    # Таблицы выгружаются параллельно в сжатый JSONL, медиафайлы — инкрементально (main_app/backup.py)
+    run_command(["backup"], "Создание бэкапа базы данных и медиафайлов")
 
 def main():
     print(f"🚀 Запуск полной проверки проекта: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -1,7 +1,8 @@
 import secrets
 import os
+import sys
 
-def generate_env():
+def generate_env(production=False):
     env_path = '.env'
     if os.path.exists(env_path):
         print("⚠️ Файл .env уже существует. Пропускаю генерацию.")
@@ -10,7 +11,7 @@ def generate_env():
     
     env_content = f"""# Настройки Django
 DJANGO_SECRET_KEY='{new_key}'
-DJANGO_DEBUG=True
+DJANGO_DEBUG={not production}
 DJANGO_ALLOWED_HOSTS=localhost,127.0.0.1
 
 # Настройки базы данных
@@ -19,6 +20,27 @@ DB_USER=postgres
 DB_PASSWORD=твои_пароль_здесь
 DATABASE_HOST=localhost
 DATABASE_PORT=5432
+
+# Соединения с БД. Для разработки хватает нового соединения на запрос (DB_CONN_MAX_AGE=0).
+# В продакшене — пул (DB_POOL=True, обязателен для ASGI) или постоянные соединения:
+# DB_POOL=False, DB_CONN_MAX_AGE=600 (с проверкой DB_CONN_HEALTH_CHECKS=True)
+DB_POOL={production}
+DB_POOL_MIN_SIZE=2
+DB_POOL_MAX_SIZE=10
+DB_POOL_TIMEOUT=10
+DB_CONN_MAX_AGE=0
+DB_CONN_HEALTH_CHECKS=True
+# Предел времени SQL-запроса, мс (0 — без предела); серверные курсоры отключать только за pgbouncer (transaction)
+DB_STATEMENT_TIMEOUT={30000 if production else 0}
+DB_DISABLE_SERVER_SIDE_CURSORS=False
+
+# Кэш: db (таблица в основной БД, создается миграцией 0015) или redis (CACHE_LOCATION=redis://host:6379/1,
+# нужен pip install redis) — у них атомарный add для блокировок; file (каталог .cache) и locmem —
+# только для разработки на одной машине
+CACHE_BACKEND=db
+CACHE_LOCATION=
+# Фрагменты дашборда и списков в кэше, сек (0 — не кэшировать)
+FRAGMENT_CACHE_TIMEOUT=300
 """
     
     with open(env_path, 'w', encoding='utf-8') as f:
@@ -28,4 +50,5 @@ DATABASE_PORT=5432
     print("📢 Теперь добавь его в .gitignore, чтобы не скомпрометировать секреты!")
 
 if __name__ == "__main__":
-    generate_env()
\ No newline at end of file
+    # python generate_env.py --production — профиль продакшена: DEBUG выключен, пул соединений с БД
+    generate_env(production='--production' in sys.argv)
\ No newline at end of file
@@ -1,8 +1,23 @@
+import uuid
+
+from django import forms
 from django.contrib import admin
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path
 from .models import (
     Abiturient, Roditel, Specialnost, Zdorovie,
-    AbiturientRoditel, Document, Dogovor,
+    AbiturientRoditel, Document, Dogovor, ReportJob, EnrollmentBatch, ContractCounter,
+    StoredFile,
 )
+from .importers import errors_as_csv, import_file
+
+# Полный отчет об ошибках импорта ждет скачивания в кэше (на странице — только первые IMPORT_ERRORS_SHOWN)
+IMPORT_ERRORS_SHOWN = 500
+IMPORT_ERRORS_KEY = 'import-errors:{}'
+IMPORT_ERRORS_TIMEOUT = 60 * 60
 
 
 class AbiturientRoditelInline(admin.TabularInline):
@@ -12,6 +27,17 @@ class AbiturientRoditelInline(admin.TabularInline):
     autocomplete_fields = ['roditel']
 
 
+class AbiturientImportForm(forms.Form):
+    file = forms.FileField(label='Файл CSV или XLSX')
+    dry_run = forms.BooleanField(label='Только проверить, не записывать', required=False)
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('Поддерживаются только файлы .csv и .xlsx')
+        return upload
+
+
 @admin.register(Abiturient)
 class AbiturientAdmin(admin.ModelAdmin):
     list_display = ('fio', 'date_of_birth', 'class_of_entry', 'phone', 'email', 'specialnost', 'is_guardianship')
@@ -22,6 +48,51 @@ class AbiturientAdmin(admin.ModelAdmin):
     inlines = [AbiturientRoditelInline]
     autocomplete_fields = ['specialnost']
     list_select_related = ('specialnost',)
+    change_list_template = 'admin/main_app/abiturient/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='main_app_abiturient_import'),
+            path('import/errors/<str:token>/', self.admin_site.admin_view(self.import_errors_view),
+                 name='main_app_abiturient_import_errors'),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """Загрузка CSV/XLSX с абитуриентами (см. importers.py)."""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        result = errors_token = None
+        form = AbiturientImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            result = import_file(upload.file, upload.name, dry_run=form.cleaned_data['dry_run'])
+            if result.errors:
+                errors_token = uuid.uuid4().hex
+                cache.set(IMPORT_ERRORS_KEY.format(errors_token), errors_as_csv(result), IMPORT_ERRORS_TIMEOUT)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Импорт абитуриентов',
+            'form': form,
+            'result': result,
+            'errors': result.errors[:IMPORT_ERRORS_SHOWN] if result else [],
+            'errors_shown': IMPORT_ERRORS_SHOWN,
+            'errors_token': errors_token,
+        }
+        return TemplateResponse(request, 'admin/main_app/abiturient/import.html', context)
+
+    def import_errors_view(self, request, token):
+        """Все ошибки последнего импорта одним CSV (importers.errors_as_csv)."""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        report = cache.get(IMPORT_ERRORS_KEY.format(token))
+        if report is None:
+            raise Http404('Отчет об ошибках устарел — загрузите файл еще раз')
+        # BOM — чтобы Excel открыл кириллицу без выбора кодировки
+        response = HttpResponse('\ufeff' + report, content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="import_errors.csv"'
+        return response
 
 
 @admin.register(Roditel)
@@ -76,4 +147,45 @@ class DogovorAdmin(admin.ModelAdmin):
     list_filter = ('payment_form', 'date_of_conclusion', 'maternity_capital', 'credit')
     list_per_page = 25
     autocomplete_fields = ['abiturient', 'roditel_zakazchik']
-    list_select_related = ('abiturient', 'roditel_zakazchik')
\ No newline at end of file
+    list_select_related = ('abiturient', 'roditel_zakazchik')
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'status', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('data_key', 'started_at', 'finished_at', 'error')
+    list_per_page = 25
+    list_select_related = ('created_by',)
+
+
+@admin.register(EnrollmentBatch)
+class EnrollmentBatchAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'enrollment_date', 'group_rule', 'enrolled_count', 'skipped_count', 'created_by')
+    list_filter = ('group_rule', 'enrollment_date')
+    readonly_fields = [field.name for field in EnrollmentBatch._meta.fields]
+    list_per_page = 25
+    list_select_related = ('created_by',)
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ContractCounter)
+class ContractCounterAdmin(admin.ModelAdmin):
+    list_display = ('series', 'year', 'last_number')
+    list_filter = ('year',)
+    search_fields = ('series',)
+    list_per_page = 25
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refcount', 'thumbnail_status', 'updated_at')
+    list_filter = ('thumbnail_status',)
+    search_fields = ('name',)
+    readonly_fields = ('name', 'size', 'refcount', 'thumbnail', 'created_at', 'updated_at')
+    list_per_page = 25
+
+    def has_add_permission(self, request):
+        return False
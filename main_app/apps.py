@@ -4,3 +4,6 @@ class MainAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main_app'
     verbose_name = 'Основное приложение'  
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,272 @@
+# main_app/autocomplete.py
+"""
+Индекс для автодополнения (DAL): абитуриенты, родители, специальности.
+
+Вместо ORDER BY fio + icontains на каждое нажатие клавиши представления
+ищут по индексу в памяти процесса: строки отсортированы по
+нормализованному имени, а все слова имен лежат в отдельном отсортированном
+массиве, поэтому поиск по началу слова — это bisect. Каждое слово запроса
+должно быть началом какого-нибудь слова имени («иван петр» найдет
+«Петров Иван»).
+
+Снимок строк {pk: (нормализованное имя, подпись)} хранится в кэше под
+номером версии и общий для всех воркеров. Рядом с номером версии лежит
+короткий журнал изменений: сигналы (signals.py) дописывают в него по одной
+записи, а процессы применяют новые записи к своему индексу на месте — без
+перечитывания снимка и пересортировки. Когда журнал дорастает до
+MAX_CHANGES, версия сбрасывается и снимок один раз собирается из БД
+заново. Массовые операции вызывают invalidate().
+
+Новая версия записывается в кэш до чтения БД, поэтому правка,
+зафиксированная во время чтения, попадет в ее журнал, а не потеряется.
+invalidate() не удаляет версию, а запоминает момент сброса: версия,
+созданная раньше него, считается недействительной, даже если ее успел
+записать обратно параллельный update_entry().
+"""
+import re
+import time
+from bisect import bisect_left, insort
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .utils import normalize_search_text
+
+KEY_PREFIX = 'autocomplete:'
+LOCK_TIMEOUT = 10
+MAX_CHANGES = 200
+_WORDS = re.compile(r'\w+')
+
+
+def _abiturient_rows():
+    from .models import Abiturient
+    return ((pk, fio) for pk, fio in Abiturient.objects.values_list('pk', 'fio').iterator(chunk_size=5000))
+
+
+def _roditel_rows():
+    from .models import Roditel
+    return ((pk, fio) for pk, fio in Roditel.objects.values_list('pk', 'fio').iterator(chunk_size=5000))
+
+
+def specialnost_label(code, name):
+    return f"{code if code else 'Без кода'} - {name}"
+
+
+def _specialnost_rows():
+    from .models import Specialnost
+    return ((pk, specialnost_label(code, name))
+            for pk, code, name in Specialnost.objects.values_list('pk', 'code', 'name'))
+
+
+# Источник строк (pk, подпись) для каждого индекса; подпись совпадает с __str__ модели
+SOURCES = {
+    'abiturient': _abiturient_rows,
+    'roditel': _roditel_rows,
+    'specialnost': _specialnost_rows,
+}
+
+
+def _timeout():
+    return getattr(settings, 'AUTOCOMPLETE_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def _version_key(kind):
+    return f"{KEY_PREFIX}{kind}:version"
+
+
+def _reset_key(kind):
+    return f"{KEY_PREFIX}{kind}:reset"
+
+
+def _data_key(kind, version):
+    return f"{KEY_PREFIX}{kind}:{version}"
+
+
+class Entry:
+    """Результат автодополнения: DAL берет pk и str()."""
+    __slots__ = ('pk', 'label')
+
+    def __init__(self, pk, label):
+        self.pk = pk
+        self.label = label
+
+    def __str__(self):
+        return self.label
+
+
+class Matches(Sequence):
+    """Найденные строки в порядке имени; Entry создаются только для выводимой страницы."""
+
+    def __init__(self, index, rows):
+        self.index = index
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self.index.entry(row) for row in self.rows[item]]
+        return self.index.entry(self.rows[item])
+
+
+def _row_words(name, pk):
+    return [(word, name, pk) for word in set(_WORDS.findall(name))]
+
+
+class AutocompleteIndex:
+    def __init__(self, snapshot):
+        # snapshot: {pk: (нормализованное имя, подпись)}; строки индекса — (имя, pk)
+        self.labels = dict(snapshot)
+        self.rows = sorted((name, pk) for pk, (name, _label) in snapshot.items())
+        self.words = sorted(word for pk, (name, _label) in snapshot.items() for word in _row_words(name, pk))
+
+    def entry(self, row):
+        _name, pk = row
+        return Entry(pk, self.labels[pk][1])
+
+    def put(self, pk, label):
+        """Добавление или переименование строки на месте (insort в отсортированные массивы)."""
+        self.remove(pk)
+        name = normalize_search_text(label)
+        self.labels[pk] = (name, label)
+        insort(self.rows, (name, pk))
+        for word in _row_words(name, pk):
+            insort(self.words, word)
+
+    def remove(self, pk):
+        old = self.labels.pop(pk, None)
+        if old is None:
+            return
+        name = old[0]
+        del self.rows[bisect_left(self.rows, (name, pk))]
+        for word in _row_words(name, pk):
+            del self.words[bisect_left(self.words, word)]
+
+    def _rows_for_prefix(self, prefix):
+        rows = set()
+        for i in range(bisect_left(self.words, (prefix,)), len(self.words)):
+            word, name, pk = self.words[i]
+            if not word.startswith(prefix):
+                break
+            rows.add((name, pk))
+        return rows
+
+    def search(self, q, pks=None):
+        """Строки, у которых каждое слово запроса — начало одного из слов имени."""
+        words = _WORDS.findall(normalize_search_text(q))
+        # Ограничение по pk (родители одного абитуриента) — это несколько строк, с них и начинаем
+        allowed = None if pks is None else {(self.labels[pk][0], pk) for pk in pks if pk in self.labels}
+        if not words:
+            return Matches(self, self.rows if allowed is None else sorted(allowed))
+        # Начинаем с самого длинного слова — у него меньше всего совпадений
+        words.sort(key=len, reverse=True)
+        found = self._rows_for_prefix(words[0])
+        if allowed is not None:
+            found &= allowed
+        for word in words[1:]:
+            if not found:
+                break
+            found &= self._rows_for_prefix(word)
+        return Matches(self, sorted(found))
+
+
+class LocalIndex:
+    """Индекс в памяти процесса: версия снимка и сколько записей журнала уже применено."""
+
+    def __init__(self, version, snapshot):
+        self.version = version
+        self.applied = 0
+        self.index = AutocompleteIndex(snapshot)
+
+    def apply(self, changes):
+        for pk, label in changes[self.applied:]:
+            if label is None:
+                self.index.remove(pk)
+            else:
+                self.index.put(pk, label)
+        self.applied = len(changes)
+
+
+_local = {}  # kind -> LocalIndex этого процесса
+
+
+def _build_snapshot(kind):
+    return {pk: (normalize_search_text(label), label) for pk, label in SOURCES[kind]()}
+
+
+def _state(kind):
+    """(версия, журнал изменений) из кэша или None, если версии нет или она сброшена."""
+    found = cache.get_many([_version_key(kind), _reset_key(kind)])
+    state, reset = found.get(_version_key(kind)), found.get(_reset_key(kind))
+    if state is None or (reset is not None and state[0] <= reset):
+        return None
+    return state
+
+
+def _new_version(kind):
+    # Версия всегда новее последнего сброса, даже если часы воркеров немного расходятся
+    reset = cache.get(_reset_key(kind)) or 0
+    return max(time.time_ns(), reset + 1)
+
+
+def get_index(kind):
+    """Индекс текущей версии: из памяти процесса, из кэша или (при промахе) из БД."""
+    state = _state(kind)
+    local = _local.get(kind)
+    if state is not None and local is not None and local.version == state[0]:
+        local.apply(state[1])
+        return local.index
+
+    snapshot = cache.get(_data_key(kind, state[0])) if state is not None else None
+    if snapshot is None:
+        # Сначала версия, потом БД: правки, зафиксированные во время чтения, попадут в журнал этой версии
+        state = (_new_version(kind), [])
+        cache.set(_version_key(kind), state, _timeout())
+        snapshot = _build_snapshot(kind)
+        cache.set(_data_key(kind, state[0]), snapshot, _timeout())
+    local = LocalIndex(state[0], snapshot)
+    local.apply(state[1])
+    _local[kind] = local
+    return local.index
+
+
+def search(kind, q, pks=None):
+    return get_index(kind).search(q, pks)
+
+
+def invalidate(*kinds):
+    """Сброс снимков: следующий запрос соберет индекс из БД."""
+    kinds = kinds or tuple(SOURCES)
+    now = time.time_ns()
+    # Момент сброса хранится без срока: иначе истекший сброс снова оживил бы старую версию
+    cache.set_many({_reset_key(kind): now for kind in kinds}, None)
+    states = cache.get_many([_version_key(kind) for kind in kinds])
+    cache.delete_many([
+        _data_key(kind, states[_version_key(kind)][0]) for kind in kinds if _version_key(kind) in states
+    ])
+
+
+def update_entry(kind, pk, label=None):
+    """
+    Запись об изменении одной строки в журнал текущей версии (label=None —
+    удаление). Если версии нет, делать нечего: ее создаст следующий запрос
+    уже после нашей фиксации. Если журнал меняет другой процесс или журнал
+    переполнен — сбрасываем версию целиком.
+    """
+    lock = f"{KEY_PREFIX}{kind}:lock"
+    if not cache.add(lock, 1, LOCK_TIMEOUT):
+        invalidate(kind)
+        return
+    try:
+        state = _state(kind)
+        if state is None:
+            return
+        version, changes = state
+        if len(changes) >= MAX_CHANGES:
+            invalidate(kind)
+            return
+        cache.set(_version_key(kind), (version, [*changes, (pk, label)]), _timeout())
+    finally:
+        cache.delete(lock)
@@ -0,0 +1,420 @@
+# main_app/backup.py
+"""
+Резервные копии базы и медиафайлов (команды backup и restore).
+
+Каждая таблица (для больших — диапазоны первичных ключей) выгружается
+отдельным процессом: строки читаются итератором по BACKUP_CHUNK_SIZE и
+пишутся в tables/<app.model>.<часть>.jsonl.gz — одна строка JSON-массивом
+значений колонок, без создания моделей. На PostgreSQL все процессы читают
+один снимок данных (pg_export_snapshot), поэтому копия соответствует одному
+моменту времени; на других СУБД это не гарантируется (manifest.consistent).
+
+Медиафайлы копируются в общее для всех копий хранилище по SHA-256
+(<BACKUP_ROOT>/media-store): уже сохраненное содержимое повторно не
+копируется, а хэш не пересчитывается для файлов, у которых размер и время
+изменения совпадают с предыдущей копией.
+
+manifest.json пишется последним: в нем порядок таблиц (родители раньше
+детей), колонки, файлы частей с хэшами, примененные миграции и список
+медиафайлов. restore_backup() в одной транзакции очищает таблицы, загружает
+их через bulk_create пачками, сбрасывает последовательности и затем
+возвращает медиафайлы.
+"""
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.utils import timezone
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+MEDIA_STORE = 'media-store'
+EXCLUDED_MODELS = {'sessions.session'}
+COMPRESS_LEVEL = 5
+# Колонки, значения которых после JSON нужно вернуть к типу поля
+CONVERTED_FIELDS = (
+    models.DateField, models.TimeField, models.DecimalField, models.UUIDField, models.DurationField,
+)
+
+
+class BackupError(Exception):
+    """Копия повреждена или не подходит к текущей схеме базы."""
+
+
+def backup_root():
+    return getattr(settings, 'BACKUP_ROOT', os.path.join(settings.BASE_DIR, 'backups'))
+
+
+def chunk_size():
+    return getattr(settings, 'BACKUP_CHUNK_SIZE', 2000)
+
+
+def part_rows():
+    return getattr(settings, 'BACKUP_PART_ROWS', 200000)
+
+
+def default_workers():
+    return getattr(settings, 'BACKUP_WORKERS', None) or os.cpu_count() or 1
+
+
+def backup_models():
+    """Модели в порядке загрузки: те, на кого ссылаются, раньше ссылающихся."""
+    candidates = {
+        model._meta.label_lower: model
+        for model in apps.get_models(include_auto_created=True)
+        if model._meta.managed and not model._meta.proxy and not model._meta.swapped
+        and model._meta.label_lower not in EXCLUDED_MODELS
+    }
+    deps = {
+        label: {
+            field.related_model._meta.label_lower
+            for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model is not model
+            and field.related_model._meta.label_lower in candidates
+        }
+        for label, model in candidates.items()
+    }
+    ordered, done = [], set()
+    while len(done) < len(candidates):
+        ready = sorted(label for label in candidates if label not in done and deps[label] <= done)
+        if not ready:  # цикл внешних ключей: ограничения отложенные, порядок не важен
+            ready = sorted(label for label in candidates if label not in done)
+        for label in ready:
+            ordered.append(candidates[label])
+            done.add(label)
+    return ordered
+
+
+def columns(model):
+    # Вычисляемые СУБД колонки (GeneratedField) не выгружаются: их нельзя вставить
+    return [field.attname for field in model._meta.concrete_fields if not getattr(field, 'generated', False)]
+
+
+def applied_migrations():
+    return sorted(
+        [app, name] for app, name in MigrationRecorder(connection).applied_migrations()
+    )
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# -----------------------------
+# Выгрузка таблиц
+# -----------------------------
+def _init_worker():
+    import django
+    django.setup()
+
+
+def dump_part(task):
+    """Одна часть таблицы в jsonl.gz; выполняется в дочернем процессе (или в текущем при workers=0)."""
+    label, pk_range, path, snapshot, rows_per_chunk = task
+    model = apps.get_model(label)
+    queryset = model._base_manager.order_by('pk').values_list(*columns(model))
+    if pk_range is not None:
+        queryset = queryset.filter(pk__gte=pk_range[0], pk__lte=pk_range[1])
+    rows = 0
+    with transaction.atomic():
+        if snapshot:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cursor.execute("SET TRANSACTION SNAPSHOT %s", [snapshot])
+        with gzip.open(path, 'wt', encoding='utf-8', compresslevel=COMPRESS_LEVEL) as out:
+            for row in queryset.iterator(chunk_size=rows_per_chunk):
+                out.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+                out.write('\n')
+                rows += 1
+    return rows
+
+
+def plan_parts(model, target):
+    """Задания выгрузки таблицы: одно на таблицу или по диапазонам целых первичных ключей."""
+    label = model._meta.label_lower
+    stats = model._base_manager.order_by().aggregate(
+        n=models.Count('pk'), low=models.Min('pk'), high=models.Max('pk'),
+    )
+    limit = part_rows()
+    if stats['n'] <= limit or not isinstance(stats['low'], int):
+        return [(label, None, os.path.join(target, f"{label}.0.jsonl.gz"))]
+    parts = -(-stats['n'] // limit)
+    step = -(-(stats['high'] - stats['low'] + 1) // parts)
+    return [
+        (label, (low, low + step - 1), os.path.join(target, f"{label}.{i}.jsonl.gz"))
+        for i, low in enumerate(range(stats['low'], stats['high'] + 1, step))
+    ]
+
+
+# -----------------------------
+# Медиафайлы
+# -----------------------------
+def previous_manifest(root, exclude=None):
+    """Манифест последней завершенной копии в root (для инкрементального хэширования медиа)."""
+    if not os.path.isdir(root):
+        return None
+    for name in sorted(os.listdir(root), reverse=True):
+        path = os.path.join(root, name, MANIFEST)
+        if name != exclude and os.path.isfile(path):
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+    return None
+
+
+def _store_path(store, sha):
+    return os.path.join(store, sha[:2], sha)
+
+
+def snapshot_media(media_root, store, previous=None):
+    """Копирует новые медиафайлы в хранилище по хэшу; возвращает {путь: [sha, размер, mtime_ns]} и число скопированных."""
+    known = (previous or {}).get('media', {}).get('files', {})
+    files, copied = {}, 0
+    skip = os.path.abspath(os.path.dirname(store))  # каталог копий внутри MEDIA_ROOT не копируем
+    for directory, dirnames, filenames in os.walk(media_root):
+        if os.path.abspath(directory) == skip or os.path.abspath(directory).startswith(skip + os.sep):
+            dirnames[:] = []
+            continue
+        dirnames[:] = [d for d in dirnames if d != 'tmp']  # недописанные загрузки (filestore)
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            rel = os.path.relpath(path, media_root).replace(os.sep, '/')
+            stat = os.stat(path)
+            old = known.get(rel)
+            if old and old[1] == stat.st_size and old[2] == stat.st_mtime_ns:
+                sha = old[0]
+            else:
+                sha = sha256_file(path)
+            blob = _store_path(store, sha)
+            if not os.path.exists(blob):
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(blob))
+                os.close(fd)
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, blob)
+                copied += 1
+            files[rel] = [sha, stat.st_size, stat.st_mtime_ns]
+    return files, copied
+
+
+def restore_media(manifest, store, media_root):
+    """Возвращает медиафайлы из хранилища; совпадающие по размеру и хэшу не трогает."""
+    restored = 0
+    for rel, (sha, size, mtime_ns) in manifest.get('media', {}).get('files', {}).items():
+        target = os.path.join(media_root, *rel.split('/'))
+        if os.path.exists(target) and os.path.getsize(target) == size and sha256_file(target) == sha:
+            continue
+        blob = _store_path(store, sha)
+        if not os.path.exists(blob):
+            raise BackupError(f"В хранилище нет файла {rel} ({sha})")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(blob, target)
+        os.utime(target, ns=(mtime_ns, mtime_ns))
+        restored += 1
+    return restored
+
+
+# -----------------------------
+# Копия целиком
+# -----------------------------
+def _dump_tables(tasks, workers, media_step):
+    """Выгружает части таблиц (в процессах, если workers); пока они идут, выполняется media_step()."""
+    if not workers:
+        counts = [dump_part(task) for task in tasks]
+        return counts, media_step()
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(tasks)),
+        mp_context=multiprocessing.get_context('spawn'),  # не наследовать открытые соединения с БД
+        initializer=_init_worker,
+    ) as pool:
+        futures = [pool.submit(dump_part, task) for task in tasks]
+        media_result = media_step()
+        return [future.result() for future in futures], media_result
+
+
+def _write_backup(root, target, started, workers, media):
+    consistent = connection.vendor == 'postgresql'
+    tables_dir = os.path.join(target, 'tables')
+    previous = previous_manifest(root, os.path.basename(target))
+
+    def media_step():
+        if not media:
+            return {}, 0
+        return snapshot_media(settings.MEDIA_ROOT, os.path.join(root, MEDIA_STORE), previous)
+
+    # Транзакция с экспортированным снимком открыта, пока процессы выгрузки его читают
+    with transaction.atomic():
+        snapshot = None
+        if consistent:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cursor.execute("SELECT pg_export_snapshot()")
+                snapshot = cursor.fetchone()[0]
+        ordered = backup_models()
+        tasks = [
+            (label, pk_range, path, snapshot, chunk_size())
+            for model in ordered
+            for label, pk_range, path in plan_parts(model, tables_dir)
+        ]
+        migrations = applied_migrations()
+        counts, (media_files, copied) = _dump_tables(tasks, workers, media_step)
+
+    rows = dict(zip((task[2] for task in tasks), counts))
+    manifest = {
+        'format': FORMAT_VERSION,
+        'created_at': started.isoformat(),
+        'database': connection.vendor,
+        'consistent': consistent,
+        'migrations': migrations,
+        'tables': [
+            {
+                'model': model._meta.label_lower,
+                'columns': columns(model),
+                'files': [
+                    {'path': os.path.relpath(path, target).replace(os.sep, '/'), 'rows': rows[path],
+                     'sha256': sha256_file(path)}
+                    for label, _range, path, _snapshot, _chunk in tasks if label == model._meta.label_lower
+                ],
+            }
+            for model in ordered
+        ],
+        'media': {'store': MEDIA_STORE, 'files': media_files, 'copied': copied},
+    }
+    tmp = os.path.join(target, MANIFEST + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, os.path.join(target, MANIFEST))
+    return manifest
+
+
+def create_backup(root=None, workers=None, media=True, log=None):
+    """Создает копию в <root>/<ГГГГММДД_ЧЧММСС>/ и возвращает путь к ней."""
+    log = log or (lambda message: None)
+    root = root or backup_root()
+    workers = default_workers() if workers is None else workers
+    started = timezone.now()
+    target = os.path.join(root, started.strftime('%Y%m%d_%H%M%S'))
+    suffix = 1
+    while os.path.exists(target):  # две копии в одну секунду
+        target = os.path.join(root, started.strftime('%Y%m%d_%H%M%S') + f'_{suffix}')
+        suffix += 1
+    os.makedirs(os.path.join(target, 'tables'))
+    try:
+        manifest = _write_backup(root, target, started, workers, media)
+    except BaseException:
+        shutil.rmtree(target, ignore_errors=True)  # недописанная копия не должна стать «предыдущей»
+        raise
+    tables = manifest['tables']
+    log(f"Таблиц: {len(tables)}, частей: {sum(len(t['files']) for t in tables)}, "
+        f"процессов: {workers or 'нет (в этом процессе)'}")
+    log(f"Строк: {sum(f['rows'] for t in tables for f in t['files'])}, "
+        f"медиафайлов: {len(manifest['media']['files'])} (новых в хранилище: {manifest['media']['copied']})")
+    return target
+
+
+@contextmanager
+def _keep_timestamps(models_list):
+    """bulk_create вызывает pre_save: auto_now/auto_now_add на время загрузки выключены, иначе даты станут «сейчас»."""
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in models_list for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _auto_now, _auto_now_add in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _converters(model, names):
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    return [
+        fields[name].to_python if isinstance(fields[name], CONVERTED_FIELDS) else None
+        for name in names
+    ]
+
+
+def _read_rows(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def restore_backup(path, media=True, batch_size=1000, force=False, log=None):
+    """Заменяет содержимое таблиц (и медиафайлы) данными копии; возвращает число строк."""
+    log = log or (lambda message: None)
+    with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT_VERSION:
+        raise BackupError(f"Неизвестный формат копии: {manifest.get('format')}")
+    if not force and manifest['migrations'] != applied_migrations():
+        raise BackupError("Миграции базы не совпадают с копией (restore --force, чтобы загрузить все равно)")
+
+    tables = []
+    for table in manifest['tables']:
+        try:
+            model = apps.get_model(table['model'])
+        except LookupError:
+            raise BackupError(f"Модели {table['model']} нет в проекте")
+        for file in table['files']:
+            if sha256_file(os.path.join(path, file['path'])) != file['sha256']:
+                raise BackupError(f"Файл {file['path']} поврежден")
+        tables.append((model, table))
+
+    total = 0
+    with transaction.atomic(), _keep_timestamps([model for model, _table in tables]):
+        connection.ops.execute_sql_flush(connection.ops.sql_flush(
+            no_style(), [model._meta.db_table for model, _table in tables], allow_cascade=False,
+        ))
+        for model, table in tables:
+            names = table['columns']
+            converters = _converters(model, names)
+            batch = []
+            for file in table['files']:
+                for row in _read_rows(os.path.join(path, file['path'])):
+                    values = {
+                        name: convert(value) if convert and value is not None else value
+                        for name, convert, value in zip(names, converters, row)
+                    }
+                    batch.append(model(**values))
+                    if len(batch) >= batch_size:
+                        model._base_manager.bulk_create(batch)
+                        total += len(batch)
+                        batch = []
+            if batch:
+                model._base_manager.bulk_create(batch)
+                total += len(batch)
+            log(f"{table['model']}: {sum(file['rows'] for file in table['files'])}")
+        sequences = connection.ops.sequence_reset_sql(no_style(), [model for model, _table in tables])
+        if sequences:
+            with connection.cursor() as cursor:
+                for sql in sequences:
+                    cursor.execute(sql)
+        # bulk_create не шлет сигналов — все кэши (счетчики, карточки, индексы) собираются заново
+        transaction.on_commit(cache.clear)
+
+    from django.contrib.contenttypes.models import ContentType
+    ContentType.objects.clear_cache()
+    if media and manifest.get('media', {}).get('files'):
+        store = os.path.join(os.path.dirname(os.path.abspath(path)), manifest['media']['store'])
+        log(f"Медиафайлов восстановлено: {restore_media(manifest, store, settings.MEDIA_ROOT)}")
+    return total
@@ -0,0 +1,489 @@
+# main_app/benchmarks.py
+"""
+Сценарии нагрузочных замеров для команды `manage.py benchmark`.
+
+Каждый сценарий регистрируется декоратором @scenario, получает число
+повторов и опции команды и возвращает словарь
+{название варианта: список времен в секундах}. Данные для замеров
+готовятся заранее командой `manage.py seed_demo`.
+"""
+import time
+import tracemalloc
+
+from django.db.models import Q
+
+SCENARIOS = {}
+
+
+def scenario(name, description):
+    """Регистрация сценария замера."""
+    def decorator(func):
+        SCENARIOS[name] = (description, func)
+        return func
+    return decorator
+
+
+def measure(func, repeat):
+    """Выполняет func repeat раз и возвращает список времен (сек)."""
+    timings = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        func(i)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def peak_memory_mb(func):
+    """Пиковое потребление памяти Python-объектами при вызове func (МБ)."""
+    tracemalloc.start()
+    try:
+        func(0)
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(timings):
+    """Сводка по замерам в миллисекундах."""
+    return {
+        'runs': len(timings),
+        'p50': percentile(timings, 50) * 1000,
+        'p95': percentile(timings, 95) * 1000,
+        'max': max(timings) * 1000 if timings else 0.0,
+    }
+
+
+# -----------------------------
+# Поиск на дашборде
+# -----------------------------
+SEARCH_QUERIES = ['иван', 'Петров', 'соловьев', 'Фёдоров Артём', '916', 'SEED-1', 'алексеевич', 'смир']
+
+
+@scenario('search', 'Поиск search_students: icontains против нормализованных колонок + pg_trgm')
+def search_scenario(repeat, **options):
+    from .models import Abiturient, Dogovor
+    from .search import search_all
+
+    def legacy(i):
+        q = SEARCH_QUERIES[i % len(SEARCH_QUERIES)]
+        list(Abiturient.objects.filter(Q(fio__icontains=q) | Q(phone__icontains=q)).exclude(status='expelled')[:5])
+        list(Dogovor.objects.filter(Q(number__icontains=q) | Q(abiturient__fio__icontains=q))
+             .select_related('abiturient')[:5])
+
+    def indexed(i):
+        search_all(SEARCH_QUERIES[i % len(SEARCH_QUERIES)])
+
+    return {
+        'icontains (старый путь)': measure(legacy, repeat),
+        'search_all (индекс)': measure(indexed, repeat),
+    }
+
+
+# -----------------------------
+# Подсказки при наборе (typeahead)
+# -----------------------------
+TYPED_SURNAMES = ['Смирнова', 'Кузнецов', 'Соловьев', 'Попова']
+
+
+@scenario('typeahead', 'Набор фамилии по буквам: search_all на каждую букву против кэша префиксов')
+def typeahead_scenario(repeat, **options):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from . import typeahead
+    from .search import search_all
+
+    def keystrokes(i):
+        word = TYPED_SURNAMES[i % len(TYPED_SURNAMES)]
+        return [word[:length] for length in range(typeahead.MIN_LENGTH, len(word) + 1)]
+
+    def per_keystroke(i):
+        for q in keystrokes(i):
+            search_all(q)
+
+    def cached(i):
+        typeahead.invalidate()
+        for q in keystrokes(i):
+            typeahead.search(q)
+
+    cache.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        cached(0)
+    return {
+        'search_all на каждую букву': measure(per_keystroke, repeat),
+        f"typeahead ({len(ctx.captured_queries)} SQL на слово)": measure(cached, repeat),
+    }
+
+
+# -----------------------------
+# Автодополнение (DAL)
+# -----------------------------
+@scenario('autocomplete', 'Автодополнение абитуриентов: ORDER BY fio + icontains против индекса в памяти')
+def autocomplete_scenario(repeat, **options):
+    from . import autocomplete
+    from .models import Abiturient
+
+    def legacy(i):
+        q = SEARCH_QUERIES[i % len(SEARCH_QUERIES)]
+        list(Abiturient.objects.filter(fio__icontains=q).order_by('fio')[:10])
+
+    def indexed(i):
+        autocomplete.search('abiturient', SEARCH_QUERIES[i % len(SEARCH_QUERIES)])[:10]
+
+    autocomplete.invalidate('abiturient')
+    started = time.perf_counter()
+    autocomplete.get_index('abiturient')
+    build = (time.perf_counter() - started) * 1000
+    return {
+        'icontains (старый путь)': measure(legacy, repeat),
+        f"индекс (сборка {build:.0f} мс)": measure(indexed, repeat),
+    }
+
+
+# -----------------------------
+# Выгрузка договоров в Excel
+# -----------------------------
+@scenario('excel_export', 'Выгрузка договоров: pandas DataFrame против openpyxl write-only')
+def excel_export_scenario(repeat, **options):
+    import tempfile
+
+    from .models import Dogovor
+    from .reports import DOGOVOR_EXPORT_HEADERS, dogovor_export_rows, write_xlsx
+
+    def streaming(i):
+        with tempfile.TemporaryFile() as tmp:
+            write_xlsx(tmp, DOGOVOR_EXPORT_HEADERS, dogovor_export_rows(), 'Договоры')
+
+    variants = {'openpyxl write-only': streaming}
+
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+    if pd is not None:
+        def legacy(i):
+            data = []
+            for d in Dogovor.objects.select_related('abiturient', 'roditel_zakazchik').all():
+                data.append({
+                    'Номер договора': d.number,
+                    'Дата заключения': d.date_of_conclusion,
+                    'Абитуриент': d.abiturient.fio if d.abiturient else '',
+                    'Форма оплаты': d.get_payment_form_display(),
+                    'Материнский капитал': 'Да' if d.maternity_capital else 'Нет',
+                    'Кредит': 'Да' if d.credit else 'Нет',
+                    'Родитель-заказчик': d.roditel_zakazchik.fio if d.roditel_zakazchik else '',
+                })
+            with tempfile.TemporaryFile() as tmp:
+                pd.DataFrame(data).to_excel(tmp, index=False, sheet_name='Договоры')
+        variants = {'pandas (старый путь)': legacy, **variants}
+
+    results = {}
+    for label, func in variants.items():
+        peak = peak_memory_mb(func)
+        results[f"{label}, пик {peak:.1f} МБ"] = measure(func, repeat)
+    return results
+
+
+# -----------------------------
+# PDF-отчет по абитуриентам
+# -----------------------------
+PDF_SIZES = (1000, 10000, 50000)
+
+
+def _fake_report_context(rows):
+    """Контекст отчета без БД: n «абитуриентов» в памяти."""
+    from datetime import date
+    from types import SimpleNamespace
+
+    from django.utils import timezone
+
+    spec = SimpleNamespace(name='Информационные системы и программирование')
+    abiturients = [
+        SimpleNamespace(fio=f'Иванов Иван {i}', date_of_birth=date(2008, 1, 1),
+                        class_of_entry='9', specialnost=spec, phone='+7 (900) 000-00-00')
+        for i in range(rows)
+    ]
+    return {
+        'abiturients': abiturients, 'total_count': rows,
+        'by_class': {'9': rows, '11': 0}, 'generated_date': timezone.now(),
+    }
+
+
+@scenario('pdf_report', 'PDF-отчет: один pisaDocument против кусков в ProcessPoolExecutor (--sizes)')
+def pdf_report_scenario(repeat, sizes=None, **options):
+    from django.conf import settings
+    from django.template.loader import get_template
+
+    from . import pdf_engine
+
+    template = get_template('main_app/reports/abiturient_report.html')
+    chunk_size = getattr(settings, 'REPORT_PDF_CHUNK_SIZE', 500)
+    repeat = min(repeat, 3)
+    results = {}
+    for rows in sizes or PDF_SIZES:
+        context = _fake_report_context(rows)
+
+        def single(i):
+            pdf_engine.html_to_pdf_bytes(template.render(context))
+
+        def chunked(i):
+            chunks = list(pdf_engine.chunked(context['abiturients'], chunk_size))
+            pdf_engine.render_chunks(
+                template.render({**context, 'abiturients': chunk,
+                                 'continuation': n > 0, 'more_chunks': n < len(chunks) - 1})
+                for n, chunk in enumerate(chunks)
+            )
+
+        results[f"{rows} строк: один поток"] = measure(single, repeat)
+        results[f"{rows} строк: {pdf_engine.default_workers()} процесс(ов)"] = measure(chunked, repeat)
+    return results
+
+
+# -----------------------------
+# Массовый импорт абитуриентов
+# -----------------------------
+IMPORT_SIZES = (1000, 10000)
+
+
+def make_import_csv(rows):
+    """CSV для импорта: у каждой пары абитуриентов общая мать (проверка дедупликации)."""
+    import csv
+    import io
+
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['fio', 'date_of_birth', 'class_of_entry', 'phone', 'address', 'email',
+                     'mother_fio', 'mother_phone', 'father_fio', 'father_phone', 'health_diseases'])
+    for i in range(rows):
+        writer.writerow([
+            f'Импортов Иван {i}', '01.02.2008', '9', f'+7 900 {i:07d}', 'г. Москва', f'imp{i}@example.com',
+            f'Импортова Мария {i // 2}', f'+7 901 {i // 2:07d}', f'Импортов Петр {i}', f'+7 902 {i:07d}', '',
+        ])
+    return out.getvalue().encode('utf-8')
+
+
+@scenario('import', 'Импорт абитуриентов из CSV: строк в секунду (--sizes)')
+def import_scenario(repeat, sizes=None, **options):
+    import io
+
+    from django.db import transaction
+
+    from .importers import import_file
+
+    results = {}
+    for rows in sizes or IMPORT_SIZES:
+        data = make_import_csv(rows)
+        speeds = []
+
+        def run(i):
+            # Все записанное откатывается, чтобы повторы шли на одинаковых данных
+            with transaction.atomic():
+                result = import_file(io.BytesIO(data), 'bench.csv')
+                transaction.set_rollback(True)
+            speeds.append(result.rows_per_second)
+
+        timings = measure(run, min(repeat, 3))
+        results[f"{rows} строк, ~{sum(speeds) / len(speeds):.0f} строк/сек"] = timings
+    return results
+
+
+# -----------------------------
+# Резервная копия
+# -----------------------------
+@scenario('backup', 'Бэкап базы: dumpdata (checkup.py раньше) против backup (JSONL.gz по таблицам в процессах)')
+def backup_scenario(repeat, **options):
+    import os
+    import shutil
+    import tempfile
+
+    from django.core.management import call_command
+
+    from . import backup
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        dump_path = os.path.join(tmp, 'dump.json')
+
+        def dumpdata(i):
+            with open(dump_path, 'w', encoding='utf-8') as out:
+                call_command('dumpdata', exclude=['auth.permission', 'contenttypes'], stdout=out)
+
+        def run_backup(workers):
+            def run(i):
+                path = backup.create_backup(tmp, workers=workers, media=False)
+                run.size = sum(os.path.getsize(os.path.join(d, f)) for d, _dirs, files in os.walk(path) for f in files)
+                shutil.rmtree(path)
+            return run
+
+        timings = measure(dumpdata, min(repeat, 3))
+        results[f"dumpdata, {os.path.getsize(dump_path) / 2**20:.1f} МБ, "
+                f"{peak_memory_mb(dumpdata):.0f} МБ памяти"] = timings
+
+        for workers in (0, backup.default_workers()):
+            run = run_backup(workers)
+            timings = measure(run, min(repeat, 3))
+            memory = f", {peak_memory_mb(run):.0f} МБ памяти" if not workers else ''
+            results[f"backup, процессов {workers}, {run.size / 2**20:.1f} МБ{memory}"] = timings
+    return results
+
+
+# -----------------------------
+# Загрузка дампа
+# -----------------------------
+@scenario('fastload', 'Загрузка дампа dumpdata: loaddata против fastload (потоковый разбор + bulk_create)')
+def fastload_scenario(repeat, **options):
+    import os
+    import tempfile
+
+    from django.core.management import call_command
+    from django.db import transaction
+
+    from .fastload import load
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dump.json')
+        call_command('dumpdata', 'main_app.specialnost', 'main_app.abiturient', 'main_app.dogovor', output=path)
+        size = os.path.getsize(path) / 2**20
+
+        def loaddata(i):
+            # Загруженное откатывается, чтобы повторы шли на одинаковых данных
+            with transaction.atomic():
+                call_command('loaddata', path, verbosity=0)
+                transaction.set_rollback(True)
+
+        def fastload(i):
+            with transaction.atomic():
+                load([path])
+                transaction.set_rollback(True)
+
+        for label, func in (('loaddata', loaddata), ('fastload', fastload)):
+            timings = measure(func, min(repeat, 3))
+            results[f"{label}, {size:.1f} МБ, {peak_memory_mb(func):.0f} МБ памяти"] = timings
+    return results
+
+
+# -----------------------------
+# Соединения с БД
+# -----------------------------
+@scenario('connections', 'AJAX-запросы: новое соединение с БД на запрос против постоянных соединений и пула')
+def connections_scenario(repeat, **options):
+    from django.contrib.auth.models import User
+    from django.db import close_old_connections, connection
+    from django.test import Client
+    from django.urls import reverse
+
+    from .models import Abiturient
+
+    user = User.objects.filter(is_staff=True, is_active=True).first()
+    if user is None:
+        return {'нет сотрудника (manage.py createsuperuser)': []}
+    abit_id = Abiturient.objects.values_list('pk', flat=True).first() or 0
+    urls = [reverse('get_news'), reverse('abit_info_ajax', args=[abit_id])]
+    client = Client()
+    client.force_login(user)
+
+    def request(i):
+        client.get(urls[i % len(urls)])
+        close_old_connections()  # то, что сервер делает по окончании запроса (тестовый клиент — нет)
+
+    profiles = [('CONN_MAX_AGE=0', {'CONN_MAX_AGE': 0}, False),
+                ('CONN_MAX_AGE=600 + health checks', {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}, False)]
+    if connection.vendor == 'postgresql' and hasattr(connection, 'pool'):
+        profiles.append(('пул psycopg', {'CONN_MAX_AGE': 0}, True))
+
+    saved = {key: connection.settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+    saved_pool = connection.settings_dict['OPTIONS'].get('pool')
+    results = {}
+    try:
+        for label, values, pool in profiles:
+            connection.close()
+            connection.settings_dict.update(values)
+            connection.settings_dict['OPTIONS'].pop('pool', None)
+            if pool:
+                connection.settings_dict['OPTIONS']['pool'] = True
+            timings = measure(request, repeat)
+            results[f"{label}, {len(timings) / sum(timings):.0f} запр/сек"] = timings
+            if pool:
+                connection.close_pool()
+    finally:
+        connection.close()
+        connection.settings_dict.update(saved)
+        connection.settings_dict['OPTIONS'].pop('pool', None)
+        if saved_pool:
+            connection.settings_dict['OPTIONS']['pool'] = saved_pool
+        client.logout()
+    return results
+
+
+@scenario('fragments', 'Дашборд и списки: сборка страницы на каждый запрос против фрагментов из кэша')
+def fragments_scenario(repeat, **options):
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    user = User.objects.filter(is_staff=True, is_active=True).first()
+    if user is None:
+        return {'нет сотрудника (manage.py createsuperuser)': []}
+    client = Client()
+    client.force_login(user)
+    # Листание первых 20 страниц: повторные запросы те же, что у сотрудников в течение дня
+    pages = [(reverse('dashboard'), {})] + [
+        (reverse(name), {'page': page}) for name in ('abiturient_list', 'dogovor_list') for page in range(1, 21)
+    ]
+
+    def request(i):
+        url, params = pages[i % len(pages)]
+        client.get(url, params)
+
+    results = {}
+    try:
+        for label, timeout in (('без кэша фрагментов', 0), ('фрагменты из кэша', 300)):
+            cache.clear()
+            with override_settings(FRAGMENT_CACHE_TIMEOUT=timeout):
+                results[label] = measure(request, repeat)
+    finally:
+        client.logout()
+    return results
+
+
+@scenario('news', 'Заметка дашборда: чтение из БД на запрос против кэша и 304 по ETag')
+def news_scenario(repeat, **options):
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.test import Client
+    from django.urls import reverse
+
+    from . import news
+
+    user = User.objects.filter(is_staff=True, is_active=True).first()
+    if user is None:
+        return {'нет сотрудника (manage.py createsuperuser)': []}
+    client = Client()
+    client.force_login(user)
+    url = reverse('get_news')
+
+    def uncached(i):
+        cache.delete(news.KEY)
+        client.get(url)
+
+    etag = client.get(url)['ETag']
+    try:
+        return {
+            'из БД (промах кэша)': measure(uncached, repeat),
+            'из кэша, 200': measure(lambda i: client.get(url), repeat),
+            'If-None-Match, 304': measure(lambda i: client.get(url, HTTP_IF_NONE_MATCH=etag), repeat),
+        }
+    finally:
+        client.logout()
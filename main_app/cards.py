@@ -0,0 +1,106 @@
+# main_app/cards.py
+"""
+Карточка абитуриента для страницы abiturient_detail.
+
+Карточка собирается одним планом запросов (абитуриент со специальностью и
+здоровьем через JOIN, родители, документы и договоры — prefetch) в
+обычный словарь и кэшируется под ключом «card:v<CARD_VERSION>:<id>».
+При любом изменении абитуриента, его родителей, здоровья, документов или
+договоров сигналы (signals.py) удаляют карточку после фиксации транзакции.
+При изменении структуры карточки нужно увеличить CARD_VERSION.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.urls import reverse
+
+from .models import Abiturient, AbiturientRoditel, StoredFile
+
+CARD_VERSION = 2
+
+
+def _timeout():
+    return getattr(settings, 'STUDENT_CARD_CACHE_TIMEOUT', 600)
+
+
+def card_key(pk):
+    return f"card:v{CARD_VERSION}:{pk}"
+
+
+def card_queryset():
+    return Abiturient.objects.select_related('specialnost', 'health_info').prefetch_related(
+        Prefetch('abiturientroditel_set', queryset=AbiturientRoditel.objects.select_related('roditel').order_by('pk')),
+        'documents',
+        'dogovors',
+    )
+
+
+def build_card(abiturient):
+    """Все, что выводит abiturient_detail.html, в виде словаря (без ленивых обращений к БД)."""
+    health = getattr(abiturient, 'health_info', None)
+    documents = list(abiturient.documents.all())
+    scans = [doc.scan.name for doc in documents if doc.scan]
+    # Превью сканов: отдельный запрос, только если сканы есть (карточка все равно кэшируется)
+    thumbnails = set(
+        StoredFile.objects.filter(name__in=scans, thumbnail_status='done').values_list('name', flat=True)
+    ) if scans else set()
+    return {
+        'id': abiturient.pk,
+        'fio': abiturient.fio,
+        'status': abiturient.status,
+        'status_display': abiturient.get_status_display(),
+        'enrollment_date': abiturient.enrollment_date,
+        'student_group': abiturient.student_group,
+        'date_of_birth': abiturient.date_of_birth,
+        'class_display': abiturient.get_class_of_entry_display(),
+        'specialnost': str(abiturient.specialnost) if abiturient.specialnost else '',
+        'phone': abiturient.phone,
+        'email': abiturient.email,
+        'is_guardianship': abiturient.is_guardianship,
+        'address': abiturient.address,
+        'hobby': abiturient.hobby,
+        'health': {
+            'diseases': health.diseases,
+            'disability': health.disability,
+            'restrictions': health.restrictions,
+            'additional_info': health.additional_info,
+        } if health else None,
+        'parents': [
+            {'fio': link.roditel.fio, 'relation_type': link.relation_type}
+            for link in abiturient.abiturientroditel_set.all()
+        ],
+        'documents': [
+            {
+                'type_display': doc.get_type_display(),
+                'scan_url': reverse('document_scan', args=[doc.pk]) if doc.scan else '',
+                'thumbnail_url': reverse('document_thumbnail', args=[doc.pk]) if doc.scan.name in thumbnails else '',
+            }
+            for doc in documents
+        ],
+        'dogovors': [
+            {'pk': d.pk, 'number': d.number, 'date_of_conclusion': d.date_of_conclusion}
+            for d in abiturient.dogovors.all()
+        ],
+    }
+
+
+def get_card(pk):
+    """Карточка из кэша или из БД; None, если абитуриента нет."""
+    key = card_key(pk)
+    card = cache.get(key)
+    if card is None:
+        abiturient = card_queryset().filter(pk=pk).first()
+        if abiturient is None:
+            return None
+        card = build_card(abiturient)
+        cache.set(key, card, _timeout())
+    return card
+
+
+def invalidate(*pks):
+    cache.delete_many([card_key(pk) for pk in pks if pk])
+
+
+def invalidate_where(**lookup):
+    """Сброс карточек абитуриентов под условие (например, всех детей родителя)."""
+    invalidate(*Abiturient.objects.filter(**lookup).values_list('pk', flat=True))
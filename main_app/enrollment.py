@@ -0,0 +1,151 @@
+# main_app/enrollment.py
+"""
+Массовое зачисление абитуриентов в студенты.
+
+Отбор — по специальности и/или классу поступления либо по списку id.
+Все отобранные записи переводятся одним UPDATE ... WHERE status='abiturient'
+(меняются только status, enrollment_date и student_group), а операция
+записывается в журнал EnrollmentBatch. Сигналы post_save при update() не
+отправляются, поэтому счетчики дашборда, версия данных, кэш подсказок
+поиска, карточки абитуриентов и сводная таблица отчетов обновляются здесь.
+"""
+from collections import Counter
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, CharField, F, Q, Value, When
+from django.utils import timezone
+
+from . import cards, fragments, reporting, stats, typeahead
+from .models import Abiturient, DataVersion, EnrollmentBatch
+
+GROUP_KEEP = 'keep'
+GROUP_FIXED = 'fixed'
+GROUP_PATTERN = 'pattern'
+GROUP_RULES = [
+    (GROUP_KEEP, 'Не менять группу'),
+    (GROUP_FIXED, 'Одна группа для всех'),
+    (GROUP_PATTERN, 'По шаблону'),
+]
+# Подстановки шаблона: {code} — код специальности, {year}/{yy} — год зачисления, {class} — класс поступления
+DEFAULT_GROUP_PATTERN = '{code}-{yy}{class}'
+
+
+class EnrollmentError(ValueError):
+    """Некорректное условие отбора или правило назначения группы."""
+
+
+def group_pattern():
+    return getattr(settings, 'ENROLLMENT_GROUP_PATTERN', DEFAULT_GROUP_PATTERN)
+
+
+def format_group(pattern, code, class_of_entry, enrollment_date):
+    try:
+        return pattern.format(
+            code=code or '',
+            year=enrollment_date.year,
+            yy=f"{enrollment_date.year % 100:02d}",
+            **{'class': class_of_entry or ''},
+        )[:50]
+    except (KeyError, IndexError, ValueError) as e:
+        raise EnrollmentError(f"Некорректный шаблон группы «{pattern}»: {e}")
+
+
+def criteria_queryset(criteria):
+    """Абитуриенты под условие отбора (без учета статуса)."""
+    condition = Q()
+    if criteria.get('ids'):
+        condition &= Q(pk__in=criteria['ids'])
+    if criteria.get('specialnost'):
+        condition &= Q(specialnost_id=criteria['specialnost'])
+    if criteria.get('class_of_entry'):
+        condition &= Q(class_of_entry=criteria['class_of_entry'])
+    if not condition:
+        raise EnrollmentError("Не задано условие отбора: специальность, класс или список id")
+    return Abiturient.objects.filter(condition)
+
+
+def _group_expression(rule, value, rows, enrollment_date):
+    """Значение student_group для UPDATE и группы по каждой записи (для итогов)."""
+    if rule == GROUP_KEEP:
+        return F('student_group'), {pk: group for pk, _s, _c, _cls, group in rows}
+    if rule == GROUP_FIXED:
+        if not value:
+            raise EnrollmentError("Не указана группа")
+        return Value(value[:50]), {pk: value[:50] for pk, *_rest in rows}
+    if rule == GROUP_PATTERN:
+        pattern = value or group_pattern()
+        groups, whens, seen = {}, [], {}
+        for pk, spec_id, code, class_of_entry, _group in rows:
+            key = (spec_id, class_of_entry)
+            if key not in seen:
+                seen[key] = format_group(pattern, code, class_of_entry, enrollment_date)
+                spec_q = Q(specialnost__isnull=True) if spec_id is None else Q(specialnost_id=spec_id)
+                whens.append(When(spec_q & Q(class_of_entry=class_of_entry), then=Value(seen[key])))
+            groups[pk] = seen[key]
+        if not whens:
+            return F('student_group'), groups
+        return Case(*whens, default=F('student_group'), output_field=CharField()), groups
+    raise EnrollmentError(f"Неизвестное правило назначения группы: {rule}")
+
+
+def enroll(criteria, rule=GROUP_KEEP, group_value='', enrollment_date=None, user=None, dry_run=False):
+    """
+    Зачисление всех абитуриентов под условие одним UPDATE.
+
+    Возвращает итог: {'enrolled', 'skipped', 'groups', 'batch'} — batch
+    (запись журнала) равен None при dry_run.
+    """
+    enrollment_date = enrollment_date or timezone.now().date()
+    base = criteria_queryset(criteria)
+
+    with transaction.atomic():
+        # Блокируем отобранные строки, чтобы итог и журнал совпали с тем, что реально обновлено
+        rows = list(
+            base.select_for_update(of=('self',))
+            .order_by('pk')
+            .values_list('pk', 'status', 'specialnost_id', 'specialnost__code', 'class_of_entry', 'student_group',
+                         'enrollment_date')
+        )
+        candidates = [(pk, spec_id, code, cls, group)
+                      for pk, status, spec_id, code, cls, group, _date in rows if status == 'abiturient']
+        expression, groups = _group_expression(rule, group_value, candidates, enrollment_date)
+
+        requested = len(set(criteria['ids'])) if criteria.get('ids') else len(rows)
+        summary = {
+            'enrolled': len(candidates),
+            'skipped': requested - len(candidates),
+            'groups': dict(Counter(group for group in groups.values())),
+            'batch': None,
+        }
+        if dry_run or not candidates:
+            return summary
+
+        enrolled = base.filter(status='abiturient').update(
+            status='student', enrollment_date=enrollment_date, student_group=expression,
+        )
+        summary['enrolled'] = enrolled
+        summary['skipped'] = requested - enrolled
+        summary['batch'] = EnrollmentBatch.objects.create(
+            created_by=user,
+            enrollment_date=enrollment_date,
+            criteria={key: value for key, value in criteria.items() if value},
+            group_rule=rule,
+            group_value=group_value or (group_pattern() if rule == GROUP_PATTERN else ''),
+            enrolled_count=enrolled,
+            skipped_count=summary['skipped'],
+            abiturient_ids=[pk for pk, *_rest in candidates],
+        )
+        deltas = Counter()
+        for _pk, status, spec_id, _code, _cls, _group, old_date in rows:
+            if status == 'abiturient':
+                deltas[reporting.abiturient_key(spec_id, status, old_date)] -= 1
+                deltas[reporting.abiturient_key(spec_id, 'student', enrollment_date)] += 1
+        reporting.apply(deltas)
+        transaction.on_commit(partial(stats.invalidate, stats.STUDENT_COUNT, stats.RECENT_STUDENTS))
+        transaction.on_commit(partial(DataVersion.bump, 'abiturients'))
+        transaction.on_commit(typeahead.invalidate)
+        transaction.on_commit(fragments.invalidate)
+        transaction.on_commit(partial(cards.invalidate, *(pk for pk, *_rest in candidates)))
+    return summary
@@ -0,0 +1,259 @@
+# main_app/fastload.py
+"""
+Быстрая загрузка дампов dumpdata (команда fastload) — замена loaddata для
+больших файлов вроде data.json.
+
+Файл читается кусками по CHUNK_SIZE, и объекты из JSON-массива разбираются
+по одному (JSONDecoder.raw_decode), поэтому весь дамп в памяти не держится.
+Поддерживаются .json, .jsonl (dumpdata --format jsonl) и их сжатые
+варианты .gz/.bz2/.xz. Объекты превращаются в модели тем же
+десериализатором, что и у loaddata (внешние ключи, натуральные ключи,
+преобразование типов), и копятся по моделям: полная пачка пишется одним
+bulk_create, остатки — в конце в порядке зависимостей (см.
+backup.backup_models).
+
+Натуральный внешний ключ (dumpdata --natural-foreign) десериализатор
+ищет в БД сразу, поэтому перед разбором объекта, который ссылается так на
+другую модель, недописанная пачка этой модели сбрасывается в БД. Как и в
+dumpdata, объекты, на которые ссылаются, должны идти в файле раньше.
+
+Как и loaddata, запись заменяет строки с тем же первичным ключом
+(update_conflicts). Проверка внешних ключей откладывается до конца
+загрузки (constraint_checks_disabled + check_constraints на SQLite,
+отложенные ограничения на PostgreSQL), после чего сбрасываются
+последовательности первичных ключей. Сигналы не отправляются, поэтому
+поисковые колонки абитуриентов заполняются здесь, сводная таблица
+пересчитывается, а кэши очищаются после фиксации.
+"""
+import bz2
+import gzip
+import json
+import lzma
+import os
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.core import serializers
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from . import backup, filestore, reporting
+from .models import DataVersion, Document
+
+CHUNK_SIZE = 256 * 1024
+OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+WHITESPACE = ' \t\r\n'
+
+
+class FastloadError(Exception):
+    """Файл не является дампом dumpdata."""
+
+
+class LoadResult:
+    """Итог загрузки: объектов по моделям и время."""
+
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.elapsed = 0.0
+
+    @property
+    def objects(self):
+        return sum(self.counts.values())
+
+    @property
+    def objects_per_second(self):
+        return self.objects / self.elapsed if self.elapsed else 0.0
+
+
+# -----------------------------
+# Потоковый разбор
+# -----------------------------
+def iter_json_array(stream, chunk_size=CHUNK_SIZE):
+    """Элементы JSON-массива из текстового потока по одному, не читая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof, opened = '', 0, False, False
+    while True:
+        while pos < len(buffer) and (buffer[pos] in WHITESPACE or (opened and buffer[pos] == ',')):
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                raise FastloadError("Файл оборвался: нет закрывающей «]»")
+            buffer, pos = stream.read(chunk_size), 0
+            eof = not buffer
+            continue
+        if not opened:
+            if buffer[pos] != '[':
+                raise FastloadError("Ожидался JSON-массив объектов (формат dumpdata)")
+            opened, pos = True, pos + 1
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            obj, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Объект не поместился в буфер — дочитываем
+            chunk = stream.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+        yield obj
+
+
+def iter_jsonl(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def open_dump(path):
+    """Текстовый поток дампа и признак JSONL по расширению (с учетом сжатия)."""
+    base, ext = os.path.splitext(path)
+    opener = OPENERS.get(ext.lower())
+    if opener:
+        ext = os.path.splitext(base)[1]
+        stream = opener(path, 'rt', encoding='utf-8')
+    else:
+        stream = open(path, encoding='utf-8')
+    return stream, ext.lower() == '.jsonl'
+
+
+def iter_dump(path):
+    stream, jsonl = open_dump(path)
+    with stream:
+        yield from (iter_jsonl(stream) if jsonl else iter_json_array(stream))
+
+
+# -----------------------------
+# Запись
+# -----------------------------
+class FastLoader:
+    """Пачки объектов по моделям: bulk_create с заменой строк по первичному ключу."""
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.pending = defaultdict(list)
+        self.m2m = defaultdict(list)
+        self.result = LoadResult()
+        self.scans = set()
+        self.relations = {}
+
+    def relation_fields(self, label):
+        """{поле: (связанная модель, многие-ко-многим)} для связей модели из дампа."""
+        if label not in self.relations:
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError):
+                model = None  # ошибку покажет десериализатор
+            self.relations[label] = {
+                field.name: (field.remote_field.model, field.many_to_many)
+                for field in (model._meta.get_fields() if model else ())
+                if field.concrete and field.is_relation
+            }
+        return self.relations[label]
+
+    def with_references_flushed(self, items):
+        """
+        Словари дампа для десериализатора; перед каждым пишутся пачки моделей,
+        на которые он ссылается натуральными ключами (их ищут в БД при разборе).
+        """
+        for item in items:
+            relations = self.relation_fields(str(item.get('model', '')).lower())
+            for name, value in item.get('fields', {}).items():
+                related, many = relations.get(name, (None, False))
+                if related is None or not self.pending.get(related):
+                    continue
+                # Натуральный ключ — список значений; у многие-ко-многим — список таких списков
+                if any(isinstance(v, list) for v in (value or () if many else [value])):
+                    self.flush(related)
+            yield item
+
+    def add(self, deserialized):
+        obj = deserialized.object
+        model = type(obj)
+        if hasattr(obj, 'fill_search_fields'):
+            obj.fill_search_fields()  # обычно это делает save()
+        if isinstance(obj, Document) and obj.scan:
+            self.scans.add(obj.scan.name)
+        self.pending[model].append(obj)
+        if deserialized.m2m_data:
+            self.m2m[model].append((obj.pk, deserialized.m2m_data))
+        if len(self.pending[model]) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model):
+        objs, self.pending[model] = self.pending[model], []
+        if not objs:
+            return
+        meta = model._meta
+        fields = [f.name for f in meta.concrete_fields if not f.primary_key and not getattr(f, 'generated', False)]
+        if fields:
+            model._base_manager.bulk_create(
+                objs, update_conflicts=True, unique_fields=[meta.pk.name], update_fields=fields,
+            )
+        else:
+            model._base_manager.bulk_create(objs, ignore_conflicts=True)
+        self.result.counts[meta.label_lower] += len(objs)
+        self.flush_m2m(model)
+
+    def flush_m2m(self, model):
+        """Связи многие-ко-многим загруженных объектов заменяются, как при loaddata."""
+        rows, self.m2m[model] = self.m2m[model], []
+        for name in {name for _pk, data in rows for name in data}:
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source = field.m2m_field_name() + '_id'
+            target = field.m2m_reverse_field_name() + '_id'
+            pks = [pk for pk, data in rows if name in data]
+            through._base_manager.filter(**{f'{source}__in': pks}).delete()
+            through._base_manager.bulk_create(
+                [through(**{source: pk, target: value}) for pk, data in rows for value in data.get(name, ())],
+                batch_size=self.batch_size, ignore_conflicts=True,
+            )
+
+    def finish(self):
+        order = {model: i for i, model in enumerate(backup.backup_models())}
+        for model in sorted(self.pending, key=lambda m: order.get(m, len(order))):
+            self.flush(model)
+
+
+def load(paths, batch_size=1000, ignorenonexistent=False):
+    """Загружает дампы в одной транзакции; возвращает LoadResult."""
+    loader = FastLoader(batch_size)
+    started = time.perf_counter()
+    with transaction.atomic():
+        with connection.constraint_checks_disabled():
+            for path in paths:
+                objects = serializers.deserialize(
+                    'python', loader.with_references_flushed(iter_dump(path)), ignorenonexistent=ignorenonexistent,
+                )
+                for deserialized in objects:
+                    loader.add(deserialized)
+            loader.finish()
+        models = [apps.get_model(label) for label in loader.result.counts]
+        # Отложенная проверка ссылок — как в loaddata
+        connection.check_constraints(table_names=[model._meta.db_table for model in models])
+        sequences = connection.ops.sequence_reset_sql(no_style(), models)
+        if sequences:
+            with connection.cursor() as cursor:
+                for sql in sequences:
+                    cursor.execute(sql)
+        after_load(loader)
+    loader.result.elapsed = time.perf_counter() - started
+    return loader.result
+
+
+def after_load(loader):
+    """То, что при обычном сохранении делают сигналы (signals.py)."""
+    labels = set(loader.result.counts)
+    if labels & {'main_app.abiturient', 'main_app.dogovor'}:
+        reporting.rebuild()
+    if labels & {'main_app.abiturient', 'main_app.specialnost'}:
+        transaction.on_commit(lambda: DataVersion.bump('abiturients'))
+    if loader.scans:
+        filestore.recount(loader.scans)
+    if labels:
+        # Загруженные строки могут попасть в любой кэш (счетчики, карточки, индексы)
+        transaction.on_commit(cache.clear)
@@ -0,0 +1,338 @@
+# main_app/filestore.py
+"""
+Хранилище сканов документов по содержимому.
+
+ContentAddressedStorage пишет загрузку на диск кусками, по пути считая
+SHA-256, и кладет файл под именем documents/<ab>/<sha256>.<ext>. Если такой
+файл уже есть (родители часто загружают один и тот же PDF), вторая копия не
+пишется. Сколько документов ссылается на файл, хранит StoredFile.refcount:
+сигналы (signals.py) вызывают acquire()/release(), а файлы без ссылок
+удаляет collect_garbage(), когда они пролежали так DOCUMENT_GC_GRACE секунд.
+
+Превью (JPEG до THUMBNAIL_SIZE px) строит фоновый обработчик report_worker:
+для изображений — Pillow, для PDF — самая крупная картинка первой страницы
+(скан обычно ею и является); для doc/docx превью нет.
+
+Отдача — serve(): при DOCUMENT_SENDFILE='nginx' ответ содержит только
+X-Accel-Redirect на DOCUMENT_ACCEL_PREFIX + имя файла
+(в nginx: location /protected/ { internal; alias <MEDIA_ROOT>/; }),
+при 'xsendfile' — X-Sendfile с полным путем, и файл отдает веб-сервер.
+Без них файл отдает Django: кусками, с ETag и запросами Range.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+from datetime import timedelta
+from functools import partial
+from io import BytesIO
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+_SHA256_NAME = re.compile(r'^[0-9a-f]{64}$')
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы под именем по SHA-256 содержимого; одинаковые загрузки хранятся один раз."""
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя все равно определяется содержимым в _save()
+        return name
+
+    def _save(self, name, content):
+        directory, original = os.path.split(name)
+        tmp_dir = self.path(os.path.join(directory, 'tmp'))
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    out.write(chunk)
+            sha = digest.hexdigest()
+            final = '/'.join(part for part in (directory, sha[:2], sha + os.path.splitext(original)[1].lower()) if part)
+            full_path = self.path(final)
+            if os.path.exists(full_path):
+                os.unlink(tmp_path)
+                os.utime(full_path)  # свежая загрузка: collect_garbage() не тронет файл
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+                os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return final
+
+
+_storage = None
+
+
+def document_storage():
+    """Хранилище для Document.scan (callable, чтобы не попадать в миграции)."""
+    global _storage
+    if _storage is None:
+        _storage = ContentAddressedStorage()
+    return _storage
+
+
+def thumbnail_size():
+    return getattr(settings, 'THUMBNAIL_SIZE', 320)
+
+
+def gc_grace():
+    return getattr(settings, 'DOCUMENT_GC_GRACE', 60 * 60)
+
+
+# -----------------------------
+# Подсчет ссылок
+# -----------------------------
+def acquire(name):
+    """Еще один документ ссылается на файл name."""
+    from .models import StoredFile
+    if not name:
+        return
+    if StoredFile.objects.filter(name=name).update(refcount=F('refcount') + 1, updated_at=timezone.now()):
+        return
+    storage = document_storage()
+    size = storage.size(name) if storage.exists(name) else 0
+    try:
+        with transaction.atomic():
+            StoredFile.objects.create(name=name, size=size, refcount=1)
+    except IntegrityError:
+        StoredFile.objects.filter(name=name).update(refcount=F('refcount') + 1, updated_at=timezone.now())
+
+
+def release(name):
+    """Документ больше не ссылается на файл name (сам файл удалит collect_garbage)."""
+    from .models import StoredFile
+    if not name:
+        return
+    StoredFile.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F('refcount') - 1, updated_at=timezone.now(),
+    )
+
+
+def recount(names):
+    """Ссылки на файлы names заново по таблице документов (после загрузки в обход сигналов)."""
+    from .models import Document, StoredFile
+    counts = dict(
+        Document.objects.filter(scan__in=names).order_by().values_list('scan').annotate(n=Count('pk'))
+    )
+    for name in names:
+        if StoredFile.objects.filter(name=name).update(refcount=counts.get(name, 0), updated_at=timezone.now()):
+            continue
+        if counts.get(name):
+            storage = document_storage()
+            size = storage.size(name) if storage.exists(name) else 0
+            StoredFile.objects.create(name=name, size=size, refcount=counts[name])
+
+
+def _delete_files(name, thumbnail_name):
+    document_storage().delete(name)
+    if thumbnail_name:
+        from .models import StoredFile
+        StoredFile._meta.get_field('thumbnail').storage.delete(thumbnail_name)
+
+
+def collect_garbage(grace=None):
+    """Удаляет файлы без ссылок старше grace секунд; возвращает их число."""
+    from .models import StoredFile
+    cutoff = timezone.now() - timedelta(seconds=gc_grace() if grace is None else grace)
+    storage = document_storage()
+    removed = 0
+    for pk in StoredFile.objects.filter(refcount=0, updated_at__lt=cutoff).values_list('pk', flat=True):
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update(skip_locked=True).filter(pk=pk, refcount=0).first()
+            if stored is None:
+                continue
+            path = storage.path(stored.name)
+            if os.path.exists(path) and os.path.getmtime(path) > cutoff.timestamp():
+                continue  # тот же файл только что загрузили заново
+            stored.delete()
+            transaction.on_commit(partial(_delete_files, stored.name, stored.thumbnail.name))
+        removed += 1
+    return removed
+
+
+# -----------------------------
+# Превью
+# -----------------------------
+def _pdf_first_image(path):
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    if not reader.pages:
+        return None
+    images = [item.image for item in reader.pages[0].images if item.image is not None]
+    return max(images, key=lambda image: image.width * image.height, default=None)
+
+
+def make_thumbnail(path, size=None):
+    """JPEG-превью файла (bytes) или None, если для этого формата превью нет."""
+    from PIL import Image, ImageOps
+    size = size or thumbnail_size()
+    ext = os.path.splitext(path)[1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        image = Image.open(path)
+        image.draft('RGB', (size, size))  # JPEG декодируется сразу в уменьшенном масштабе
+    elif ext == '.pdf':
+        image = _pdf_first_image(path)
+    else:
+        return None
+    if image is None:
+        return None
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((size, size))
+    buffer = BytesIO()
+    image.convert('RGB').save(buffer, 'JPEG', quality=80, optimize=True)
+    return buffer.getvalue()
+
+
+def claim_thumbnail():
+    """Забирает один файл без превью (или зависший дольше REPORT_JOB_TIMEOUT)."""
+    from .models import StoredFile
+    stale = timezone.now() - timedelta(seconds=getattr(settings, 'REPORT_JOB_TIMEOUT', 600))
+    with transaction.atomic():
+        stored = (StoredFile.objects
+                  .select_for_update(skip_locked=True)
+                  .filter(Q(thumbnail_status='pending') | Q(thumbnail_status='running', updated_at__lt=stale))
+                  .filter(refcount__gt=0)
+                  .order_by('updated_at')
+                  .first())
+        if stored is None:
+            return None
+        stored.thumbnail_status = 'running'
+        stored.save(update_fields=['thumbnail_status', 'updated_at'])
+    return stored
+
+
+def build_thumbnail(stored):
+    from . import cards
+    try:
+        content = make_thumbnail(document_storage().path(stored.name))
+    except Exception:
+        logger.exception("Не удалось построить превью %s", stored.name)
+        content, stored.thumbnail_status = None, 'failed'
+    else:
+        stored.thumbnail_status = 'none' if content is None else 'done'
+    if content is not None:
+        stem = os.path.splitext(os.path.basename(stored.name))[0]
+        stored.thumbnail.save(f"{stem}.jpg", ContentFile(content), save=False)
+    stored.save(update_fields=['thumbnail', 'thumbnail_status', 'updated_at'])
+    if stored.thumbnail_status == 'done':
+        cards.invalidate_where(documents__scan=stored.name)
+    return stored
+
+
+def run_pending(limit=None):
+    """Строит превью из очереди; возвращает число обработанных файлов."""
+    processed = 0
+    while limit is None or processed < limit:
+        stored = claim_thumbnail()
+        if stored is None:
+            break
+        build_thumbnail(stored)
+        processed += 1
+    return processed
+
+
+# -----------------------------
+# Отдача файлов
+# -----------------------------
+def sendfile_mode():
+    return getattr(settings, 'DOCUMENT_SENDFILE', '')
+
+
+def _etag(storage, name, size):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    if _SHA256_NAME.match(stem):
+        return f'"{stem}"'
+    return f'"{size:x}-{int(storage.get_modified_time(name).timestamp()):x}"'
+
+
+def _byte_range(header, size):
+    """(начало, конец) из заголовка Range с одним диапазоном; None — весь файл; ValueError — 416."""
+    match = _RANGE.match(header.strip()) if header else None
+    if match is None or not (match[1] or match[2]):
+        return None
+    if match[1]:
+        start = int(match[1])
+        end = min(int(match[2]), size - 1) if match[2] else size - 1
+    else:
+        start, end = max(0, size - int(match[2])), size - 1
+    if start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _read(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve(request, storage, name, filename=None):
+    """Ответ с файлом из storage: через веб-сервер (sendfile) или из Python с ETag/Range."""
+    if not name or not storage.exists(name):
+        raise Http404("Файл не найден")
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    mode = sendfile_mode()
+
+    if mode in ('nginx', 'xsendfile'):
+        response = HttpResponse(content_type=content_type)
+        if mode == 'nginx':
+            prefix = getattr(settings, 'DOCUMENT_ACCEL_PREFIX', '/protected/')
+            response['X-Accel-Redirect'] = quote(prefix + name)
+        else:
+            response['X-Sendfile'] = storage.path(name)
+    else:
+        size = storage.size(name)
+        etag = _etag(storage, name, size)
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+        try:
+            byte_range = _byte_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+            return response
+        if byte_range and request.headers.get('If-Range', etag) != etag:
+            byte_range = None  # файл изменился — отдаем целиком
+        start, end = byte_range or (0, size - 1)
+        response = StreamingHttpResponse(
+            _read(storage.path(name), start, end - start + 1),
+            content_type=content_type, status=206 if byte_range else 200,
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        if byte_range:
+            response['Content-Range'] = f"bytes {start}-{end}/{size}"
+
+    response['Content-Disposition'] = content_disposition_header(False, filename or os.path.basename(name))
+    response['Cache-Control'] = 'private, max-age=86400'
+    return response
@@ -7,6 +7,7 @@ from dal import autocomplete
 from .models import (
     Abiturient, Roditel, Specialnost, Zdorovie, Document, Dogovor, AbiturientRoditel
 )
+from .enrollment import DEFAULT_GROUP_PATTERN, GROUP_FIXED, GROUP_KEEP, GROUP_RULES
 
 # ----------------------------------------
 # Пользовательская форма для авторизации
@@ -169,7 +170,7 @@ class DogovorForm(forms.ModelForm):
                 format='%Y-%m-%d', 
                 attrs={'type': 'date', 'class': 'form-control'}
             ),
-            'number': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Напр. 123/24'}),
+            'number': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Присваивается автоматически'}),
             'payment_form': forms.Select(attrs={'class': 'form-select'}),
             'maternity_capital': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
             'credit': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
@@ -177,9 +178,70 @@ class DogovorForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # Пустой номер заполнит Dogovor.save() из счетчика (numbering.py)
+        self.fields['number'].required = False
+        self.fields['number'].help_text = 'Оставьте пустым — номер будет присвоен при сохранении'
         for field_name, field in self.fields.items():
             if field_name not in ['abiturient', 'roditel_zakazchik', 'maternity_capital', 'credit']:
                 if isinstance(field.widget, (forms.TextInput, forms.DateInput, forms.Textarea, forms.EmailInput)):
                     field.widget.attrs.update({'class': 'form-control'})
                 elif isinstance(field.widget, forms.Select):
-                    field.widget.attrs.update({'class': 'form-select'})
\ No newline at end of file
+                    field.widget.attrs.update({'class': 'form-select'})
+
+# ------------------------------
+# Массовое зачисление
+# ------------------------------
+class BatchEnrollmentForm(forms.Form):
+    specialnost = forms.ModelChoiceField(
+        queryset=Specialnost.objects.order_by('name'), required=False, label='Специальность',
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    class_of_entry = forms.ChoiceField(
+        choices=[('', 'Любой')] + Abiturient.CLASS_CHOICES, required=False, label='Класс поступления',
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    ids = forms.CharField(
+        required=False, label='Или список id (через запятую или пробел)',
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
+    )
+    group_rule = forms.ChoiceField(
+        choices=GROUP_RULES, initial=GROUP_KEEP, label='Группа',
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    group_value = forms.CharField(
+        max_length=100, required=False, label='Название группы или шаблон',
+        help_text='Шаблон: {code} — код специальности, {year} или {yy} — год, {class} — класс. '
+                  f'По умолчанию {DEFAULT_GROUP_PATTERN}',
+        widget=forms.TextInput(attrs={'class': 'form-control'}),
+    )
+    enrollment_date = forms.DateField(
+        required=False, label='Дата зачисления (по умолчанию — сегодня)',
+        widget=forms.DateInput(format='%Y-%m-%d', attrs={'type': 'date', 'class': 'form-control'}),
+    )
+    dry_run = forms.BooleanField(
+        required=False, label='Только посчитать, не зачислять',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+
+    def clean_ids(self):
+        raw = self.cleaned_data['ids'].replace(',', ' ').split()
+        try:
+            return sorted({int(value) for value in raw})
+        except ValueError:
+            raise forms.ValidationError('id должны быть целыми числами')
+
+    def clean(self):
+        cleaned = super().clean()
+        if not (cleaned.get('specialnost') or cleaned.get('class_of_entry') or cleaned.get('ids')):
+            raise forms.ValidationError('Укажите специальность, класс поступления или список id')
+        if cleaned.get('group_rule') == GROUP_FIXED and not cleaned.get('group_value'):
+            self.add_error('group_value', 'Укажите название группы')
+        return cleaned
+
+    def criteria(self):
+        specialnost = self.cleaned_data.get('specialnost')
+        return {
+            'specialnost': specialnost.pk if specialnost else None,
+            'class_of_entry': self.cleaned_data.get('class_of_entry') or None,
+            'ids': self.cleaned_data.get('ids') or None,
+        }
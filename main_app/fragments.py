@@ -0,0 +1,91 @@
+# main_app/fragments.py
+"""
+Кэш отрисованных фрагментов страниц сотрудников (дашборд, списки
+абитуриентов и договоров).
+
+Фрагмент — отдельный шаблон из main_app/fragments/ с той частью страницы,
+которая зависит только от данных: таблица со счетчиком и пагинацией,
+карточки и график дашборда. Его HTML кладется в кэш на
+FRAGMENT_CACHE_TIMEOUT секунд под ключом из набора GET-параметров и
+глобальной версии данных; страница получает готовый HTML в переменной
+fragment, а все, что зависит от пользователя (меню, сообщения, CSRF),
+рендерится как обычно. При попадании в кэш контекст фрагмента не
+собирается вовсе — ни запросов в БД, ни пагинации.
+
+Версию меняют сигналы при изменении абитуриентов, договоров и
+специальностей (invalidate()); после массовых операций без сигналов ее
+нужно сбрасывать вручную.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+KEY_PREFIX = 'fragment:'
+VERSION_KEY = KEY_PREFIX + 'version'
+
+
+def _timeout():
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 300)
+
+
+def data_version():
+    return cache.get_or_set(VERSION_KEY, time.time_ns, None)
+
+
+def invalidate():
+    """Сброс всех фрагментов (новая версия данных в ключах)."""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def fragment_key(template_name, params):
+    """Ключ фрагмента: шаблон, GET-параметры в каноническом порядке и текущая версия данных."""
+    query = urlencode(sorted((name, value) for name, values in params.lists() for value in values))
+    digest = hashlib.md5(query.encode('utf-8')).hexdigest()
+    return f"{KEY_PREFIX}{data_version()}:{template_name}:{digest}"
+
+
+def render_fragment(key, template_name, context, request):
+    html = render_to_string(template_name, context, request)
+    cache.set(key, html, _timeout())
+    return mark_safe(html)
+
+
+def cached_fragment(request, template_name, get_context):
+    """HTML фрагмента из кэша; при промахе get_context() собирает контекст и фрагмент рендерится."""
+    key = fragment_key(template_name, request.GET)
+    html = cache.get(key)
+    if html is not None:
+        return mark_safe(html)
+    return render_fragment(key, template_name, get_context(), request)
+
+
+class FragmentCacheMixin:
+    """
+    Для ListView/FilterView: основная часть страницы (fragment_template)
+    берется из кэша, а template_name — оболочка, которая выводит {{ fragment }}.
+    """
+    fragment_template = None
+
+    def get(self, request, *args, **kwargs):
+        # Ключ берем до выборки: если данные изменятся по ходу, фрагмент ляжет под устаревшую версию
+        self.fragment_key = fragment_key(self.fragment_template, request.GET)
+        html = cache.get(self.fragment_key)
+        if html is not None:
+            return self.render_page(mark_safe(html))
+        return super().get(request, *args, **kwargs)
+
+    def render_to_response(self, context, **response_kwargs):
+        html = render_fragment(self.fragment_key, self.fragment_template, context, self.request)
+        return self.render_page(html, **response_kwargs)
+
+    def get_template_names(self):
+        # При попадании object_list нет, и ListView не может вывести имя шаблона из модели
+        return [self.template_name]
+
+    def render_page(self, html, **response_kwargs):
+        return super().render_to_response({'view': self, 'fragment': html}, **response_kwargs)
@@ -0,0 +1,271 @@
+# main_app/importers.py
+"""
+Массовый импорт абитуриентов из CSV/XLSX (команда import_abiturients и
+страница импорта в админке).
+
+Файл читается построчно, каждая строка проверяется правилами полей тех же
+форм, что и при ручном вводе (AbiturientForm, RoditelForm, ZdorovieForm), а
+запись идет пачками через bulk_create (сводная таблица отчетов
+обновляется дельтами той же пачки). Родители дедуплицируются по
+номеру телефона (см. utils.phone_key) — и внутри файла, и с уже сохраненными.
+
+Колонки файла (первая строка — заголовки):
+  fio, date_of_birth, class_of_entry, specialnost (код или название),
+  hobby, phone, address, email, is_guardianship,
+  mother_fio, mother_phone, mother_email, mother_workplace, mother_address,
+  father_* — аналогично,
+  health_diseases, health_disability, health_restrictions, health_additional_info
+"""
+import csv
+import io
+import itertools
+import time
+from collections import Counter
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .forms import AbiturientForm, RoditelForm, ZdorovieForm
+from .models import Abiturient, AbiturientRoditel, DataVersion, Roditel, Specialnost, Zdorovie
+from . import autocomplete, fragments, reporting, typeahead
+from .stats import invalidate_dashboard
+from .utils import phone_key
+
+PARENTS = (('mother', 'мать'), ('father', 'отец'))
+BOOLEAN_FIELDS = {'is_guardianship', 'health_disability'}
+TRUE_VALUES = {'1', 'да', 'yes', 'true', 'on', '+', 'y', 'д'}
+
+
+class ImportResult:
+    """Итог импорта: сколько записано и ошибки по номерам строк."""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.parents_created = 0
+        self.errors = []  # [(номер строки, {поле: [ошибки]})]
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, line, errors):
+        self.errors.append((line, errors))
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def read_rows(fileobj, filename):
+    """Построчное чтение CSV или XLSX; отдает (номер строки, словарь значений)."""
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        wb = load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            headers = [_cell(h).lower() for h in next(rows, [])]
+            for line, values in enumerate(rows, start=2):
+                if not any(v not in (None, '') for v in values):
+                    continue
+                yield line, dict(zip(headers, (_cell(v) for v in values)))
+        finally:
+            wb.close()
+        return
+
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(text, dialect=dialect)
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    for line, row in enumerate(reader, start=2):
+        if not any((v or '').strip() for v in row.values() if isinstance(v, str)):
+            continue
+        yield line, {key: (value or '').strip() for key, value in row.items() if key}
+
+
+def _form_data(row, prefix=''):
+    """Значения строки для формы; булевы поля — в виде, понятном CheckboxInput."""
+    data = {}
+    for key, value in row.items():
+        if prefix:
+            if not key.startswith(prefix + '_'):
+                continue
+            name = key[len(prefix) + 1:]
+        else:
+            name = key
+        if key in BOOLEAN_FIELDS:
+            if value.lower() in TRUE_VALUES:
+                data[name] = 'on'
+            continue
+        data[name] = value
+    return data
+
+
+class AbiturientImporter:
+    def __init__(self, batch_size=500, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.specialnosti = {}
+        for pk, code, name in Specialnost.objects.values_list('pk', 'code', 'name'):
+            self.specialnosti[name.strip().lower()] = pk
+            if code:
+                self.specialnosti[code.strip().lower()] = pk
+        self.parents_by_phone = {}
+        self._no_phone_seq = itertools.count()
+        for pk, phone in Roditel.objects.values_list('pk', 'phone').iterator(chunk_size=5000):
+            key = phone_key(phone)
+            if key:
+                self.parents_by_phone.setdefault(key, pk)
+
+    # ---------- проверка строки ----------
+    @staticmethod
+    def clean_fields(form_class, data, exclude=()):
+        """
+        Проверка данных полями формы (form_class.base_fields) без создания
+        экземпляра формы: на тысячах строк deepcopy полей обходится дороже
+        самой проверки.
+        """
+        cleaned, errors = {}, {}
+        for name, field in form_class.base_fields.items():
+            if name in exclude:
+                continue
+            value = field.widget.value_from_datadict(data, {}, name)
+            try:
+                cleaned[name] = field.clean(value)
+            except ValidationError as e:
+                errors[name] = e.messages
+        return cleaned, errors
+
+    def validate(self, row):
+        """Возвращает (данные для записи, ошибки)."""
+        # Специальность сопоставляем сами (по коду или названию), без запроса на строку
+        abit_data, errors = self.clean_fields(AbiturientForm, _form_data(row), exclude={'specialnost'})
+        specialnost_id = None
+        spec_value = row.get('specialnost', '').strip().lower()
+        if spec_value:
+            specialnost_id = self.specialnosti.get(spec_value)
+            if specialnost_id is None:
+                errors['specialnost'] = [f"Специальность «{row['specialnost']}» не найдена"]
+
+        parents = []
+        for prefix, relation in PARENTS:
+            data = _form_data(row, prefix)
+            if not (data.get('fio') or data.get('phone')):
+                continue
+            parent_data, parent_errors = self.clean_fields(RoditelForm, data)
+            if parent_errors:
+                errors.update({f"{prefix}_{field}": messages for field, messages in parent_errors.items()})
+                continue
+            # Без цифр в телефоне дедуплицировать не по чему — такой родитель всегда новый
+            key = phone_key(parent_data['phone']) or ('no-phone', next(self._no_phone_seq))
+            parents.append((relation, key, parent_data))
+
+        health = None
+        h_data = _form_data(row, 'health')
+        if h_data:
+            health, health_errors = self.clean_fields(ZdorovieForm, h_data)
+            errors.update({f"health_{field}": messages for field, messages in health_errors.items()})
+
+        if errors:
+            return None, errors
+        abiturient = Abiturient(specialnost_id=specialnost_id, **abit_data)
+        abiturient.fill_search_fields()
+        return (abiturient, parents, health), None
+
+    # ---------- запись пачки ----------
+    def _write_batch(self, batch, result):
+        with transaction.atomic():
+            new_parents = {}
+            for _abit, parents, _health in batch:
+                for _relation, key, data in parents:
+                    if key not in self.parents_by_phone and key not in new_parents:
+                        new_parents[key] = Roditel(**data)
+            Roditel.objects.bulk_create(new_parents.values(), batch_size=self.batch_size)
+            for key, parent in new_parents.items():
+                self.parents_by_phone[key] = parent.pk
+            result.parents_created += len(new_parents)
+
+            abiturients = Abiturient.objects.bulk_create(
+                [abit for abit, _parents, _health in batch], batch_size=self.batch_size
+            )
+
+            links, health_rows = [], []
+            for abit, (_abit, parents, health) in zip(abiturients, batch):
+                seen = set()
+                for relation, key, _data in parents:
+                    parent_id = self.parents_by_phone[key]
+                    if parent_id in seen:
+                        continue
+                    seen.add(parent_id)
+                    links.append(AbiturientRoditel(abiturient=abit, roditel_id=parent_id, relation_type=relation))
+                if health is not None:
+                    health_rows.append(Zdorovie(abiturient=abit, **health))
+            AbiturientRoditel.objects.bulk_create(links, batch_size=self.batch_size)
+            Zdorovie.objects.bulk_create(health_rows, batch_size=self.batch_size)
+            reporting.apply(Counter(
+                reporting.abiturient_key(abit.specialnost_id, abit.status, abit.enrollment_date) for abit in abiturients
+            ))
+        result.created += len(abiturients)
+
+    def run(self, rows):
+        result = ImportResult()
+        started = time.perf_counter()
+        batch = []
+        try:
+            for line, row in rows:
+                result.rows += 1
+                item, errors = self.validate(row)
+                if errors:
+                    result.add_error(line, errors)
+                    continue
+                if self.dry_run:
+                    continue
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self._write_batch(batch, result)
+                    batch = []
+            if batch:
+                self._write_batch(batch, result)
+        finally:
+            result.elapsed = time.perf_counter() - started
+            # Пачки фиксируются по одной: если упала очередная, записанные до нее уже в БД
+            if result.created:
+                # bulk_create не шлет сигналов — сбрасываем кэши вручную
+                transaction.on_commit(invalidate_dashboard)
+                transaction.on_commit(lambda: DataVersion.bump('abiturients'))
+                transaction.on_commit(typeahead.invalidate)
+                transaction.on_commit(fragments.invalidate)
+                transaction.on_commit(lambda: autocomplete.invalidate('abiturient', 'roditel'))
+        return result
+
+
+def import_file(fileobj, filename, batch_size=500, dry_run=False):
+    importer = AbiturientImporter(batch_size=batch_size, dry_run=dry_run)
+    return importer.run(read_rows(fileobj, filename))
+
+
+def errors_as_csv(result):
+    """Отчет об ошибках в CSV (строка файла, поле, сообщение)."""
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=';')
+    writer.writerow(['Строка', 'Поле', 'Ошибка'])
+    for line, errors in result.errors:
+        for field, messages in errors.items():
+            for message in messages:
+                writer.writerow([line, field, message])
+    return out.getvalue()
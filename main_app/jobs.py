@@ -0,0 +1,130 @@
+# main_app/jobs.py
+"""
+Очередь фоновых задач формирования отчетов (хранится в БД, модель ReportJob).
+
+Представление ставит задачу в очередь, а отдельный процесс
+`manage.py report_worker` забирает ее, формирует файл и сохраняет его в
+MEDIA_ROOT/reports/. Задачи идентифицируются хэшем версии данных
+(DataVersion), поэтому повторный запрос при неизменных данных сразу
+получает готовый файл.
+"""
+import hashlib
+import logging
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DataVersion, ReportJob
+
+logger = logging.getLogger(__name__)
+
+ReportSpec = namedtuple('ReportSpec', ['render', 'version_keys', 'filename', 'content_type'])
+
+REPORTS = {}
+
+
+def register(kind, render, version_keys, filename, content_type='application/pdf'):
+    """Регистрация отчета: render() должен вернуть содержимое файла (bytes)."""
+    REPORTS[kind] = ReportSpec(render, tuple(version_keys), filename, content_type)
+
+
+def data_key(kind):
+    """Хэш версий данных, от которых зависит отчет."""
+    spec = REPORTS[kind]
+    versions = ','.join(f"{key}={DataVersion.get(key)}" for key in spec.version_keys)
+    return hashlib.sha256(f"{kind}|{versions}".encode('utf-8')).hexdigest()
+
+
+def _stale_before():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'REPORT_JOB_TIMEOUT', 600))
+
+
+def request_report(kind, user=None):
+    """Готовая задача для текущих данных, уже запущенная или новая в очереди."""
+    key = data_key(kind)
+    job = (ReportJob.objects
+           .filter(kind=kind, data_key=key)
+           .exclude(status='failed')
+           .order_by('-created_at')
+           .first())
+    if job is not None:
+        if job.status != 'done':
+            return job
+        if job.file and job.file.storage.exists(job.file.name):
+            return job
+    return ReportJob.objects.create(kind=kind, data_key=key, created_by=user)
+
+
+def claim_next_job():
+    """Забирает одну задачу из очереди (или зависшую дольше REPORT_JOB_TIMEOUT)."""
+    with transaction.atomic():
+        job = (ReportJob.objects
+               .select_for_update(skip_locked=True)
+               .filter(kind__in=list(REPORTS))
+               .filter(status='pending')
+               .order_by('created_at')
+               .first())
+        if job is None:
+            job = (ReportJob.objects
+                   .select_for_update(skip_locked=True)
+                   .filter(kind__in=list(REPORTS), status='running', started_at__lt=_stale_before())
+                   .order_by('started_at')
+                   .first())
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def run_job(job):
+    """Формирует файл отчета и сохраняет результат в задаче."""
+    spec = REPORTS[job.kind]
+    name = f"{job.kind}_{job.data_key[:16]}.{spec.filename.rsplit('.', 1)[-1]}"
+    try:
+        content = spec.render()
+        # Ошибка записи файла (нет места, нет прав) тоже завершает задачу,
+        # иначе она висит в 'running' до REPORT_JOB_TIMEOUT
+        job.file.save(name, ContentFile(content), save=False)
+    except Exception as exc:
+        logger.exception("Не удалось сформировать отчет %s", job.pk)
+        job.status = 'failed'
+        job.error = str(exc)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return job
+
+    job.status = 'done'
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'error', 'finished_at'])
+    _cleanup_old_files(job)
+    return job
+
+
+def _cleanup_old_files(job):
+    """Удаляет файлы прежних версий этого отчета."""
+    old_jobs = (ReportJob.objects
+                .filter(kind=job.kind, status='done')
+                .exclude(pk=job.pk)
+                .exclude(file=''))
+    for old in old_jobs:
+        old.file.delete(save=False)
+        old.save(update_fields=['file'])
+
+
+def run_pending(limit=None):
+    """Выполняет задачи из очереди; возвращает число обработанных."""
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
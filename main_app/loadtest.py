@@ -0,0 +1,114 @@
+# main_app/loadtest.py
+"""
+Нагрузочный тест AJAX-эндпоинтов на запущенном сервере (команда loadtest).
+
+Сравнивает профили развертывания: синхронный WSGI (gunicorn, потоки или
+процессы) и ASGI (gunicorn с воркерами uvicorn, асинхронные представления).
+Для каждого уровня одновременности N запускается N клиентов, каждый со
+своим keep-alive соединением, и в течение заданного времени они по кругу
+запрашивают подсказки поиска, новости и AJAX-данные абитуриентов.
+Авторизация — сессия сотрудника, созданная напрямую в хранилище сессий
+(сервер должен смотреть в ту же БД).
+"""
+import http.client
+import itertools
+import random
+import threading
+import time
+from collections import Counter
+from importlib import import_module
+from urllib.parse import quote, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from .benchmarks import SEARCH_QUERIES, TYPED_SURNAMES, summarize
+from .models import Abiturient
+
+ENDPOINTS = ('typeahead', 'search', 'news', 'parents', 'abit_info')
+
+
+def staff_session(username=None):
+    """Ключ новой сессии сотрудника (первого по id, если имя не задано)."""
+    users = User.objects.filter(is_staff=True, is_active=True).order_by('pk')
+    user = users.get(username=username) if username else users.first()
+    if user is None:
+        raise User.DoesNotExist("Нет активного сотрудника для авторизации")
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return session.session_key
+
+
+def request_paths(endpoints=ENDPOINTS, count=500):
+    """Перемешанный набор путей запросов к выбранным эндпоинтам."""
+    ids = list(Abiturient.objects.order_by('?').values_list('pk', flat=True)[:50]) or [1]
+    prefixes = [name[:length] for name in TYPED_SURNAMES for length in range(2, len(name) + 1)]
+    makers = {
+        'typeahead': lambda: f"{reverse('search_students_legacy')}?q={quote(random.choice(prefixes))}",
+        'search': lambda: f"{reverse('search_students')}?q={quote(random.choice(SEARCH_QUERIES))}",
+        'news': lambda: reverse('get_news'),
+        'parents': lambda: reverse('parents_by_abiturient_ajax', args=[random.choice(ids)]),
+        'abit_info': lambda: reverse('abit_info_ajax', args=[random.choice(ids)]),
+    }
+    paths = [makers[name]() for name in endpoints for _ in range(count // len(endpoints))]
+    random.shuffle(paths)
+    return paths
+
+
+def _client(base, cookie, paths, deadline, latencies, statuses, lock):
+    url = urlsplit(base)
+    conn_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+    conn = conn_class(url.hostname, url.port, timeout=30)
+    headers = {'Cookie': cookie, 'X-Requested-With': 'XMLHttpRequest'}
+    local_latencies, local_statuses = [], Counter()
+    for path in paths:
+        if time.perf_counter() >= deadline:
+            break
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            local_statuses[response.status] += 1
+        except (OSError, http.client.HTTPException):
+            local_statuses['error'] += 1
+            conn.close()
+            continue
+        local_latencies.append(time.perf_counter() - started)
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        statuses.update(local_statuses)
+
+
+def run(base, session_key, paths, concurrency, duration):
+    """Один прогон: N клиентов в течение duration секунд; возвращает сводку."""
+    cookie = f"{settings.SESSION_COOKIE_NAME}={session_key}"
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(
+            target=_client,
+            args=(base, cookie, itertools.islice(itertools.cycle(paths), i, None), deadline, latencies, statuses, lock),
+        )
+        for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stats = summarize(latencies)
+    stats.update({
+        'concurrency': concurrency,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'ok': statuses[200],
+        'failed': sum(n for status, n in statuses.items() if status != 200),
+    })
+    return stats
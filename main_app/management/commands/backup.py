@@ -0,0 +1,21 @@
+# main_app/management/commands/backup.py
+from django.core.management.base import BaseCommand
+
+from main_app import backup
+
+
+class Command(BaseCommand):
+    help = 'Резервная копия базы (сжатый JSONL по таблицам, параллельно) и медиафайлов (инкрементально)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Каталог для копий (по умолчанию BACKUP_ROOT)')
+        parser.add_argument('--workers', type=int,
+                            help='Число процессов выгрузки (0 — в этом процессе; по умолчанию BACKUP_WORKERS или число ядер)')
+        parser.add_argument('--no-media', action='store_true', help='Не копировать медиафайлы')
+
+    def handle(self, *args, **options):
+        path = backup.create_backup(
+            root=options['output'], workers=options['workers'], media=not options['no_media'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f"✅ Бэкап сохранен в: {path}"))
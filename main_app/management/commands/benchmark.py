@@ -0,0 +1,37 @@
+# main_app/management/commands/benchmark.py
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.benchmarks import SCENARIOS, summarize
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочные замеры (p50/p95). Данные готовятся командой seed_demo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help='Сценарии (по умолчанию все)')
+        parser.add_argument('--repeat', type=int, default=100, help='Количество повторов')
+        parser.add_argument('--sizes', help='Размеры данных через запятую (для сценариев, которые их используют)')
+        parser.add_argument('--list', action='store_true', help='Показать доступные сценарии')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name, (description, _func) in SCENARIOS.items():
+                self.stdout.write(f"{name:<16} {description}")
+            return
+
+        names = options['scenarios'] or list(SCENARIOS)
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f"Неизвестные сценарии: {', '.join(unknown)}")
+
+        sizes = [int(size) for size in options['sizes'].split(',')] if options['sizes'] else None
+
+        for name in names:
+            description, func = SCENARIOS[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n--- {name}: {description} ---"))
+            for label, timings in func(options['repeat'], sizes=sizes).items():
+                stats = summarize(timings)
+                self.stdout.write(
+                    f"{label:<40} runs={stats['runs']:<5} p50={stats['p50']:8.2f} мс  "
+                    f"p95={stats['p95']:8.2f} мс  max={stats['max']:8.2f} мс"
+                )
@@ -0,0 +1,52 @@
+# main_app/management/commands/explain_queries.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from main_app import queryplans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN ANALYZE основных запросов приложения: какие индексы используются, где полный просмотр таблицы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*', help='Запросы (по умолчанию все)')
+        parser.add_argument('--list', action='store_true', help='Показать доступные запросы')
+        parser.add_argument('--plans', action='store_true', help='Вывести планы целиком')
+        parser.add_argument('--no-analyze', action='store_true', help='Только план, без выполнения запросов')
+        parser.add_argument('--refresh-stats', action='store_true',
+                            help='Сначала обновить статистику планировщика (ANALYZE таблиц)')
+        parser.add_argument('--usage', action='store_true',
+                            help='Счетчики использования индексов (pg_stat_user_indexes, только PostgreSQL)')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name, (description, _func) in queryplans.QUERIES.items():
+                self.stdout.write(f"{name:<20} {description}")
+            return
+
+        names = options['queries'] or list(queryplans.QUERIES)
+        unknown = [name for name in names if name not in queryplans.QUERIES]
+        if unknown:
+            raise CommandError(f"Неизвестные запросы: {', '.join(unknown)}")
+        if options['usage'] and connection.vendor != 'postgresql':
+            raise CommandError("Счетчики использования индексов есть только на PostgreSQL")
+
+        if options['refresh_stats']:
+            queryplans.refresh_statistics()
+
+        for plan in queryplans.run(names, analyze=not options['no_analyze']):
+            elapsed = f" ({plan.elapsed_ms:.2f} мс)" if plan.elapsed_ms is not None else ''
+            self.stdout.write(f"--- {plan.name}: {plan.description}{elapsed}")
+            self.stdout.write(f"    индексы: {', '.join(plan.indexes) or '—'}")
+            if plan.full_scans:
+                self.stdout.write(self.style.WARNING(f"    полный просмотр: {', '.join(plan.full_scans)}"))
+            if plan.sorts:
+                self.stdout.write("    сортировка в памяти")
+            if options['plans']:
+                self.stdout.write('\n'.join(f"      {line}" for line in plan.text.splitlines()))
+
+        if options['usage']:
+            self.stdout.write("--- Использование индексов (с момента сброса статистики)")
+            for table, index, scans, size in queryplans.index_usage():
+                line = f"{table:<32} {index:<40} {scans:>10} {size / 1024:>10.0f} КБ"
+                self.stdout.write(self.style.WARNING(line) if not scans else line)
@@ -0,0 +1,32 @@
+# main_app/management/commands/fastload.py
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
+
+from main_app.fastload import FastloadError, load
+
+
+class Command(BaseCommand):
+    help = 'Быстрая загрузка дампов dumpdata (.json/.jsonl, можно .gz/.bz2/.xz): потоковый разбор и bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Файлы дампа')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Объектов в одном bulk_create')
+        parser.add_argument('--ignorenonexistent', '-i', action='store_true',
+                            help='Пропускать поля, которых больше нет в моделях')
+
+    def handle(self, *args, **options):
+        missing = [path for path in options['paths'] if not os.path.exists(path)]
+        if missing:
+            raise CommandError(f"Файл не найден: {', '.join(missing)}")
+        try:
+            result = load(options['paths'], batch_size=options['batch_size'],
+                          ignorenonexistent=options['ignorenonexistent'])
+        except (FastloadError, DeserializationError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for label, count in sorted(result.counts.items()):
+            self.stdout.write(f"{label}: {count}")
+        self.stdout.write(f"⏱ {result.elapsed:.2f} сек ({result.objects_per_second:.0f} объектов/сек)")
+        self.stdout.write(self.style.SUCCESS(f"✅ Загружено объектов: {result.objects}"))
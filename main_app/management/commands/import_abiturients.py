@@ -0,0 +1,41 @@
+# main_app/management/commands/import_abiturients.py
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.importers import errors_as_csv, import_file
+
+
+class Command(BaseCommand):
+    help = 'Массовый импорт абитуриентов, родителей и сведений о здоровье из CSV/XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу .csv или .xlsx')
+        parser.add_argument('--batch-size', type=int, default=500, help='Размер пачки bulk_create')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить строки, ничего не записывать')
+        parser.add_argument('--errors', help='Куда сохранить отчет об ошибках (CSV)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"Файл не найден: {path}")
+
+        with open(path, 'rb') as f:
+            result = import_file(f, path, batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        self.stdout.write(
+            f"Строк: {result.rows}, записано абитуриентов: {result.created}, "
+            f"новых родителей: {result.parents_created}, ошибок: {len(result.errors)}"
+        )
+        self.stdout.write(f"⏱ {result.elapsed:.2f} сек ({result.rows_per_second:.0f} строк/сек)")
+
+        if result.errors:
+            report = errors_as_csv(result)
+            if options['errors']:
+                with open(options['errors'], 'w', encoding='utf-8-sig') as f:
+                    f.write(report)
+                self.stdout.write(self.style.WARNING(f"⚠️ Отчет об ошибках сохранен в: {options['errors']}"))
+            else:
+                self.stdout.write(report)
+        else:
+            self.stdout.write(self.style.SUCCESS("✅ Импорт завершен без ошибок"))
@@ -0,0 +1,36 @@
+# main_app/management/commands/loadtest.py
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app import loadtest
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест AJAX-эндпоинтов запущенного сервера (WSGI или ASGI) при разной одновременности'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адрес сервера')
+        parser.add_argument('--user', help='Сотрудник для сессии (по умолчанию первый)')
+        parser.add_argument('--concurrency', default='1,10,50,200', help='Уровни одновременности через запятую')
+        parser.add_argument('--duration', type=float, default=10, help='Секунд на каждый уровень')
+        parser.add_argument('--endpoints', default=','.join(loadtest.ENDPOINTS),
+                            help=f"Эндпоинты через запятую: {', '.join(loadtest.ENDPOINTS)}")
+
+    def handle(self, *args, **options):
+        endpoints = [name for name in options['endpoints'].split(',') if name]
+        unknown = set(endpoints) - set(loadtest.ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Неизвестные эндпоинты: {', '.join(sorted(unknown))}")
+        try:
+            session_key = loadtest.staff_session(options['user'])
+        except User.DoesNotExist as e:
+            raise CommandError(str(e))
+
+        paths = loadtest.request_paths(endpoints)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"--- {options['url']}: {', '.join(endpoints)} ---"))
+        for concurrency in [int(n) for n in options['concurrency'].split(',')]:
+            stats = loadtest.run(options['url'], session_key, paths, concurrency, options['duration'])
+            self.stdout.write(
+                f"N={stats['concurrency']:<5} {stats['rps']:8.0f} запр/сек  p50={stats['p50']:8.2f} мс  "
+                f"p95={stats['p95']:8.2f} мс  max={stats['max']:8.2f} мс  ok={stats['ok']} ошибок={stats['failed']}"
+            )
@@ -0,0 +1,25 @@
+# main_app/management/commands/refresh_report_summary.py
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app import reporting
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводную таблицу отчетов (ReportSummary) по абитуриентам и договорам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Только сравнить таблицу с живыми данными, ничего не меняя')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = reporting.drift()
+            for key, (stored, actual) in sorted(drift.items()):
+                self.stdout.write(f"{' / '.join(str(part) for part in key)}: в таблице {stored}, на самом деле {actual}")
+            if drift:
+                raise CommandError(f"Расхождений: {len(drift)}")
+            self.stdout.write(self.style.SUCCESS("✅ Сводная таблица совпадает с данными"))
+            return
+
+        rows = reporting.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"✅ Сводная таблица пересчитана, строк: {rows}"))
@@ -0,0 +1,33 @@
+# main_app/management/commands/report_worker.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from main_app import filestore, jobs
+from main_app import reports  # noqa: F401  (регистрация отчетов в jobs.REPORTS)
+
+
+class Command(BaseCommand):
+    help = 'Фоновый обработчик очереди отчетов (ReportJob) и превью сканов документов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Обработать очередь и выйти')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Пауза между опросами очереди (сек)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"🚀 Обработчик отчетов запущен. Отчеты: {', '.join(jobs.REPORTS)}")
+        while True:
+            close_old_connections()
+            processed = jobs.run_pending()
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f"✅ Обработано задач: {processed}"))
+            thumbnails = filestore.run_pending()
+            if thumbnails:
+                self.stdout.write(self.style.SUCCESS(f"🖼 Построено превью: {thumbnails}"))
+            removed = filestore.collect_garbage()
+            if removed:
+                self.stdout.write(f"🗑 Удалено файлов без ссылок: {removed}")
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
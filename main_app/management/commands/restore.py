@@ -0,0 +1,25 @@
+# main_app/management/commands/restore.py
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app import backup
+
+
+class Command(BaseCommand):
+    help = 'Восстанавливает базу и медиафайлы из копии команды backup (текущие данные заменяются)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Каталог копии (с manifest.json)')
+        parser.add_argument('--no-media', action='store_true', help='Не восстанавливать медиафайлы')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Строк в одном bulk_create')
+        parser.add_argument('--force', action='store_true',
+                            help='Загружать, даже если миграции базы не совпадают с копией')
+
+    def handle(self, *args, **options):
+        try:
+            rows = backup.restore_backup(
+                options['path'], media=not options['no_media'], batch_size=options['batch_size'],
+                force=options['force'], log=self.stdout.write,
+            )
+        except (backup.BackupError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"✅ Восстановлено строк: {rows}"))
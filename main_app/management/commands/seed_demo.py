@@ -0,0 +1,88 @@
+# main_app/management/commands/seed_demo.py
+import random
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from main_app import reporting
+from main_app.models import Abiturient, Dogovor, Specialnost
+
+LAST_NAMES = ['Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Соловьёв',
+              'Васильев', 'Фёдоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семёнов']
+FIRST_NAMES = ['Иван', 'Пётр', 'Алексей', 'Дмитрий', 'Сергей', 'Андрей', 'Артём', 'Максим']
+PATRONYMICS = ['Иванович', 'Петрович', 'Алексеевич', 'Дмитриевич', 'Сергеевич', 'Андреевич']
+SPECIALNOSTI = [
+    ('09.02.07', 'Информационные системы и программирование'),
+    ('54.02.01', 'Дизайн'),
+    ('10.02.05', 'Обеспечение информационной безопасности'),
+    ('09.02.06', 'Сетевое и системное администрирование'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу тестовыми абитуриентами и договорами (для нагрузочных замеров)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--abiturients', type=int, default=100000, help='Количество абитуриентов')
+        parser.add_argument('--dogovor-ratio', type=float, default=0.5, help='Доля абитуриентов с договором')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора случайных чисел')
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        total = options['abiturients']
+
+        specs = [
+            Specialnost.objects.get_or_create(code=code, defaults={'name': name})[0]
+            for code, name in SPECIALNOSTI
+        ]
+        start_pk = (Abiturient.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+
+        created = 0
+        with transaction.atomic():
+            batch = []
+            for i in range(total):
+                fio = f"{rnd.choice(LAST_NAMES)} {rnd.choice(FIRST_NAMES)} {rnd.choice(PATRONYMICS)}"
+                abit = Abiturient(
+                    fio=fio,
+                    date_of_birth=date(2007, 1, 1) + timedelta(days=rnd.randint(0, 1500)),
+                    class_of_entry=rnd.choice(['9', '11']),
+                    specialnost=rnd.choice(specs),
+                    phone=f"+7 (9{rnd.randint(10, 99)}) {rnd.randint(100, 999)}-{rnd.randint(10, 99)}-{i % 100:02d}",
+                    address='г. Москва',
+                    email=f"seed{start_pk + i}@example.com",
+                    status=rnd.choice(['abiturient', 'abiturient', 'student', 'expelled']),
+                )
+                abit.fill_search_fields()
+                batch.append(abit)
+                if len(batch) >= batch_size:
+                    Abiturient.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            if batch:
+                Abiturient.objects.bulk_create(batch)
+                created += len(batch)
+
+            abit_ids = list(
+                Abiturient.objects.filter(pk__gte=start_pk).values_list('pk', flat=True)
+            )
+            rnd.shuffle(abit_ids)
+            with_dogovor = abit_ids[:int(len(abit_ids) * options['dogovor_ratio'])]
+            dogovors = [
+                Dogovor(
+                    number=f"SEED-{abit_id}",
+                    date_of_conclusion=date(2025, 6, 1) + timedelta(days=rnd.randint(0, 120)),
+                    payment_form=rnd.choice(['monthly', 'semester', 'yearly']),
+                    abiturient_id=abit_id,
+                )
+                for abit_id in with_dogovor
+            ]
+            Dogovor.objects.bulk_create(dogovors, batch_size=batch_size)
+            # bulk_create не шлет сигналов — сводную таблицу отчетов пересчитываем целиком
+            reporting.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Создано абитуриентов: {created}, договоров: {len(dogovors)}"
+        ))
@@ -0,0 +1,67 @@
+# Generated by Django 6.0 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+from main_app.utils import normalize_search_text, only_digits
+
+
+TRGM_INDEXES = [
+    ('main_app_abit_search_fio_trgm', 'main_app_abiturient', 'search_fio'),
+    ('main_app_abit_phone_digits_trgm', 'main_app_abiturient', 'phone_digits'),
+    # Django превращает icontains в UPPER("number"::text) LIKE UPPER(...)
+    ('main_app_dogovor_number_trgm', 'main_app_dogovor', 'UPPER("number"::text)'),
+]
+
+
+def fill_search_fields(apps, schema_editor):
+    Abiturient = apps.get_model('main_app', 'Abiturient')
+    batch = []
+    for abit in Abiturient.objects.only('id', 'fio', 'phone').iterator(chunk_size=2000):
+        abit.search_fio = normalize_search_text(abit.fio)
+        abit.phone_digits = only_digits(abit.phone)[:20]
+        batch.append(abit)
+        if len(batch) >= 2000:
+            Abiturient.objects.bulk_update(batch, ['search_fio', 'phone_digits'])
+            batch = []
+    if batch:
+        Abiturient.objects.bulk_update(batch, ['search_fio', 'phone_digits'])
+
+
+def create_trgm_indexes(apps, schema_editor):
+    # GIN-индексы pg_trgm есть только в PostgreSQL, на SQLite просто пропускаем
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRGM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (({column}) gin_trgm_ops)'
+        )
+
+
+def drop_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _table, _column in TRGM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0005_abiturient_enrollment_date_abiturient_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='abiturient',
+            name='phone_digits',
+            field=models.CharField(blank=True, editable=False, max_length=20, verbose_name='Телефон (только цифры)'),
+        ),
+        migrations.AddField(
+            model_name='abiturient',
+            name='search_fio',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='ФИО для поиска'),
+        ),
+        migrations.RunPython(fill_search_fields, migrations.RunPython.noop),
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0006_abiturient_search_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='abiturient',
+            index=models.Index(fields=['fio', 'id'], name='abiturient_fio_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dogovor',
+            index=models.Index(fields=['date_of_conclusion', 'id'], name='dogovor_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-18 13:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0008_report_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата операции')),
+                ('enrollment_date', models.DateField(verbose_name='Дата зачисления')),
+                ('criteria', models.JSONField(blank=True, default=dict, verbose_name='Условие отбора')),
+                ('group_rule', models.CharField(max_length=20, verbose_name='Правило назначения группы')),
+                ('group_value', models.CharField(blank=True, max_length=100, verbose_name='Группа или шаблон')),
+                ('enrolled_count', models.PositiveIntegerField(default=0, verbose_name='Зачислено')),
+                ('skipped_count', models.PositiveIntegerField(default=0, verbose_name='Пропущено')),
+                ('abiturient_ids', models.JSONField(blank=True, default=list, verbose_name='Зачисленные (id)')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Кто зачислил')),
+            ],
+            options={
+                'verbose_name': 'Массовое зачисление',
+                'verbose_name_plural': 'Массовые зачисления',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0009_enrollment_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('series', models.CharField(max_length=50, verbose_name='Серия')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Год')),
+                ('last_number', models.PositiveIntegerField(default=0, verbose_name='Последний номер')),
+            ],
+            options={
+                'verbose_name': 'Счетчик номеров договоров',
+                'verbose_name_plural': 'Счетчики номеров договоров',
+                'constraints': [models.UniqueConstraint(fields=('series', 'year'), name='contract_counter_series_year_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 6.0 on 2026-10-18 15:00
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+KEY_FIELDS = ('kind', 'specialnost_key', 'status', 'payment_form', 'year', 'month')
+
+
+def fill_summary(apps, schema_editor):
+    # Те же GROUP BY, что в reporting.compute(), но на исторических моделях:
+    # дальнейшие правки reporting.py не должны менять эту миграцию
+    Abiturient = apps.get_model('main_app', 'Abiturient')
+    Dogovor = apps.get_model('main_app', 'Dogovor')
+    ReportSummary = apps.get_model('main_app', 'ReportSummary')
+    counts = Counter()
+    abiturient_groups = (
+        Abiturient.objects.order_by()
+        .annotate(y=ExtractYear('enrollment_date'), m=ExtractMonth('enrollment_date'))
+        .values_list('specialnost_id', 'status', 'y', 'm')
+        .annotate(n=Count('pk'))
+    )
+    for specialnost_id, status, year, month, n in abiturient_groups:
+        counts[('abiturient', specialnost_id or 0, status or '', '', year or 0, month or 0)] += n
+    dogovor_groups = (
+        Dogovor.objects.order_by()
+        .annotate(y=ExtractYear('date_of_conclusion'), m=ExtractMonth('date_of_conclusion'))
+        .values_list('payment_form', 'y', 'm')
+        .annotate(n=Count('pk'))
+    )
+    for payment_form, year, month, n in dogovor_groups:
+        counts[('dogovor', 0, '', payment_form or '', year or 0, month or 0)] += n
+    ReportSummary.objects.bulk_create(
+        [ReportSummary(count=n, **dict(zip(KEY_FIELDS, key))) for key, n in counts.items() if n],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0010_contract_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('abiturient', 'Абитуриенты'), ('dogovor', 'Договоры')], max_length=20, verbose_name='Что считаем')),
+                ('specialnost_key', models.PositiveIntegerField(default=0, verbose_name='Специальность (id)')),
+                ('status', models.CharField(blank=True, max_length=20, verbose_name='Статус')),
+                ('payment_form', models.CharField(blank=True, max_length=10, verbose_name='Форма оплаты')),
+                ('year', models.PositiveSmallIntegerField(default=0, verbose_name='Год')),
+                ('month', models.PositiveSmallIntegerField(default=0, verbose_name='Месяц')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество')),
+            ],
+            options={
+                'verbose_name': 'Сводный счетчик',
+                'verbose_name_plural': 'Сводные счетчики',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'specialnost_key', 'status', 'payment_form', 'year', 'month'), name='report_summary_key_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_summary, migrations.RunPython.noop),
+    ]
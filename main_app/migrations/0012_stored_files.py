@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-18 16:00
+
+import main_app.filestore
+import validators
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_scans(apps, schema_editor):
+    # Уже загруженные сканы остаются под прежними именами; для них заводим счетчики ссылок
+    Document = apps.get_model('main_app', 'Document')
+    StoredFile = apps.get_model('main_app', 'StoredFile')
+    storage = main_app.filestore.document_storage()
+    rows = Document.objects.exclude(scan='').exclude(scan__isnull=True).values_list('scan').annotate(n=Count('pk'))
+    StoredFile.objects.bulk_create([
+        StoredFile(name=name, refcount=n, size=storage.size(name) if storage.exists(name) else 0)
+        for name, n in rows.order_by()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0011_report_summary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='scan',
+            field=models.FileField(blank=True, null=True, storage=main_app.filestore.document_storage, upload_to='documents/', validators=[validators.validate_file_extension, validators.validate_file_size], verbose_name='Скан документа'),
+        ),
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Путь в хранилище')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Размер, байт')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+                ('thumbnail', models.FileField(blank=True, upload_to='thumbnails/', verbose_name='Превью')),
+                ('thumbnail_status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Формируется'), ('done', 'Готово'), ('none', 'Нет превью'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус превью')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата загрузки')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Файл скана',
+                'verbose_name_plural': 'Файлы сканов',
+                'indexes': [models.Index(fields=['thumbnail_status', 'updated_at'], name='storedfile_thumb_idx'), models.Index(fields=['refcount', 'updated_at'], name='storedfile_refcount_idx')],
+            },
+        ),
+        migrations.RunPython(count_existing_scans, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-18 17:00
+
+import main_app.filestore
+import validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0012_stored_files'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='scan',
+            field=models.FileField(blank=True, null=True, storage=main_app.filestore.document_storage, upload_to='documents/', validators=[validators.validate_file_extension, validators.validate_file_size, validators.validate_file_content], verbose_name='Скан документа'),
+        ),
+    ]
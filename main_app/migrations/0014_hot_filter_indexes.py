@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-18 18:00
+
+from django.db import migrations, models
+
+
+# Поиск абитуриентов исключает отчисленных (search.abiturient_matches): частичный GIN-индекс pg_trgm
+# меньше полного из 0006, который остается для поиска договоров по ФИО абитуриента
+ACTIVE_TRGM_INDEX = 'main_app_abit_active_search_trgm'
+
+
+def create_active_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {ACTIVE_TRGM_INDEX} ON main_app_abiturient "
+        f"USING gin (search_fio gin_trgm_ops) WHERE NOT (status = 'expelled')"
+    )
+
+
+def drop_active_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {ACTIVE_TRGM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0013_document_scan_content'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='abiturient',
+            index=models.Index(fields=['status', 'fio', 'id'], name='abiturient_status_fio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='abiturient',
+            index=models.Index(fields=['specialnost', 'fio', 'id'], name='abiturient_spec_fio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='abiturient',
+            index=models.Index(fields=['status', 'enrollment_date'], name='abiturient_status_enroll_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='abiturient',
+            index=models.Index(condition=models.Q(('status', 'expelled'), _negated=True), fields=['search_fio', 'id'], name='abiturient_active_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dogovor',
+            index=models.Index(fields=['payment_form', 'date_of_conclusion'], name='dogovor_payment_date_idx'),
+        ),
+        migrations.RunPython(create_active_trgm_index, drop_active_trgm_index),
+    ]
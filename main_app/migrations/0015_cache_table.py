@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18 19:00
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    # Таблица для CACHE_BACKEND=db (бэкенд по умолчанию), чтобы после migrate не нужен был
+    # отдельный createcachetable; для других бэкендов и уже созданной таблицы команда ничего не делает
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0014_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
@@ -3,7 +3,9 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 # Импортируем наши валидаторы
-from validators import validate_file_extension, validate_file_size 
+from validators import validate_file_content, validate_file_extension, validate_file_size
+from .filestore import document_storage
+from .utils import normalize_search_text, only_digits
 
 # ---- ОПРЕДЕЛЕНИЯ МОДЕЛЕЙ ----
 
@@ -49,6 +51,11 @@ class Specialnost(models.Model):
         verbose_name_plural = "Специальности"
 
 
+class AbiturientQuerySet(models.QuerySet):
+    def for_list(self):
+        """Только колонки, которые выводит abiturient_list.html."""
+        return self.only('id', 'fio', 'date_of_birth', 'class_of_entry', 'phone').order_by('fio', 'pk')
+
 class Abiturient(models.Model):
     CLASS_CHOICES = [
         ('9', '9 класс'),
@@ -86,13 +93,49 @@ class Abiturient(models.Model):
 
     parents = models.ManyToManyField(Roditel, through='AbiturientRoditel', related_name='abiturients', verbose_name="Родители")
 
+    objects = AbiturientQuerySet.as_manager()
+
+    # Нормализованные колонки для поиска (заполняются автоматически в save())
+    search_fio = models.CharField(max_length=255, blank=True, editable=False, verbose_name="ФИО для поиска")
+    phone_digits = models.CharField(max_length=20, blank=True, editable=False, verbose_name="Телефон (только цифры)")
+
     def __str__(self):
         return self.fio
 
+    def fill_search_fields(self):
+        """Пересчет поисковых колонок (нужно вызывать вручную перед bulk_create/bulk_update)."""
+        self.search_fio = normalize_search_text(self.fio)
+        self.phone_digits = only_digits(self.phone)[:20]
+
+    def save(self, *args, **kwargs):
+        self.fill_search_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'fio' in update_fields:
+                update_fields.add('search_fio')
+            if 'phone' in update_fields:
+                update_fields.add('phone_digits')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Абитуриент"
         verbose_name_plural = "Абитуриенты"
         ordering = ['fio']
+        indexes = [
+            # Keyset-пагинация списка абитуриентов: ORDER BY fio, id
+            models.Index(fields=['fio', 'id'], name='abiturient_fio_id_idx'),
+            # Список с фильтром по статусу или специальности — сразу в порядке fio, id
+            models.Index(fields=['status', 'fio', 'id'], name='abiturient_status_fio_idx'),
+            models.Index(fields=['specialnost', 'fio', 'id'], name='abiturient_spec_fio_idx'),
+            # Последние зачисленные и счетчик студентов на дашборде
+            models.Index(fields=['status', 'enrollment_date'], name='abiturient_status_enroll_idx'),
+            # Поиск исключает отчисленных: подсказки по порядку search_fio без сортировки всей таблицы
+            models.Index(
+                fields=['search_fio', 'id'], condition=~models.Q(status='expelled'), name='abiturient_active_search_idx',
+            ),
+        ]
 
 
 class Zdorovie(models.Model):
@@ -146,10 +189,11 @@ class Document(models.Model):
     # ПРИМЕНЯЕМ ВАЛИДАТОРЫ ЗДЕСЬ:
     scan = models.FileField(
         upload_to='documents/', 
+        storage=document_storage,  # по содержимому, с подсчетом ссылок (filestore.py)
         blank=True, 
         null=True, 
         verbose_name="Скан документа",
-        validators=[validate_file_extension, validate_file_size] 
+        validators=[validate_file_extension, validate_file_size, validate_file_content]
     )
     
     description = models.TextField(blank=True, verbose_name="Описание документа")
@@ -163,6 +207,14 @@ class Document(models.Model):
         verbose_name_plural = "Документы"
 
 
+class DogovorQuerySet(models.QuerySet):
+    def for_list(self):
+        """Договоры с ФИО абитуриента одним запросом (для dogovor_list.html)."""
+        return self.select_related('abiturient').only(
+            'id', 'number', 'date_of_conclusion', 'payment_form',
+            'maternity_capital', 'credit', 'abiturient__fio',
+        ).order_by('date_of_conclusion', 'pk')
+
 class Dogovor(models.Model):
     PAYMENT_FORMS = [
         ('monthly', 'Помесячно'),
@@ -179,9 +231,185 @@ class Dogovor(models.Model):
     abiturient = models.ForeignKey(Abiturient, on_delete=models.CASCADE, related_name='dogovors', verbose_name="Абитуриент")
     roditel_zakazchik = models.ForeignKey(Roditel, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Родитель-заказчик")
 
+    objects = DogovorQuerySet.as_manager()
+
     def __str__(self):
         return f"Договор №{self.number} ({self.abiturient.fio if self.abiturient else 'Неизвестный абитуриент'})"
+
+    def save(self, *args, **kwargs):
+        # Номер не указан вручную — берем следующий из счетчика (см. numbering.py)
+        if not self.number:
+            from .numbering import next_contract_number
+            self.number = next_contract_number(self.abiturient, self.date_of_conclusion)
+        super().save(*args, **kwargs)
     
     class Meta:
         verbose_name = "Договор"
-        verbose_name_plural = "Договоры"
\ No newline at end of file
+        verbose_name_plural = "Договоры"
+        indexes = [
+            # Keyset-пагинация списка договоров: ORDER BY date_of_conclusion, id
+            models.Index(fields=['date_of_conclusion', 'id'], name='dogovor_date_id_idx'),
+            # GROUP BY форма оплаты и месяц в сводной таблице отчетов — только по индексу
+            models.Index(fields=['payment_form', 'date_of_conclusion'], name='dogovor_payment_date_idx'),
+        ]
+
+
+class ContractCounter(models.Model):
+    """Последний выданный номер договора по серии (код специальности) и году."""
+    series = models.CharField(max_length=50, verbose_name="Серия")
+    year = models.PositiveSmallIntegerField(verbose_name="Год")
+    last_number = models.PositiveIntegerField(default=0, verbose_name="Последний номер")
+
+    def __str__(self):
+        return f"{self.series}/{self.year}: {self.last_number}"
+
+    class Meta:
+        verbose_name = "Счетчик номеров договоров"
+        verbose_name_plural = "Счетчики номеров договоров"
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'year'], name='contract_counter_series_year_uniq'),
+        ]
+
+
+class DataVersion(models.Model):
+    """Счетчик версий данных: увеличивается сигналами при изменении моделей (ключ кэша отчетов)."""
+    key = models.CharField(max_length=50, unique=True, verbose_name="Ключ")
+    version = models.BigIntegerField(default=0, verbose_name="Версия")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    def __str__(self):
+        return f"{self.key}: {self.version}"
+
+    @classmethod
+    def get(cls, key):
+        return cls.objects.filter(key=key).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def bump(cls, key):
+        updated = cls.objects.filter(key=key).update(version=models.F('version') + 1, updated_at=timezone.now())
+        if not updated:
+            cls.objects.get_or_create(key=key, defaults={'version': 1})
+
+    class Meta:
+        verbose_name = "Версия данных"
+        verbose_name_plural = "Версии данных"
+
+
+class ReportJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Формируется'),
+        ('done', 'Готов'),
+        ('failed', 'Ошибка'),
+    ]
+    KIND_CHOICES = [
+        ('abiturient_pdf', 'Отчет по абитуриентам (PDF)'),
+    ]
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES, verbose_name="Тип отчета")
+    data_key = models.CharField(max_length=64, verbose_name="Хэш версии данных")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Статус")
+    file = models.FileField(upload_to='reports/', blank=True, verbose_name="Файл отчета")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Кем запрошен")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата запроса")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Начало формирования")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Окончание формирования")
+
+    def __str__(self):
+        return f"{self.get_kind_display()} — {self.get_status_display()}"
+
+    class Meta:
+        verbose_name = "Задача формирования отчета"
+        verbose_name_plural = "Задачи формирования отчетов"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['kind', 'data_key'], name='reportjob_kind_key_idx'),
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_idx'),
+        ]
+
+
+class EnrollmentBatch(models.Model):
+    """Журнал массовых зачислений: кто, когда, по какому условию и кого зачислил."""
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Кто зачислил")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата операции")
+    enrollment_date = models.DateField(verbose_name="Дата зачисления")
+    criteria = models.JSONField(default=dict, blank=True, verbose_name="Условие отбора")
+    group_rule = models.CharField(max_length=20, verbose_name="Правило назначения группы")
+    group_value = models.CharField(max_length=100, blank=True, verbose_name="Группа или шаблон")
+    enrolled_count = models.PositiveIntegerField(default=0, verbose_name="Зачислено")
+    skipped_count = models.PositiveIntegerField(default=0, verbose_name="Пропущено")
+    abiturient_ids = models.JSONField(default=list, blank=True, verbose_name="Зачисленные (id)")
+
+    def __str__(self):
+        return f"Зачисление от {self.created_at:%d.%m.%Y %H:%M}: {self.enrolled_count}"
+
+    class Meta:
+        verbose_name = "Массовое зачисление"
+        verbose_name_plural = "Массовые зачисления"
+        ordering = ['-created_at']
+
+
+class ReportSummary(models.Model):
+    """
+    Сводные счетчики для дашборда и отчетов (см. reporting.py): абитуриенты по
+    специальности, статусу и месяцу зачисления, договоры по форме оплаты и
+    месяцу заключения. 0 в specialnost_key/year/month — «не указано».
+    """
+    KIND_CHOICES = [
+        ('abiturient', 'Абитуриенты'),
+        ('dogovor', 'Договоры'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Что считаем")
+    specialnost_key = models.PositiveIntegerField(default=0, verbose_name="Специальность (id)")
+    status = models.CharField(max_length=20, blank=True, verbose_name="Статус")
+    payment_form = models.CharField(max_length=10, blank=True, verbose_name="Форма оплаты")
+    year = models.PositiveSmallIntegerField(default=0, verbose_name="Год")
+    month = models.PositiveSmallIntegerField(default=0, verbose_name="Месяц")
+    count = models.IntegerField(default=0, verbose_name="Количество")
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.specialnost_key}/{self.status}{self.payment_form} {self.month}.{self.year}: {self.count}"
+
+    class Meta:
+        verbose_name = "Сводный счетчик"
+        verbose_name_plural = "Сводные счетчики"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'specialnost_key', 'status', 'payment_form', 'year', 'month'],
+                name='report_summary_key_uniq',
+            ),
+        ]
+
+
+class StoredFile(models.Model):
+    """Файл скана в хранилище по содержимому (см. filestore.py): один на все одинаковые загрузки."""
+    THUMBNAIL_STATUSES = [
+        ('pending', 'В очереди'),
+        ('running', 'Формируется'),
+        ('done', 'Готово'),
+        ('none', 'Нет превью'),
+        ('failed', 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=255, unique=True, verbose_name="Путь в хранилище")
+    size = models.PositiveBigIntegerField(default=0, verbose_name="Размер, байт")
+    refcount = models.PositiveIntegerField(default=0, verbose_name="Число ссылок")
+    thumbnail = models.FileField(upload_to='thumbnails/', blank=True, verbose_name="Превью")
+    thumbnail_status = models.CharField(
+        max_length=10, choices=THUMBNAIL_STATUSES, default='pending', verbose_name="Статус превью"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата загрузки")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+    class Meta:
+        verbose_name = "Файл скана"
+        verbose_name_plural = "Файлы сканов"
+        indexes = [
+            models.Index(fields=['thumbnail_status', 'updated_at'], name='storedfile_thumb_idx'),
+            models.Index(fields=['refcount', 'updated_at'], name='storedfile_refcount_idx'),
+        ]
@@ -0,0 +1,46 @@
+# main_app/news.py
+"""
+Заметка на дашборде (get_news/save_news).
+
+Текущая заметка лежит в общем кэше без срока жизни: get_news отвечает из
+кэша и в БД не ходит. После сохранения (save_news или админка) сигналы
+заменяют запись в кэше свежей (refresh()). Вместе с текстом хранятся
+ETag и Last-Modified из News.updated_at, поэтому повторный запрос
+браузера с If-None-Match получает 304 без тела.
+"""
+from django.core.cache import cache
+
+from .models import News
+
+KEY = 'news:current'
+
+
+def snapshot(news):
+    """Текст и валидаторы кэша для заметки (или для ее отсутствия)."""
+    if news is None:
+        return {'content': '', 'etag': '"0"', 'last_modified': None}
+    stamp = news.updated_at.timestamp()
+    return {'content': news.content, 'etag': f'"{int(stamp * 1_000_000):x}"', 'last_modified': int(stamp)}
+
+
+def current_news():
+    current = cache.get(KEY)
+    if current is None:
+        current = snapshot(News.objects.first())
+        # add, а не set: пока мы читали БД, save_news мог уже положить более новую заметку
+        cache.add(KEY, current, None)
+    return current
+
+
+async def acurrent_news():
+    """current_news() для асинхронного get_news."""
+    current = await cache.aget(KEY)
+    if current is None:
+        current = snapshot(await News.objects.afirst())
+        await cache.aadd(KEY, current, None)
+    return current
+
+
+def refresh():
+    """Заменяет заметку в кэше текущей из БД (после фиксации сохранения)."""
+    cache.set(KEY, snapshot(News.objects.first()), None)
@@ -0,0 +1,90 @@
+# main_app/numbering.py
+"""
+Номера договоров: серия (код специальности абитуриента, «00» без
+специальности), год заключения и порядковый номер из счетчика
+ContractCounter, например «09.02.07-2026-0042».
+
+Строка счетчика блокируется select_for_update только на время
+увеличения last_number, поэтому номера не повторяются при любом числе
+одновременных запросов. Чтобы при массовом создании договоров воркеры не
+стояли в очереди за одной строкой, номера берутся пачками по
+CONTRACT_NUMBER_BATCH и раздаются из памяти процесса. Цена — пропуски в
+нумерации, если процесс завершится, не раздав пачку (CONTRACT_NUMBER_BATCH
+= 1 — нумерация без пропусков).
+"""
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import ContractCounter
+
+DEFAULT_SERIES = '00'
+DEFAULT_FORMAT = '{series}-{year}-{number:04d}'
+
+_pool_lock = threading.Lock()
+_pools = {}  # (серия, год) -> deque зарезервированных, но еще не выданных номеров
+
+
+def batch_size():
+    return max(1, getattr(settings, 'CONTRACT_NUMBER_BATCH', 10))
+
+
+def number_format():
+    return getattr(settings, 'CONTRACT_NUMBER_FORMAT', DEFAULT_FORMAT)
+
+
+def reserve(series, year, count=1):
+    """Атомарно резервирует count номеров подряд; возвращает их список."""
+    with transaction.atomic():
+        counter = ContractCounter.objects.select_for_update().filter(series=series, year=year).first()
+        if counter is None:
+            # Первый номер серии в этом году: строку мог создать и соседний запрос
+            try:
+                with transaction.atomic():
+                    ContractCounter.objects.create(series=series, year=year)
+            except IntegrityError:
+                pass
+            counter = ContractCounter.objects.select_for_update().get(series=series, year=year)
+        start = counter.last_number + 1
+        counter.last_number += count
+        counter.save(update_fields=['last_number'])
+    return list(range(start, start + count))
+
+
+def next_number(series, year):
+    """Следующий номер серии: из пачки процесса или новой резервацией."""
+    # Внутри чужой транзакции резерв может откатиться вместе с ней — тогда
+    # номера из пачки выдали бы повторно. Поэтому пачки только вне транзакций.
+    if connection.in_atomic_block:
+        return reserve(series, year, 1)[0]
+
+    key = (series, year)
+    with _pool_lock:
+        pool = _pools.get(key)
+        if pool:
+            return pool.popleft()
+    numbers = reserve(series, year, batch_size())
+    with _pool_lock:
+        _pools.setdefault(key, deque()).extend(numbers[1:])
+    return numbers[0]
+
+
+def series_for(abiturient):
+    specialnost = abiturient.specialnost if abiturient is not None and abiturient.specialnost_id else None
+    return specialnost.code if specialnost and specialnost.code else DEFAULT_SERIES
+
+
+def next_contract_number(abiturient, date_of_conclusion=None):
+    """Готовый номер договора для абитуриента."""
+    year = (date_of_conclusion or timezone.now()).year
+    series = series_for(abiturient)
+    return number_format().format(series=series, year=year, number=next_number(series, year))[:50]
+
+
+def reset_pools():
+    """Забыть невыданные номера (тесты, смена настроек)."""
+    with _pool_lock:
+        _pools.clear()
@@ -0,0 +1,229 @@
+# main_app/pagination.py
+"""
+Пагинация списков абитуриентов и договоров.
+
+* CachedCountPaginator — обычный Paginator, но COUNT(*) кэшируется на
+  LIST_COUNT_CACHE_TIMEOUT секунд, а для нефильтрованной большой таблицы
+  на PostgreSQL берется оценка из pg_class.reltuples.
+* KeysetPaginationMixin — режим «по курсору» (?paginate=keyset): вместо
+  OFFSET используется условие (поле, pk) > (значение, pk) по составному
+  индексу, поэтому дальние страницы открываются так же быстро, как первая.
+"""
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Ниже этого порога оценка reltuples неточна — считаем честно
+APPROXIMATE_COUNT_THRESHOLD = 10000
+
+
+def _estimated_count(queryset):
+    """Оценка числа строк таблицы по статистике PostgreSQL (или None)."""
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row and row[0] >= APPROXIMATE_COUNT_THRESHOLD:
+        return int(row[0])
+    return None
+
+
+def count_cache_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f"{sql}|{params}".encode('utf-8')).hexdigest()
+    return f"list_count:{queryset.model._meta.label_lower}:{digest}"
+
+
+def cached_count(queryset):
+    """Возвращает (число строк, приблизительно ли оно)."""
+    key = count_cache_key(queryset)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    estimate = _estimated_count(queryset)
+    result = (estimate, True) if estimate is not None else (queryset.count(), False)
+    cache.set(key, result, getattr(settings, 'LIST_COUNT_CACHE_TIMEOUT', 30))
+    return result
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который не считает COUNT(*) на каждый запрос."""
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            count, self.count_is_approximate = cached_count(self.object_list)
+            return count
+        self.count_is_approximate = False
+        return super().count
+
+    count_is_approximate = False
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # При оценочном COUNT последняя страница может «уехать» — отдаем пустую страницу вместо 404
+            if self.count_is_approximate and int(number) >= 1:
+                return int(number)
+            raise
+
+
+# -----------------------------
+# Keyset (курсорная) пагинация
+# -----------------------------
+def encode_cursor(values):
+    raw = json.dumps(values, ensure_ascii=False, default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class KeysetPage:
+    """Страница в режиме keyset: объекты и курсоры соседних страниц."""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _after(fields, values, reverse=False):
+    """Условие «строго после (или до) значений» для упорядочивания по fields."""
+    lookup = 'lt' if reverse else 'gt'
+    condition = Q()
+    for i, field in enumerate(fields):
+        step = Q(**{f"{field}__{lookup}": values[i]})
+        for prev_field, prev_value in zip(fields[:i], values[:i]):
+            step &= Q(**{prev_field: prev_value})
+        condition |= step
+    return condition
+
+
+def paginate_keyset(queryset, fields, per_page, cursor=None, direction='next'):
+    """
+    Выборка одной страницы по курсору.
+
+    fields — упорядочивание по возрастанию, последним должно идти 'pk'.
+    """
+    values = None
+    if cursor:
+        values = decode_cursor(cursor)
+        if values is not None and len(values) == len(fields):
+            model_fields = [queryset.model._meta.pk if f == 'pk' else queryset.model._meta.get_field(f)
+                            for f in fields]
+            try:
+                values = [field.to_python(value) for field, value in zip(model_fields, values)]
+            except (ValidationError, TypeError, ValueError):
+                values = None
+        else:
+            values = None
+
+    backwards = values is not None and direction == 'prev'
+    qs = queryset
+    if values is not None:
+        qs = qs.filter(_after(fields, values, reverse=backwards))
+    ordering = [f"-{f}" for f in fields] if backwards else list(fields)
+    rows = list(qs.order_by(*ordering)[:per_page + 1])
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def key(obj):
+        return [getattr(obj, f) for f in fields]
+
+    next_cursor = previous_cursor = None
+    if rows:
+        if has_more or backwards:
+            next_cursor = encode_cursor(key(rows[-1]))
+        if values is not None and (not backwards or has_more):
+            previous_cursor = encode_cursor(key(rows[0]))
+    elif values is not None:
+        # Пустая страница по устаревшему курсору (записи удалили): ведем назад
+        # от той же позиции, чтобы навигация не пропадала
+        if backwards:
+            next_cursor = encode_cursor(values)
+        else:
+            previous_cursor = encode_cursor(values)
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    Добавляет к ListView/FilterView режим keyset-пагинации.
+
+    Режим включается параметром ?paginate=keyset (или настройкой
+    LIST_PAGINATION_MODE = 'keyset'); без него работает обычный Paginator
+    с кэшированным COUNT(*).
+    """
+    keyset_fields = ('pk',)
+    paginator_class = CachedCountPaginator
+
+    def use_keyset(self):
+        mode = self.request.GET.get('paginate') or getattr(settings, 'LIST_PAGINATION_MODE', 'offset')
+        return mode == 'keyset'
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_keyset():
+            return super().paginate_queryset(queryset, page_size)
+        page = paginate_keyset(
+            queryset, self.keyset_fields, page_size,
+            cursor=self.request.GET.get('cursor'),
+            direction=self.request.GET.get('direction', 'next'),
+        )
+        self.keyset_page = page
+        self.keyset_queryset = queryset
+        # Классический блок пагинации в шаблоне скрыт, навигация — по курсорам
+        return (None, None, page.object_list, False)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        keyset_page = getattr(self, 'keyset_page', None)
+        paginator = context.get('paginator')
+        if keyset_page is not None:
+            params = self.request.GET.copy()
+            for name in ('cursor', 'direction', 'page'):
+                params.pop(name, None)
+            params['paginate'] = 'keyset'
+            context['keyset_page'] = keyset_page
+            context['keyset_query'] = params.urlencode()
+            context['total_count'], context['total_count_approximate'] = cached_count(self.keyset_queryset)
+        elif paginator is not None:
+            context['total_count'] = paginator.count
+            context['total_count_approximate'] = paginator.count_is_approximate
+        return context
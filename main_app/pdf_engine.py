@@ -0,0 +1,93 @@
+# main_app/pdf_engine.py
+"""
+Параллельная сборка больших PDF-отчетов.
+
+Стоимость xhtml2pdf растет быстрее, чем длина таблицы, поэтому отчет
+режется на куски (HTML по ~500 строк), каждый кусок рендерится в
+отдельном процессе ProcessPoolExecutor, а готовые части склеиваются
+через pypdf с единой нумерацией страниц «N / M».
+
+Модуль намеренно не импортирует Django: дочерним процессам нужен
+только xhtml2pdf.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from pypdf import PdfReader, PdfWriter
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from xhtml2pdf import pisa
+
+
+class PdfRenderError(Exception):
+    """xhtml2pdf не смог сформировать документ."""
+
+
+def html_to_pdf_bytes(html):
+    """Рендер одного HTML-документа в PDF (выполняется в дочернем процессе)."""
+    result = BytesIO()
+    pdf = pisa.pisaDocument(BytesIO(html.encode('UTF-8')), result)
+    if pdf.err:
+        raise PdfRenderError(f"Ошибок при рендере: {pdf.err}")
+    return result.getvalue()
+
+
+def _page_number_overlay(total, width, height):
+    """PDF из total страниц, на каждой только номер «N / M» внизу по центру."""
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(width, height))
+    for number in range(1, total + 1):
+        c.setFont('Helvetica', 9)
+        c.drawCentredString(width / 2, 20, f"{number} / {total}")
+        c.showPage()
+    c.save()
+    buffer.seek(0)
+    return PdfReader(buffer)
+
+
+def merge_pdfs(parts, number_pages=True):
+    """Склейка частей в один PDF и сквозная нумерация страниц."""
+    writer = PdfWriter()
+    for part in parts:
+        for page in PdfReader(BytesIO(part)).pages:
+            writer.add_page(page)
+
+    if number_pages and writer.pages:
+        first = writer.pages[0].mediabox
+        width, height = float(first.width or A4[0]), float(first.height or A4[1])
+        overlay = _page_number_overlay(len(writer.pages), width, height)
+        for page, number_page in zip(writer.pages, overlay.pages):
+            page.merge_page(number_page)
+
+    out = BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def render_chunks(html_chunks, workers=None):
+    """Рендер кусков HTML (по процессам, если их больше одного) и склейка в один PDF."""
+    html_chunks = list(html_chunks)
+    workers = min(workers or default_workers(), len(html_chunks)) or 1
+    if workers == 1:
+        parts = [html_to_pdf_bytes(html) for html in html_chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(html_to_pdf_bytes, html_chunks))
+    return merge_pdfs(parts)
+
+
+def chunked(iterable, size):
+    """Разбиение итератора на списки по size элементов."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,155 @@
+# main_app/profiling.py
+"""
+Профилирование запросов: сколько SQL-запросов делает каждое представление,
+сколько времени уходит на БД, на рендер шаблона и весь ответ, какого
+размера ответ.
+
+ProfilingMiddleware замеряет долю PROFILING_SAMPLE_RATE запросов (SQL
+считается через connection.execute_wrapper), замеры копятся в памяти
+процесса — по последним PROFILING_WINDOW на представление — и выводятся
+сотрудникам на странице /profiling/ и в JSON (/profiling/json/).
+Время рендера известно только для TemplateResponse (классовые
+представления); у функций с render() оно входит во время представления.
+"""
+import random
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+from .benchmarks import percentile
+
+METRICS = ('queries', 'db_ms', 'render_ms', 'total_ms', 'size_kb')
+IGNORED_PREFIXES = ('/static/', '/media/', '/profiling/', '/favicon.ico')
+
+
+def sample_rate():
+    return getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+
+
+def window_size():
+    return getattr(settings, 'PROFILING_WINDOW', 500)
+
+
+class QueryTimer:
+    """Обертка для connection.execute_wrapper: число запросов и суммарное время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class ProfileStore:
+    """Скользящее окно замеров по каждому представлению (в памяти процесса)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def add(self, view, sample):
+        with self._lock:
+            window = self._samples.get(view)
+            if window is None or window.maxlen != window_size():
+                window = self._samples[view] = deque(window or (), maxlen=window_size())
+            window.append(sample)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        """{представление: {'runs', метрика: {'p50', 'p95', 'max'}}}, самые медленные сверху."""
+        with self._lock:
+            snapshot = {view: list(samples) for view, samples in self._samples.items()}
+        result = {}
+        for view, samples in snapshot.items():
+            row = {'runs': len(samples)}
+            for metric in METRICS:
+                values = [sample[metric] for sample in samples if sample[metric] is not None]
+                row[metric] = {
+                    'p50': round(percentile(values, 50), 2),
+                    'p95': round(percentile(values, 95), 2),
+                    'max': round(max(values, default=0.0), 2),
+                }
+            result[view] = row
+        return dict(sorted(result.items(), key=lambda item: item[1]['total_ms']['p95'], reverse=True))
+
+
+store = ProfileStore()
+
+
+class ProfilingMiddleware:
+    # Работает и под ASGI: синхронная прослойка заставила бы Django переключать асинхронные представления в поток
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled(request):
+            return self.get_response(request)
+        timer, started = QueryTimer(), self.start(request)
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        return self.finish(request, response, timer, started)
+
+    async def __acall__(self, request):
+        if not self.sampled(request):
+            return await self.get_response(request)
+        # Соединения с БД привязаны к потоку, а ORM асинхронных представлений работает в другом —
+        # execute_wrapper отсюда запросов не увидит, поэтому SQL под ASGI не считается
+        started = self.start(request)
+        response = await self.get_response(request)
+        return self.finish(request, response, None, started)
+
+    def sampled(self, request):
+        rate = sample_rate()
+        return bool(rate) and not request.path.startswith(IGNORED_PREFIXES) and random.random() < rate
+
+    def start(self, request):
+        request._profiling = {'render_ms': None}
+        return time.perf_counter()
+
+    def finish(self, request, response, timer, started):
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match and match.view_name else f"{request.method} {response.status_code}"
+        size = None if response.streaming else len(response.content) / 1024
+        store.add(view, {
+            'queries': timer.count if timer else None,
+            'db_ms': timer.duration * 1000 if timer else None,
+            'render_ms': request._profiling['render_ms'],
+            'total_ms': total * 1000,
+            'size_kb': size,
+        })
+        timing = f"db;dur={timer.duration * 1000:.1f}, " if timer else ''
+        response['Server-Timing'] = f"{timing}total;dur={total * 1000:.1f}"
+        return response
+
+    def process_template_response(self, request, response):
+        # Вызывается прямо перед render(): засекаем время до post_render_callback
+        profile = getattr(request, '_profiling', None)
+        if profile is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                profile['render_ms'] = (time.perf_counter() - started) * 1000
+            response.add_post_render_callback(rendered)
+        return response
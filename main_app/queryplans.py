@@ -0,0 +1,189 @@
+# main_app/queryplans.py
+"""
+Аудит индексов: планы основных запросов приложения (команда explain_queries).
+
+Запросы берутся из тех же функций, что и у представлений (списки с
+фильтрами и keyset-пагинацией, дашборд, поиск, сводная таблица отчетов,
+отбор для зачисления), а значения для условий — из текущих данных. Для
+каждого запроса выполняется EXPLAIN ANALYZE (на SQLite — EXPLAIN QUERY
+PLAN и отдельный замер времени) и из плана выбираются использованные
+индексы, полные просмотры таблиц и сортировки. На PostgreSQL можно
+дополнительно посмотреть счетчики pg_stat_user_indexes — какие индексы
+приложения не используются вовсе.
+"""
+import re
+import time
+
+from django.db import connection
+
+from . import reporting, search, stats
+from .enrollment import criteria_queryset
+from .models import Abiturient, Dogovor
+from .pagination import _after
+
+QUERIES = {}
+
+INDEX_PATTERNS = (
+    re.compile(r'Index (?:Only )?Scan(?: Backward)? using (\w+)'),  # PostgreSQL
+    re.compile(r'Bitmap Index Scan on (\w+)'),
+    re.compile(r'USING (?:COVERING )?INDEX (\w+)'),  # SQLite
+    re.compile(r'USING (INTEGER PRIMARY KEY)'),
+)
+FULL_SCAN_PATTERNS = (
+    re.compile(r'Seq Scan on (\w+)'),
+    re.compile(r'\bSCAN (\w+)(?! USING)\s*$', re.MULTILINE),
+)
+SORT_PATTERN = re.compile(r'^\W*Sort\b|USE TEMP B-TREE', re.MULTILINE)
+
+
+def canonical(name, description):
+    """Регистрирует запрос: функция получает образцы значений и возвращает QuerySet."""
+    def register(func):
+        QUERIES[name] = (description, func)
+        return func
+    return register
+
+
+def samples():
+    """Значения для условий из текущих данных (середина таблицы — типичная страница)."""
+    middle = Abiturient.objects.count() // 2
+    abit = Abiturient.objects.order_by('fio', 'pk').only('fio', 'search_fio')[middle:middle + 1].first()
+    middle = Dogovor.objects.count() // 2
+    dogovor = Dogovor.objects.order_by('date_of_conclusion', 'pk').only('date_of_conclusion')[middle:middle + 1].first()
+    specialnost = (Abiturient.objects.exclude(specialnost=None)
+                   .values_list('specialnost', flat=True).first())
+    return {
+        'term': (abit.search_fio.split() or ['иван'])[0][:4] if abit else 'иван',
+        'abiturient_cursor': [abit.fio, abit.pk] if abit else ['', 0],
+        'dogovor_cursor': [dogovor.date_of_conclusion, dogovor.pk] if dogovor else ['2000-01-01', 0],
+        'specialnost': specialnost or 0,
+    }
+
+
+# -----------------------------
+# Основные запросы
+# -----------------------------
+def _abiturient_filter(data):
+    from .views import AbiturientFilter
+    return AbiturientFilter(data).qs
+
+
+@canonical('list', 'Список абитуриентов: первая страница (ORDER BY fio, id)')
+def list_query(sample):
+    return Abiturient.objects.for_list()[:10]
+
+
+@canonical('list_status', 'Список абитуриентов: фильтр по статусу «студент»')
+def list_status_query(sample):
+    return _abiturient_filter({'status': 'student'})[:10]
+
+
+@canonical('list_specialnost', 'Список абитуриентов: фильтр по специальности')
+def list_specialnost_query(sample):
+    return _abiturient_filter({'specialnost': sample['specialnost']})[:10]
+
+
+@canonical('list_keyset', 'Список абитуриентов: страница по курсору из середины таблицы')
+def list_keyset_query(sample):
+    return Abiturient.objects.for_list().filter(_after(('fio', 'pk'), sample['abiturient_cursor']))[:11]
+
+
+@canonical('dogovor_list', 'Список договоров: страница по курсору (ORDER BY date_of_conclusion, id)')
+def dogovor_list_query(sample):
+    return Dogovor.objects.for_list().filter(_after(('date_of_conclusion', 'pk'), sample['dogovor_cursor']))[:11]
+
+
+@canonical('recent_students', 'Дашборд: последние зачисленные')
+def recent_students_query(sample):
+    return stats.recent_querysets()[stats.RECENT_STUDENTS]
+
+
+@canonical('recent_dogovors', 'Дашборд: последние договоры')
+def recent_dogovors_query(sample):
+    return stats.recent_querysets()[stats.RECENT_DOGOVORS]
+
+
+@canonical('search', 'Поиск абитуриентов (кроме отчисленных) по ФИО')
+def search_query(sample):
+    return search.abiturient_results(sample['term'])
+
+
+@canonical('search_dogovor', 'Поиск договоров по номеру или ФИО абитуриента')
+def search_dogovor_query(sample):
+    return search.dogovor_results(sample['term'])
+
+
+@canonical('report_abiturients', 'Сводная таблица: абитуриенты по специальности, статусу и месяцу')
+def report_abiturients_query(sample):
+    return reporting.abiturient_groups(Abiturient.objects.all())
+
+
+@canonical('report_dogovors', 'Сводная таблица: договоры по форме оплаты и месяцу')
+def report_dogovors_query(sample):
+    return reporting.dogovor_groups(Dogovor.objects.all())
+
+
+@canonical('enrollment', 'Массовое зачисление: абитуриенты специальности (или класса)')
+def enrollment_query(sample):
+    criteria = {'specialnost': sample['specialnost']} if sample['specialnost'] else {'class_of_entry': '9'}
+    return criteria_queryset(criteria).filter(status='abiturient').order_by('pk')
+
+
+# -----------------------------
+# Планы
+# -----------------------------
+class QueryPlan:
+    """План запроса и то, что из него следует для индексов."""
+
+    def __init__(self, name, description, text, elapsed_ms):
+        self.name = name
+        self.description = description
+        self.text = text
+        self.elapsed_ms = elapsed_ms
+        self.indexes = sorted({m for pattern in INDEX_PATTERNS for m in pattern.findall(text)})
+        self.full_scans = sorted({m for pattern in FULL_SCAN_PATTERNS for m in pattern.findall(text)})
+        self.sorts = bool(SORT_PATTERN.search(text))
+
+
+def explain(queryset, analyze=True):
+    """Текст плана и время выполнения в мс (None без analyze)."""
+    if connection.vendor == 'postgresql':
+        text = queryset.explain(analyze=analyze, buffers=analyze)
+        match = re.search(r'Execution Time: ([\d.]+) ms', text)
+        return text, float(match.group(1)) if match else None
+    text = queryset.explain()
+    if not analyze:
+        return text, None
+    # EXPLAIN ANALYZE в SQLite нет — время замеряем отдельным выполнением
+    started = time.perf_counter()
+    list(queryset)
+    return text, (time.perf_counter() - started) * 1000
+
+
+def run(names=None, analyze=True):
+    """Планы выбранных (по умолчанию всех) запросов."""
+    sample = samples()
+    plans = []
+    for name in names or QUERIES:
+        description, func = QUERIES[name]
+        text, elapsed = explain(func(sample), analyze)
+        plans.append(QueryPlan(name, description, text, elapsed))
+    return plans
+
+
+def refresh_statistics():
+    """ANALYZE таблиц приложения: планировщику нужны свежие оценки после загрузки данных."""
+    with connection.cursor() as cursor:
+        for model in (Abiturient, Dogovor):
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+
+def index_usage():
+    """Счетчики использования индексов main_app на PostgreSQL: (таблица, индекс, сканирований, байт)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname, indexrelname, idx_scan, pg_relation_size(indexrelid) "
+            "FROM pg_stat_user_indexes WHERE relname LIKE %s ORDER BY relname, idx_scan, indexrelname",
+            ['main\\_app\\_%'],
+        )
+        return cursor.fetchall()
@@ -0,0 +1,208 @@
+# main_app/reporting.py
+"""
+Сводная таблица для дашборда и отчетов (модель ReportSummary).
+
+Вместо GROUP BY по Abiturient и Dogovor на каждый запрос отчеты читают
+несколько сотен готовых строк: абитуриенты по специальности, статусу и
+месяцу зачисления, договоры по форме оплаты и месяцу заключения.
+
+Таблица поддерживается инкрементально: сигналы (signals.py) на каждое
+сохранение или удаление вычитают единицу из старой строки и прибавляют к
+новой в той же транзакции, что и само изменение. Массовые операции
+(bulk_create, update()) передают свои дельты в apply() сами. Полный
+пересчет — rebuild() (команда refresh_report_summary): на PostgreSQL
+читатели до фиксации видят прежние строки, а параллельные инкрементальные
+изменения ждут окончания пересчета и применяются поверх него.
+"""
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from .models import Abiturient, Dogovor, ReportSummary, Specialnost
+
+ABITURIENT = 'abiturient'
+DOGOVOR = 'dogovor'
+KEY_FIELDS = ('kind', 'specialnost_key', 'status', 'payment_form', 'year', 'month')
+CHART_KEY = 'reporting:chart:{year}'
+CHART_TIMEOUT = 60 * 60
+
+
+def abiturient_key(specialnost_id, status, enrollment_date):
+    year, month = (enrollment_date.year, enrollment_date.month) if enrollment_date else (0, 0)
+    return (ABITURIENT, specialnost_id or 0, status or '', '', year, month)
+
+
+def dogovor_key(payment_form, date_of_conclusion):
+    year, month = (date_of_conclusion.year, date_of_conclusion.month) if date_of_conclusion else (0, 0)
+    return (DOGOVOR, 0, '', payment_form or '', year, month)
+
+
+def stored_abiturient_key(pk):
+    """Ключ абитуриента по данным в БД (до сохранения изменений)."""
+    row = Abiturient.objects.filter(pk=pk).values_list('specialnost_id', 'status', 'enrollment_date').first()
+    return abiturient_key(*row) if row else None
+
+
+def stored_dogovor_key(pk):
+    row = Dogovor.objects.filter(pk=pk).values_list('payment_form', 'date_of_conclusion').first()
+    return dogovor_key(*row) if row else None
+
+
+def apply(deltas):
+    """Прибавляет дельты {ключ: число} к счетчикам; недостающие строки создаются."""
+    changed = False
+    # Строки обновляются в одном порядке, чтобы параллельные транзакции не блокировали друг друга
+    for key in sorted(key for key, delta in deltas.items() if delta):
+        delta = deltas[key]
+        lookup = dict(zip(KEY_FIELDS, key))
+        changed = True
+        if ReportSummary.objects.filter(**lookup).update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                ReportSummary.objects.create(count=delta, **lookup)
+        except IntegrityError:
+            # Строку только что создала соседняя транзакция
+            ReportSummary.objects.filter(**lookup).update(count=F('count') + delta)
+    if changed:
+        transaction.on_commit(invalidate_chart)
+
+
+def move(old_key, new_key):
+    """Перенос одной записи из строки old_key в new_key (None — нет строки)."""
+    if old_key == new_key:
+        return
+    deltas = Counter()
+    if old_key is not None:
+        deltas[old_key] -= 1
+    if new_key is not None:
+        deltas[new_key] += 1
+    apply(deltas)
+
+
+def forget_specialnost(pk):
+    """Специальность удаляется: ее абитуриенты переходят в «без специальности»."""
+    rows = ReportSummary.objects.filter(kind=ABITURIENT, specialnost_key=pk)
+    deltas = Counter()
+    for key in rows.values_list(*KEY_FIELDS, 'count'):
+        deltas[(key[0], 0) + key[2:-1]] += key[-1]
+    rows.delete()
+    apply(deltas)
+
+
+def abiturient_groups(abiturients):
+    return (
+        abiturients.order_by()
+        .annotate(y=ExtractYear('enrollment_date'), m=ExtractMonth('enrollment_date'))
+        .values_list('specialnost_id', 'status', 'y', 'm')
+        .annotate(n=Count('pk'))
+    )
+
+
+def dogovor_groups(dogovors):
+    return (
+        dogovors.order_by()
+        .annotate(y=ExtractYear('date_of_conclusion'), m=ExtractMonth('date_of_conclusion'))
+        .values_list('payment_form', 'y', 'm')
+        .annotate(n=Count('pk'))
+    )
+
+
+def compute():
+    """Счетчики с нуля: по одному GROUP BY на таблицу."""
+    counts = Counter()
+    for specialnost_id, status, year, month, n in abiturient_groups(Abiturient.objects.all()):
+        counts[(ABITURIENT, specialnost_id or 0, status or '', '', year or 0, month or 0)] += n
+    for payment_form, year, month, n in dogovor_groups(Dogovor.objects.all()):
+        counts[(DOGOVOR, 0, '', payment_form or '', year or 0, month or 0)] += n
+    return counts
+
+
+def rebuild():
+    """Полный пересчет таблицы в одной транзакции; возвращает число строк."""
+    with transaction.atomic():
+        # Сначала DELETE: он дождется транзакций, которые уже меняют счетчики,
+        # и GROUP BY после него увидит их данные
+        ReportSummary.objects.all().delete()
+        counts = compute()
+        ReportSummary.objects.bulk_create(
+            [ReportSummary(count=n, **dict(zip(KEY_FIELDS, key))) for key, n in counts.items() if n],
+            batch_size=1000,
+        )
+        transaction.on_commit(invalidate_chart)
+    return len(counts)
+
+
+def drift():
+    """Расхождения таблицы с живыми данными: {ключ: (в таблице, на самом деле)}."""
+    stored = Counter({
+        row[:-1]: row[-1] for row in ReportSummary.objects.values_list(*KEY_FIELDS, 'count')
+    })
+    actual = compute()
+    return {key: (stored[key], actual[key]) for key in set(stored) | set(actual) if stored[key] != actual[key]}
+
+
+# -----------------------------
+# Чтение
+# -----------------------------
+def report_data(year):
+    """Данные сводного отчета (dashboard_report): один запрос к сводной таблице."""
+    statuses = dict(Abiturient.STATUS_CHOICES)
+    payment_forms = dict(Dogovor.PAYMENT_FORMS)
+    by_status, by_specialnost, by_payment_form = Counter(), Counter(), Counter()
+    enrolled, concluded = [0] * 12, [0] * 12
+    total_dogovors = 0
+    for kind, specialnost_key, status, payment_form, row_year, month, n in (
+        ReportSummary.objects.filter(count__gt=0).values_list(*KEY_FIELDS, 'count')
+    ):
+        if kind == ABITURIENT:
+            by_status[status] += n
+            by_specialnost[specialnost_key] += n
+            if status == 'student' and row_year == year and month:
+                enrolled[month - 1] += n
+        else:
+            total_dogovors += n
+            by_payment_form[payment_form] += n
+            if row_year == year and month:
+                concluded[month - 1] += n
+
+    names = dict(Specialnost.objects.filter(pk__in=by_specialnost).values_list('pk', 'name'))
+    return {
+        'year': year,
+        'total_abiturients': sum(by_status.values()),
+        'total_students': by_status['student'],
+        'total_dogovors': total_dogovors,
+        'by_status': [(statuses.get(status, status), n) for status, n in by_status.most_common()],
+        'by_specialnost': sorted(
+            ((names.get(pk, 'Без специальности'), n) for pk, n in by_specialnost.items()),
+            key=lambda row: (-row[1], row[0]),
+        ),
+        'by_payment_form': [(payment_forms.get(form, form), n) for form, n in by_payment_form.most_common()],
+        'monthly_enrolled': enrolled,
+        'monthly_dogovors': concluded,
+    }
+
+
+def monthly_chart(year):
+    """Зачисления и договоры по месяцам года для графика на дашборде (кэшируется)."""
+    key = CHART_KEY.format(year=year)
+    chart = cache.get(key)
+    if chart is None:
+        enrolled, concluded = [0] * 12, [0] * 12
+        rows = ReportSummary.objects.filter(
+            Q(kind=DOGOVOR) | Q(kind=ABITURIENT, status='student'), year=year, month__gt=0,
+        ).values_list('kind', 'month', 'count')
+        for kind, month, n in rows:
+            (concluded if kind == DOGOVOR else enrolled)[month - 1] += n
+        chart = {'year': year, 'enrolled': enrolled, 'dogovors': concluded}
+        cache.set(key, chart, CHART_TIMEOUT)
+    return chart
+
+
+def invalidate_chart():
+    # На дашборде только текущий год; графики прошлых лет доживают свой таймаут
+    cache.delete(CHART_KEY.format(year=timezone.now().year))
@@ -0,0 +1,198 @@
+# main_app/reports.py
+import csv
+import tempfile
+from django.conf import settings
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.db.models import Count, Q
+from django.http import FileResponse, StreamingHttpResponse, JsonResponse, Http404
+from django.shortcuts import get_object_or_404, render
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from openpyxl import Workbook
+from . import jobs, pdf_engine, reporting
+from .models import Abiturient, Dogovor, ReportJob
+from .views import is_staff_check
+
+# Размер пачки строк, которые читаются из БД за один раз при выгрузке
+EXPORT_CHUNK_SIZE = 2000
+
+MONTHS = ['Январь', 'Февраль', 'Март', 'Апрель', 'Май', 'Июнь',
+          'Июль', 'Август', 'Сентябрь', 'Октябрь', 'Ноябрь', 'Декабрь']
+
+DOGOVOR_EXPORT_HEADERS = [
+    'Номер договора', 'Дата заключения', 'Абитуриент', 'Форма оплаты',
+    'Материнский капитал', 'Кредит', 'Родитель-заказчик',
+]
+
+def abiturient_report_context():
+    """Данные для отчета по абитуриентам"""
+    abiturients = Abiturient.objects.select_related('specialnost').only(
+        'fio', 'date_of_birth', 'class_of_entry', 'phone', 'specialnost__name'
+    )
+    counts = Abiturient.objects.order_by().aggregate(
+        total=Count('pk'),
+        class_9=Count('pk', filter=Q(class_of_entry='9')),
+        class_11=Count('pk', filter=Q(class_of_entry='11')),
+    )
+    return {
+        'abiturients': abiturients,
+        'total_count': counts['total'],
+        'by_class': {
+            '9': counts['class_9'],
+            '11': counts['class_11'],
+        },
+        'generated_date': timezone.now(),
+    }
+
+def abiturient_report_html_chunks(context, chunk_size=None):
+    """HTML отчета по кускам: первый с шапкой и сводкой, последний с подвалом"""
+    chunk_size = chunk_size or getattr(settings, 'REPORT_PDF_CHUNK_SIZE', 500)
+    template = get_template('main_app/reports/abiturient_report.html')
+    rows = context['abiturients'].iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    chunks = list(pdf_engine.chunked(rows, chunk_size)) or [[]]
+    for index, chunk in enumerate(chunks):
+        yield template.render({
+            **context,
+            'abiturients': chunk,
+            'continuation': index > 0,
+            'more_chunks': index < len(chunks) - 1,
+        })
+
+def render_abiturient_report():
+    """PDF-отчет по абитуриентам (bytes); куски рендерятся параллельно"""
+    context = abiturient_report_context()
+    return pdf_engine.render_chunks(
+        abiturient_report_html_chunks(context),
+        workers=getattr(settings, 'REPORT_PDF_WORKERS', None),
+    )
+
+jobs.register(
+    'abiturient_pdf',
+    render=render_abiturient_report,
+    version_keys=['abiturients'],
+    filename='abiturients_report.pdf',
+)
+
+def job_status_payload(job):
+    return {
+        'job_id': job.pk,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'error': job.error,
+        'status_url': reverse('report_job_status', args=[job.pk]),
+        'download_url': reverse('report_job_download', args=[job.pk]) if job.status == 'done' else None,
+    }
+
+def serve_report_file(job):
+    spec = jobs.REPORTS[job.kind]
+    return FileResponse(
+        job.file.open('rb'), as_attachment=True, filename=spec.filename, content_type=spec.content_type
+    )
+
+@login_required
+@user_passes_test(is_staff_check)
+def abiturient_report_pdf(request):
+    """Отчет по абитуриентам в PDF: готовый файл сразу, иначе задача в очереди"""
+    job = jobs.request_report('abiturient_pdf', request.user)
+    if job.status == 'done':
+        return serve_report_file(job)
+    return JsonResponse(job_status_payload(job), status=202)
+
+@login_required
+@user_passes_test(is_staff_check)
+@require_GET
+def report_job_status(request, pk):
+    """Статус фоновой задачи формирования отчета"""
+    job = get_object_or_404(ReportJob, pk=pk)
+    return JsonResponse(job_status_payload(job))
+
+@login_required
+@user_passes_test(is_staff_check)
+@require_GET
+def report_job_download(request, pk):
+    """Скачивание готового отчета"""
+    job = get_object_or_404(ReportJob, pk=pk, status='done')
+    if not job.file or not job.file.storage.exists(job.file.name):
+        raise Http404("Файл отчета не найден")
+    return serve_report_file(job)
+
+def dogovor_export_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    """Строки выгрузки договоров; из БД читаются кортежи пачками, без моделей."""
+    payment_forms = dict(Dogovor.PAYMENT_FORMS)
+    rows = (
+        Dogovor.objects.order_by('pk')
+        .values_list(
+            'number', 'date_of_conclusion', 'abiturient__fio', 'payment_form',
+            'maternity_capital', 'credit', 'roditel_zakazchik__fio',
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    for number, date, abit_fio, payment_form, maternity_capital, credit, roditel_fio in rows:
+        yield [
+            number,
+            date,
+            abit_fio or '',
+            payment_forms.get(payment_form, payment_form),
+            'Да' if maternity_capital else 'Нет',
+            'Да' if credit else 'Нет',
+            roditel_fio or '',
+        ]
+
+
+def write_xlsx(fileobj, headers, rows, sheet_name):
+    """Запись в режиме write-only: openpyxl не держит лист в памяти."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    ws.append(headers)
+    for row in rows:
+        ws.append(row)
+    wb.save(fileobj)
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи."""
+    def write(self, value):
+        return value
+
+
+def stream_csv(headers, rows):
+    writer = csv.writer(Echo(), delimiter=';')
+    yield '\ufeff'  # BOM, чтобы Excel открыл UTF-8 с кириллицей
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+@login_required
+@user_passes_test(is_staff_check)
+def dogovor_report_excel(request):
+    """Отчет по договорам в Excel (или CSV при ?format=csv) потоковой выгрузкой"""
+    if request.GET.get('format') == 'csv':
+        response = StreamingHttpResponse(
+            stream_csv(DOGOVOR_EXPORT_HEADERS, dogovor_export_rows()),
+            content_type='text/csv; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'attachment; filename="dogovors_report.csv"'
+        return response
+
+    # Книга собирается во временном файле на диске и отдается кусками
+    tmp = tempfile.TemporaryFile()
+    write_xlsx(tmp, DOGOVOR_EXPORT_HEADERS, dogovor_export_rows(), 'Договоры')
+    tmp.seek(0)
+    return FileResponse(
+        tmp,
+        as_attachment=True,
+        filename='dogovors_report.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+@login_required
+@user_passes_test(is_staff_check)
+def dashboard_report(request):
+    """Сводный отчет по дашборду (из сводной таблицы, см. reporting.py)"""
+    year = timezone.now().year
+    context = reporting.report_data(year)
+    context['months'] = list(zip(MONTHS, context['monthly_enrolled'], context['monthly_dogovors']))
+    return render(request, 'main_app/reports/dashboard_report.html', context)
@@ -0,0 +1,112 @@
+# main_app/search.py
+"""
+Поиск абитуриентов и договоров для строки поиска на дашборде.
+
+На PostgreSQL фильтрация идет по нормализованным колонкам, покрытым
+GIN-индексами pg_trgm (см. миграцию 0006), а результаты ранжируются
+по триграммному сходству. На SQLite (тесты) используется тот же фильтр
+без ранжирования — просто сортировка по ФИО.
+"""
+from django.db import connection
+from django.db.models import Q
+
+from .models import Abiturient, Dogovor
+from .utils import normalize_search_text, only_digits
+
+# Минимальное количество цифр в запросе, при котором ищем по телефону
+MIN_PHONE_DIGITS = 3
+
+
+def _use_trigram():
+    return connection.vendor == 'postgresql'
+
+
+def _rank(qs, field, term):
+    """Сортировка по сходству на PostgreSQL, иначе по полю."""
+    if _use_trigram():
+        from django.contrib.postgres.search import TrigramSimilarity
+        return qs.annotate(rank=TrigramSimilarity(field, term)).order_by('-rank', field)
+    return qs.order_by(field)
+
+
+def abiturient_matches(q):
+    """Queryset абитуриентов под запрос (без ранжирования и среза) или None для пустого запроса."""
+    term = normalize_search_text(q)
+    if not term:
+        return None
+    condition = Q(search_fio__contains=term)
+    digits = only_digits(q)
+    if len(digits) >= MIN_PHONE_DIGITS:
+        condition |= Q(phone_digits__contains=digits)
+    return Abiturient.objects.filter(condition).exclude(status='expelled')
+
+
+def abiturient_results(q, limit=5):
+    """Ранжированный срез абитуриентов для подсказок или None для пустого запроса."""
+    qs = abiturient_matches(q)
+    if qs is None:
+        return None
+    qs = qs.only('id', 'fio', 'phone', 'status')
+    return _rank(qs, 'search_fio', normalize_search_text(q))[:limit]
+
+
+def search_abiturients(q, limit=5):
+    """Абитуриенты и студенты (кроме отчисленных) по ФИО или телефону."""
+    qs = abiturient_results(q, limit)
+    return [] if qs is None else list(qs)
+
+
+def dogovor_matches(q):
+    """Queryset договоров под запрос (без ранжирования и среза) или None для пустого запроса."""
+    term = normalize_search_text(q)
+    if not term:
+        return None
+    return Dogovor.objects.filter(Q(number__icontains=q.strip()) | Q(abiturient__search_fio__contains=term))
+
+
+def dogovor_results(q, limit=5):
+    qs = dogovor_matches(q)
+    if qs is None:
+        return None
+    qs = qs.select_related('abiturient').only('id', 'number', 'abiturient__fio')
+    return _rank(qs, 'abiturient__search_fio', normalize_search_text(q))[:limit]
+
+
+def search_dogovors(q, limit=5):
+    """Договоры по номеру или ФИО абитуриента."""
+    qs = dogovor_results(q, limit)
+    return [] if qs is None else list(qs)
+
+
+def abiturient_result(a):
+    return {
+        'id': a.id,
+        'fio': a.fio,
+        'phone': a.phone,
+        'status': a.get_status_display(),
+        'type': 'abiturient'
+    }
+
+
+def dogovor_result(d):
+    return {
+        'id': d.id,
+        'number': d.number,
+        'abiturient_fio': d.abiturient.fio if d.abiturient else '',
+        'type': 'dogovor'
+    }
+
+
+def search_all(q, limit=5):
+    """Результаты в формате JSON-ответа search_students."""
+    return ([abiturient_result(a) for a in search_abiturients(q, limit)]
+            + [dogovor_result(d) for d in search_dogovors(q, limit)])
+
+
+async def asearch_all(q, limit=5):
+    """search_all для асинхронного представления: те же запросы через async-итерацию ORM."""
+    abiturients, dogovors = abiturient_results(q, limit), dogovor_results(q, limit)
+    if abiturients is None:
+        return []
+    return ([abiturient_result(a) async for a in abiturients]
+            + [dogovor_result(d) async for d in dogovors])
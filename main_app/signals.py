@@ -0,0 +1,258 @@
+# main_app/signals.py
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete, cards, filestore, fragments, news, reporting, stats, typeahead
+from .models import (
+    Abiturient, AbiturientRoditel, DataVersion, Document, Dogovor, News, Roditel, Specialnost, Zdorovie,
+)
+
+
+def on_commit(func, *args, **kwargs):
+    """Кэш трогаем только после фиксации транзакции, иначе другой запрос успеет закэшировать старые данные."""
+    transaction.on_commit(partial(func, *args, **kwargs))
+
+
+# -----------------------------
+# Статистика дашборда
+# -----------------------------
+@receiver(post_save, sender=Abiturient)
+def abiturient_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        on_commit(stats.invalidate_dashboard)
+        return
+    # Прежний статус неизвестен — счетчик студентов сбрасываем при любом сохранении
+    names = [stats.STUDENT_COUNT, stats.RECENT_ABITURIENTS, stats.RECENT_STUDENTS]
+    if created:
+        names.append(stats.ABITURIENT_COUNT)
+    on_commit(stats.invalidate, *names)
+
+
+@receiver(post_delete, sender=Abiturient)
+def abiturient_deleted(sender, instance, **kwargs):
+    on_commit(stats.invalidate, stats.ABITURIENT_COUNT, stats.STUDENT_COUNT,
+              stats.RECENT_ABITURIENTS, stats.RECENT_STUDENTS)
+
+
+@receiver(post_save, sender=Dogovor)
+def dogovor_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        on_commit(stats.invalidate_dashboard)
+        return
+    if created:
+        on_commit(stats.invalidate, stats.DOGOVOR_COUNT, stats.RECENT_DOGOVORS)
+    else:
+        on_commit(stats.invalidate, stats.RECENT_DOGOVORS)
+
+
+@receiver(post_delete, sender=Dogovor)
+def dogovor_deleted(sender, instance, **kwargs):
+    on_commit(stats.invalidate, stats.DOGOVOR_COUNT, stats.RECENT_DOGOVORS)
+
+
+# -----------------------------
+# Версии данных (ключи готовых отчетов, см. jobs.py)
+# -----------------------------
+@receiver(post_save, sender=Abiturient)
+@receiver(post_delete, sender=Abiturient)
+@receiver(post_save, sender=Specialnost)
+@receiver(post_delete, sender=Specialnost)
+def abiturients_changed(sender, **kwargs):
+    on_commit(DataVersion.bump, 'abiturients')
+
+
+# -----------------------------
+# Подсказки поиска на дашборде (см. typeahead.py)
+# -----------------------------
+@receiver(post_save, sender=Abiturient)
+@receiver(post_delete, sender=Abiturient)
+@receiver(post_save, sender=Dogovor)
+@receiver(post_delete, sender=Dogovor)
+def search_data_changed(sender, **kwargs):
+    on_commit(typeahead.invalidate)
+
+
+# -----------------------------
+# Фрагменты дашборда и списков (см. fragments.py)
+# -----------------------------
+@receiver(post_save, sender=Abiturient)
+@receiver(post_delete, sender=Abiturient)
+@receiver(post_save, sender=Dogovor)
+@receiver(post_delete, sender=Dogovor)
+@receiver(post_save, sender=Specialnost)
+@receiver(post_delete, sender=Specialnost)
+def fragment_data_changed(sender, **kwargs):
+    on_commit(fragments.invalidate)
+
+
+# -----------------------------
+# Заметка на дашборде (см. news.py)
+# -----------------------------
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def news_changed(sender, **kwargs):
+    on_commit(news.refresh)
+
+
+# -----------------------------
+# Индекс автодополнения (см. autocomplete.py)
+# -----------------------------
+AUTOCOMPLETE_KINDS = {Abiturient: 'abiturient', Roditel: 'roditel', Specialnost: 'specialnost'}
+
+
+def autocomplete_label(instance):
+    if isinstance(instance, Specialnost):
+        return autocomplete.specialnost_label(instance.code, instance.name)
+    return instance.fio
+
+
+@receiver(post_save, sender=Abiturient)
+@receiver(post_save, sender=Roditel)
+@receiver(post_save, sender=Specialnost)
+def autocomplete_entry_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'fio', 'code', 'name'} & set(update_fields):
+        return
+    on_commit(autocomplete.update_entry, AUTOCOMPLETE_KINDS[sender], instance.pk, autocomplete_label(instance))
+
+
+@receiver(post_delete, sender=Abiturient)
+@receiver(post_delete, sender=Roditel)
+@receiver(post_delete, sender=Specialnost)
+def autocomplete_entry_deleted(sender, instance, **kwargs):
+    on_commit(autocomplete.update_entry, AUTOCOMPLETE_KINDS[sender], instance.pk)
+
+
+# -----------------------------
+# Карточки абитуриентов (см. cards.py)
+# -----------------------------
+@receiver(post_save, sender=Abiturient)
+@receiver(post_delete, sender=Abiturient)
+def card_abiturient_changed(sender, instance, **kwargs):
+    on_commit(cards.invalidate, instance.pk)
+
+
+@receiver(pre_save, sender=Zdorovie)
+@receiver(pre_save, sender=Document)
+@receiver(pre_save, sender=Dogovor)
+@receiver(pre_save, sender=AbiturientRoditel)
+def card_remember_old(sender, instance, update_fields=None, **kwargs):
+    # Договор (и любую часть карточки в админке) можно перенести к другому абитуриенту
+    instance._card_old = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and 'abiturient' not in update_fields:
+        return
+    instance._card_old = sender.objects.filter(pk=instance.pk).values_list('abiturient_id', flat=True).first()
+
+
+@receiver(post_save, sender=Zdorovie)
+@receiver(post_delete, sender=Zdorovie)
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+@receiver(post_save, sender=Dogovor)
+@receiver(post_delete, sender=Dogovor)
+@receiver(post_save, sender=AbiturientRoditel)
+@receiver(post_delete, sender=AbiturientRoditel)
+def card_part_changed(sender, instance, **kwargs):
+    old = getattr(instance, '_card_old', None)
+    if old is not None and old != instance.abiturient_id:
+        on_commit(cards.invalidate, old, instance.abiturient_id)
+    else:
+        on_commit(cards.invalidate, instance.abiturient_id)
+
+
+@receiver(post_save, sender=Roditel)
+def card_roditel_changed(sender, instance, created, **kwargs):
+    # У нового родителя еще нет связей; удаление родителя удаляет связи каскадом
+    if not created:
+        on_commit(cards.invalidate_where, parents=instance.pk)
+
+
+@receiver(post_save, sender=Specialnost)
+def card_specialnost_changed(sender, instance, created, **kwargs):
+    if not created:
+        on_commit(cards.invalidate_where, specialnost=instance.pk)
+
+
+@receiver(pre_delete, sender=Specialnost)
+def card_specialnost_deleted(sender, instance, **kwargs):
+    # Специальность у абитуриентов обнуляется UPDATE без сигналов — id собираем заранее
+    on_commit(cards.invalidate, *instance.abiturient_set.values_list('pk', flat=True))
+
+
+# -----------------------------
+# Сводная таблица отчетов (см. reporting.py): пишется в той же транзакции
+# -----------------------------
+SUMMARY_FIELDS = {
+    Abiturient: ({'specialnost', 'specialnost_id', 'status', 'enrollment_date'}, reporting.stored_abiturient_key),
+    Dogovor: ({'payment_form', 'date_of_conclusion'}, reporting.stored_dogovor_key),
+}
+
+
+def summary_key(instance):
+    if isinstance(instance, Abiturient):
+        return reporting.abiturient_key(instance.specialnost_id, instance.status, instance.enrollment_date)
+    return reporting.dogovor_key(instance.payment_form, instance.date_of_conclusion)
+
+
+@receiver(pre_save, sender=Abiturient)
+@receiver(pre_save, sender=Dogovor)
+def summary_remember_old(sender, instance, update_fields=None, **kwargs):
+    fields, stored_key = SUMMARY_FIELDS[sender]
+    instance._summary_old = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not fields & set(update_fields):
+        instance._summary_old = summary_key(instance)  # строка счетчика не меняется
+        return
+    instance._summary_old = stored_key(instance.pk)
+
+
+@receiver(post_save, sender=Abiturient)
+@receiver(post_save, sender=Dogovor)
+def summary_saved(sender, instance, **kwargs):
+    reporting.move(getattr(instance, '_summary_old', None), summary_key(instance))
+
+
+@receiver(pre_delete, sender=Abiturient)
+@receiver(pre_delete, sender=Dogovor)
+def summary_remember_deleted(sender, instance, **kwargs):
+    # Объект в памяти мог устареть (например, SET_NULL после удаления специальности)
+    instance._summary_old = SUMMARY_FIELDS[sender][1](instance.pk)
+
+
+@receiver(post_delete, sender=Abiturient)
+@receiver(post_delete, sender=Dogovor)
+def summary_deleted(sender, instance, **kwargs):
+    reporting.move(getattr(instance, '_summary_old', None), None)
+
+
+@receiver(pre_delete, sender=Specialnost)
+def summary_specialnost_deleted(sender, instance, **kwargs):
+    reporting.forget_specialnost(instance.pk)
+
+
+# -----------------------------
+# Ссылки на файлы сканов (см. filestore.py)
+# -----------------------------
+@receiver(pre_save, sender=Document)
+def scan_remember_old(sender, instance, **kwargs):
+    instance._scan_old = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._scan_old = Document.objects.filter(pk=instance.pk).values_list('scan', flat=True).first()
+
+
+@receiver(post_save, sender=Document)
+def scan_saved(sender, instance, **kwargs):
+    old, new = getattr(instance, '_scan_old', None) or '', instance.scan.name or ''
+    if old != new:
+        filestore.acquire(new)
+        filestore.release(old)
+
+
+@receiver(post_delete, sender=Document)
+def scan_deleted(sender, instance, **kwargs):
+    filestore.release(instance.scan.name)
@@ -0,0 +1,113 @@
+# main_app/stats.py
+"""
+Статистика для главной панели.
+
+Каждый показатель хранится в кэше под своим ключом, в который входит
+версия показателя. Счетчики считаются условной агрегацией (Count с
+filter=), списки «последних» записей — короткими выборками. При изменениях
+сигналы (см. signals.py) после фиксации транзакции меняют версию
+(invalidate()), и следующий запрос считает показатель заново.
+
+Версию читаем до подсчета: если транзакция зафиксируется, пока мы
+считаем, значение ляжет под старую версию, и его уже никто не прочтет.
+Поэтому ни incr, ни блокировки от бэкенда кэша не нужны. Массовые
+операции (bulk_create, update()) сигналов не шлют — после них нужно
+вызывать invalidate_dashboard().
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Abiturient, Dogovor
+
+KEY_PREFIX = 'dashboard:'
+VERSION_PREFIX = KEY_PREFIX + 'version:'
+ABITURIENT_COUNT = 'abiturient_count'
+STUDENT_COUNT = 'student_count'
+DOGOVOR_COUNT = 'dogovor_count'
+RECENT_ABITURIENTS = 'recent_abiturients'
+RECENT_DOGOVORS = 'recent_dogovors'
+RECENT_STUDENTS = 'recent_students'
+
+COUNTERS = (ABITURIENT_COUNT, STUDENT_COUNT, DOGOVOR_COUNT)
+RECENT_LISTS = (RECENT_ABITURIENTS, RECENT_DOGOVORS, RECENT_STUDENTS)
+RECENT_SIZE = 3
+
+
+def _version_key(name):
+    return VERSION_PREFIX + name
+
+
+def _key(name, version):
+    return f"{KEY_PREFIX}{name}:{version}"
+
+
+def _versions(names):
+    """Текущие версии показателей; недостающие заводятся через get_or_set (add под капотом)."""
+    found = cache.get_many([_version_key(name) for name in names])
+    return {
+        name: found.get(_version_key(name)) or cache.get_or_set(_version_key(name), time.time_ns, None)
+        for name in names
+    }
+
+
+def _timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60)
+
+
+def _compute_counters():
+    counters = Abiturient.objects.order_by().aggregate(**{
+        ABITURIENT_COUNT: Count('pk'),
+        STUDENT_COUNT: Count('pk', filter=Q(status='student')),
+    })
+    counters[DOGOVOR_COUNT] = Dogovor.objects.order_by().count()
+    return counters
+
+
+def recent_querysets():
+    return {
+        RECENT_ABITURIENTS: Abiturient.objects.order_by('-pk').values('pk', 'fio')[:RECENT_SIZE],
+        RECENT_DOGOVORS: Dogovor.objects.order_by('-pk').values('pk', 'number')[:RECENT_SIZE],
+        RECENT_STUDENTS: (
+            Abiturient.objects.filter(status='student')
+            .order_by('-enrollment_date').values('pk', 'fio')[:RECENT_SIZE]
+        ),
+    }
+
+
+def _compute_recent():
+    return {name: list(qs) for name, qs in recent_querysets().items()}
+
+
+def get_dashboard_stats():
+    """Все показатели дашборда: из кэша, а недостающие — из БД."""
+    names = COUNTERS + RECENT_LISTS
+    keys = {name: _key(name, version) for name, version in _versions(names).items()}
+    cached = cache.get_many(keys.values())
+    stats = {name: cached[key] for name, key in keys.items() if key in cached}
+
+    fresh = {}
+    if any(name not in stats for name in COUNTERS):
+        fresh.update(_compute_counters())
+    if any(name not in stats for name in RECENT_LISTS):
+        fresh.update(_compute_recent())
+    for name, value in fresh.items():
+        # add: значение под той же версией мог уже положить запрос, начавший считать позже
+        cache.add(keys[name], value, _timeout())
+    stats.update(fresh)
+
+    stats['has_any_search_data'] = bool(stats[ABITURIENT_COUNT] or stats[DOGOVOR_COUNT])
+    return stats
+
+
+def invalidate(*names):
+    """Новая версия показателей: прежние значения больше не читаются и истекут сами."""
+    version = time.time_ns()
+    cache.set_many({_version_key(name): version for name in names}, None)
+
+
+def invalidate_dashboard():
+    """Сброс всех показателей (после массовых операций без сигналов)."""
+    invalidate(*(COUNTERS + RECENT_LISTS))
@@ -1 +1,1158 @@
-from django.test import TestCase
\ No newline at end of file
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime, timezone
+from io import BytesIO, StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from openpyxl import load_workbook
+from PIL import Image
+from pypdf import PdfReader
+
+from validators import MAX_FILE_SIZE, RejectedUpload, UploadLimitHandler
+
+from . import (
+    autocomplete, backup, filestore, jobs, numbering, pdf_engine, profiling, queryplans, reporting, stats,
+    typeahead,
+)
+from .enrollment import enroll
+from .fastload import FastloadError, iter_json_array, load
+from .importers import AbiturientImporter, import_file
+from .models import (
+    Abiturient, AbiturientRoditel, ContractCounter, Document, Dogovor, EnrollmentBatch, News, Roditel,
+    Specialnost, StoredFile, Zdorovie,
+)
+from .pdf_engine import chunked
+from .utils import normalize_search_text, only_digits
+
+SAVEPOINT_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+def make_abiturient(fio='Иванов Иван Иванович', **kwargs):
+    """Создание абитуриента с заполненными обязательными полями."""
+    defaults = {
+        'date_of_birth': date(2008, 5, 1),
+        'class_of_entry': '9',
+        'phone': '+7 (900) 123-45-67',
+        'address': 'г. Москва',
+        'email': 'test@example.com',
+    }
+    defaults.update(kwargs)
+    return Abiturient.objects.create(fio=fio, **defaults)
+
+
+def app_queries(ctx):
+    """
+    Запросы из CaptureQueriesContext без работы кэша: при CACHE_BACKEND=db он
+    ходит в ту же БД (SELECT/INSERT по таблице кэша в точках сохранения).
+    """
+    cache_table = f'"{settings.CACHES["default"]["LOCATION"]}"'
+    return [
+        q['sql'] for q in ctx.captured_queries
+        if cache_table not in q['sql'] and not q['sql'].startswith(SAVEPOINT_STATEMENTS)
+    ]
+
+
+class StaffClientMixin:
+    """Авторизованный клиент с правами сотрудника."""
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.staff = User.objects.create_user('staff', password='pass-12345', is_staff=True)
+        self.client.force_login(self.staff)
+
+
+class TempMediaMixin:
+    """MEDIA_ROOT во временном каталоге; каталоги temp_dir() удаляются после теста."""
+    def setUp(self):
+        super().setUp()
+        override = self.settings(MEDIA_ROOT=self.temp_dir())
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def temp_dir(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        return path
+
+
+class QueryCountMixin:
+    """Проверка, что число SQL-запросов страницы не растет вместе с числом строк."""
+
+    def count_queries(self, url, **params):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertQueryCountConstant(self, url, add_rows, sizes=(1, 10)):
+        """add_rows(n) добавляет n строк; сравниваются страницы с разным числом строк."""
+        counts = []
+        created = 0
+        for size in sizes:
+            add_rows(size - created)
+            created = size
+            counts.append(self.count_queries(url))
+        self.assertEqual(
+            len(set(counts)), 1,
+            f"Число запросов к {url} растет с размером страницы: {dict(zip(sizes, counts))}"
+        )
+
+
+class SearchTests(StaffClientMixin, TestCase):
+    def test_normalization(self):
+        self.assertEqual(normalize_search_text('  Соловьёв   ПЁТР '), 'соловьев петр')
+        self.assertEqual(only_digits('+7 (900) 123-45-67'), '79001234567')
+
+    def test_search_fields_filled_on_save(self):
+        abit = make_abiturient('Фёдоров Артём')
+        self.assertEqual(abit.search_fio, 'федоров артем')
+        self.assertEqual(abit.phone_digits, '79001234567')
+
+    def test_search_folds_yo_and_phone(self):
+        abit = make_abiturient('Соловьёв Пётр', phone='8-916-555-00-11')
+        make_abiturient('Отчисленный Соловьёв', status='expelled')
+        Dogovor.objects.create(number='15-08-09.02.07-1', abiturient=abit)
+
+        response = self.client.get(reverse('search_students'), {'q': 'соловьев'})
+        results = response.json()['results']
+        self.assertEqual([r['fio'] for r in results if r['type'] == 'abiturient'], ['Соловьёв Пётр'])
+        self.assertEqual([r['number'] for r in results if r['type'] == 'dogovor'], ['15-08-09.02.07-1'])
+
+        response = self.client.get(reverse('search_students'), {'q': '916 555'})
+        self.assertEqual(response.json()['results'][0]['id'], abit.id)
+
+    def test_search_forbidden_for_non_staff(self):
+        User.objects.create_user('user', password='pass-12345')
+        self.client.login(username='user', password='pass-12345')
+        response = self.client.get(reverse('search_students'), {'q': 'иван'})
+        self.assertEqual(response.status_code, 403)
+
+
+class ListQueryCountTests(QueryCountMixin, StaffClientMixin, TestCase):
+    def add_abiturients(self, n):
+        for i in range(n):
+            make_abiturient(f'Абитуриент {i}')
+
+    def add_dogovors(self, n):
+        for i in range(n):
+            abit = make_abiturient(f'Заказчик {i}')
+            Dogovor.objects.create(number=f'N-{abit.pk}', abiturient=abit)
+
+    def test_abiturient_list(self):
+        self.assertQueryCountConstant(reverse('abiturient_list'), self.add_abiturients)
+
+    def test_dogovor_list(self):
+        self.assertQueryCountConstant(reverse('dogovor_list'), self.add_dogovors)
+
+    def test_abiturient_list_projection(self):
+        make_abiturient()
+        response = self.client.get(reverse('abiturient_list'))
+        abit = response.context['abiturients'][0]
+        self.assertEqual(abit.get_deferred_fields() & {'fio', 'phone'}, set())
+        self.assertIn('hobby', abit.get_deferred_fields())
+
+
+class KeysetPaginationTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # Одинаковые ФИО проверяют разрешение «ничьих» по pk
+        for i in range(23):
+            make_abiturient(f'Абитуриент {i % 7}')
+
+    def walk(self, params):
+        response = self.client.get(reverse('abiturient_list'), params)
+        page = response.context['keyset_page']
+        return response, page, [a.pk for a in page]
+
+    def test_forward_and_backward(self):
+        expected = list(Abiturient.objects.order_by('fio', 'pk').values_list('pk', flat=True))
+        response, page, seen = self.walk({'paginate': 'keyset'})
+        self.assertEqual(response.context['total_count'], 23)
+        self.assertFalse(page.has_previous)
+        pages = [seen]
+        while page.has_next:
+            _, page, ids = self.walk({'paginate': 'keyset', 'cursor': page.next_cursor})
+            pages.append(ids)
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual([len(p) for p in pages], [10, 10, 3])
+
+        _, page, ids = self.walk({'paginate': 'keyset', 'cursor': page.previous_cursor, 'direction': 'prev'})
+        self.assertEqual(ids, pages[1])
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        _, page, ids = self.walk({'paginate': 'keyset', 'cursor': '%%%'})
+        self.assertEqual(len(ids), 10)
+        self.assertFalse(page.has_previous)
+
+    def test_empty_page_keeps_navigation(self):
+        _, page, first = self.walk({'paginate': 'keyset'})
+        cursor = page.next_cursor
+        # Курсор устарел: все записи после первой страницы удалили
+        Abiturient.objects.exclude(pk__in=first).delete()
+
+        response, page, ids = self.walk({'paginate': 'keyset', 'cursor': cursor})
+        self.assertEqual(ids, [])
+        self.assertTrue(page.has_previous)
+        self.assertContains(response, 'direction=prev')
+        self.assertContains(response, '&laquo;&laquo;')
+
+        _, page, ids = self.walk({'paginate': 'keyset', 'cursor': page.previous_cursor, 'direction': 'prev'})
+        self.assertEqual(ids, first[:-1])
+
+    def test_dogovor_keyset(self):
+        abit = Abiturient.objects.first()
+        for day in (3, 1, 2):
+            Dogovor.objects.create(number=f'K-{day}', abiturient=abit, date_of_conclusion=date(2025, 7, day))
+        response = self.client.get(reverse('dogovor_list'), {'paginate': 'keyset'})
+        self.assertEqual([d.number for d in response.context['dogovors']], ['K-1', 'K-2', 'K-3'])
+
+
+class DashboardStatsTests(StaffClientMixin, TestCase):
+    def dashboard(self):
+        return self.client.get(reverse('dashboard')).context
+
+    def test_served_from_cache(self):
+        make_abiturient()
+        self.dashboard()
+        with CaptureQueriesContext(connection) as ctx:
+            self.dashboard()
+        tables = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('main_app_', tables)
+
+    def test_signals_keep_counters_fresh(self):
+        context = self.dashboard()
+        self.assertEqual((context['abiturient_count'], context['student_count']), (0, 0))
+        self.assertFalse(context['has_any_search_data'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            abit = make_abiturient('Новый Студент', status='student')
+            Dogovor.objects.create(number='D-1', abiturient=abit)
+        context = self.dashboard()
+        self.assertEqual(
+            (context['abiturient_count'], context['student_count'], context['dogovor_count']), (1, 1, 1)
+        )
+        self.assertEqual([a['fio'] for a in context['recent_abiturients']], ['Новый Студент'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            abit.status = 'expelled'
+            abit.save()
+        self.assertEqual(self.dashboard()['student_count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            abit.delete()
+        context = self.dashboard()
+        self.assertEqual((context['abiturient_count'], context['dogovor_count']), (0, 0))
+        self.assertEqual(context['recent_dogovors'], [])
+
+    def test_count_taken_before_commit_is_not_cached(self):
+        compute = stats._compute_counters
+
+        def commit_during_count():
+            counters = compute()
+            # Другая транзакция фиксируется после подсчета, но до записи в кэш
+            make_abiturient()
+            stats.invalidate(stats.ABITURIENT_COUNT)
+            return counters
+
+        with mock.patch.object(stats, '_compute_counters', commit_during_count):
+            self.assertEqual(stats.get_dashboard_stats()['abiturient_count'], 0)
+        self.assertEqual(stats.get_dashboard_stats()['abiturient_count'], 1)
+
+
+class DogovorExportTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        abit = make_abiturient('Экспорт Тест')
+        Dogovor.objects.create(number='E-1', abiturient=abit, payment_form='yearly', credit=True)
+
+    def test_xlsx(self):
+        response = self.client.get(reverse('dogovor_report_excel'))
+        self.assertTrue(response.streaming)
+        ws = load_workbook(BytesIO(b''.join(response.streaming_content)))['Договоры']
+        rows = list(ws.iter_rows(values_only=True))
+        self.assertEqual(rows[0][0], 'Номер договора')
+        self.assertEqual(rows[1][0], 'E-1')
+        self.assertEqual(rows[1][2:6], ('Экспорт Тест', 'За год', 'Нет', 'Да'))
+
+    def test_csv(self):
+        response = self.client.get(reverse('dogovor_report_excel'), {'format': 'csv'})
+        body = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertIn('E-1;', body.splitlines()[1])
+
+
+class ReportJobTests(TempMediaMixin, StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_abiturient('Отчетов Иван')
+
+    def test_queue_and_cache_by_data_version(self):
+        url = reverse('abiturient_report_pdf')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        # Повторный запрос не плодит задачи
+        self.assertEqual(self.client.get(url).json()['job_id'], job_id)
+
+        self.assertEqual(jobs.run_pending(), 1)
+        status = self.client.get(reverse('report_job_status', args=[job_id])).json()
+        self.assertEqual(status['status'], 'done')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_abiturient('Новый Абитуриент')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(response.json()['job_id'], job_id)
+
+    def test_failed_file_save_marks_job_failed(self):
+        job_id = self.client.get(reverse('abiturient_report_pdf')).json()['job_id']
+        with mock.patch('django.core.files.storage.FileSystemStorage.save', side_effect=OSError('No space left')):
+            self.assertEqual(jobs.run_pending(), 1)
+        status = self.client.get(reverse('report_job_status', args=[job_id])).json()
+        self.assertEqual(status['status'], 'failed')
+
+
+class PdfEngineTests(TestCase):
+    def test_parallel_chunks_merged_with_page_numbers(self):
+        chunks = [f'<html><body><p>Part {n}</p></body></html>' for n in range(3)]
+        content = pdf_engine.render_chunks(chunks, workers=2)
+        pages = PdfReader(BytesIO(content)).pages
+        self.assertEqual(len(pages), 3)
+        self.assertIn('Part 2', pages[2].extract_text())
+        self.assertIn('3 / 3', pages[2].extract_text())
+
+    def test_chunked(self):
+        self.assertEqual([len(c) for c in chunked(range(1201), 500)], [500, 500, 201])
+
+
+class ImportAbiturientsTests(TestCase):
+    CSV = (
+        "fio;date_of_birth;class_of_entry;specialnost;phone;address;email;is_guardianship;"
+        "mother_fio;mother_phone;father_fio;father_phone;health_diseases;health_disability\n"
+        "Первый Иван;01.02.2008;9;09.02.07;+7 900 111-11-11;Москва;a@example.com;да;"
+        "Мать Общая;+7 (901) 000-00-01;;;астма;да\n"
+        "Второй Петр;2008-03-04;11;;+7 900 222-22-22;Москва;b@example.com;нет;"
+        "Мать Общая;8 901 000 00 01;Отец Старый;+7 902 000-00-02;;\n"
+        ";32.13.2008;5;Нет такой;;;not-an-email;;;;;;;\n"
+    )
+
+    def test_import_with_dedupe_and_errors(self):
+        spec = Specialnost.objects.create(name='Программирование', code='09.02.07')
+        old_father = Roditel.objects.create(fio='Отец Старый', phone='79020000002')
+
+        result = import_file(BytesIO(self.CSV.encode('utf-8')), 'data.csv', batch_size=1)
+
+        self.assertEqual((result.rows, result.created, result.parents_created), (3, 2, 1))
+        line, errors = result.errors[0]
+        self.assertEqual(line, 4)
+        self.assertTrue({'fio', 'date_of_birth', 'class_of_entry', 'specialnost', 'email'} <= set(errors))
+
+        first = Abiturient.objects.get(fio='Первый Иван')
+        self.assertEqual(first.specialnost, spec)
+        self.assertTrue(first.is_guardianship)
+        self.assertEqual(first.search_fio, 'первый иван')
+        self.assertTrue(first.health_info.disability)
+        second = Abiturient.objects.get(fio='Второй Петр')
+        self.assertFalse(second.is_guardianship)
+
+        mother_ids = set(AbiturientRoditel.objects.filter(relation_type='мать').values_list('roditel_id', flat=True))
+        self.assertEqual(len(mother_ids), 1)
+        self.assertEqual(
+            AbiturientRoditel.objects.get(abiturient=second, relation_type='отец').roditel, old_father
+        )
+
+    def test_caches_reset_when_later_batch_fails(self):
+        Specialnost.objects.create(name='Программирование', code='09.02.07')
+        write_batch = AbiturientImporter._write_batch
+        calls = []
+
+        def fail_second(importer, batch, result):
+            calls.append(len(batch))
+            if len(calls) == 2:
+                raise RuntimeError('диск заполнен')
+            write_batch(importer, batch, result)
+
+        with mock.patch.object(AbiturientImporter, '_write_batch', fail_second), \
+                self.captureOnCommitCallbacks() as callbacks, self.assertRaises(RuntimeError):
+            import_file(BytesIO(self.CSV.encode('utf-8')), 'data.csv', batch_size=1)
+        self.assertEqual(Abiturient.objects.count(), 1)
+        self.assertIn(typeahead.invalidate, callbacks)  # записанная пачка сбрасывает кэши
+
+    def test_admin_offers_full_error_report(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='pass-12345'))
+        upload = SimpleUploadedFile('data.csv', self.CSV.encode('utf-8'))
+        response = self.client.post(reverse('admin:main_app_abiturient_import'), {'file': upload, 'dry_run': 'on'})
+        token = response.context['errors_token']
+        response = self.client.get(reverse('admin:main_app_abiturient_import_errors', args=[token]))
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = response.content.decode('utf-8-sig').splitlines()
+        self.assertEqual(rows[0], 'Строка;Поле;Ошибка')
+        self.assertTrue(any(row.startswith('4;email;') for row in rows))
+
+    def test_dry_run_writes_nothing(self):
+        result = import_file(BytesIO(self.CSV.encode('utf-8')), 'data.csv', dry_run=True)
+        self.assertEqual(result.created, 0)
+        self.assertEqual(len(result.errors), 2)  # специальности 09.02.07 нет в базе
+        self.assertFalse(Abiturient.objects.exists())
+
+
+class BatchEnrollmentTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.spec = Specialnost.objects.create(name='Программирование', code='09.02.07')
+        self.abits = [make_abiturient(f'Абитуриент {i}', specialnost=self.spec) for i in range(5)]
+        self.expelled = make_abiturient('Отчисленный', specialnost=self.spec, status='expelled')
+        self.other = make_abiturient('Другая специальность', class_of_entry='11')
+
+    def test_single_update_with_audit(self):
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('enroll_batch') + '?format=json',
+                {'specialnost': self.spec.pk, 'group_rule': 'pattern', 'enrollment_date': '2026-09-01'},
+            )
+        data = response.json()
+        self.assertEqual((data['enrolled'], data['skipped']), (5, 1))
+        self.assertEqual(data['groups'], {'09.02.07-269': 5})
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "main_app_abiturient"')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(Abiturient.objects.filter(status='student', student_group='09.02.07-269').count(), 5)
+        self.assertEqual(Abiturient.objects.get(pk=self.expelled.pk).status, 'expelled')
+        self.assertEqual(Abiturient.objects.get(pk=self.other.pk).status, 'abiturient')
+
+        batch = EnrollmentBatch.objects.get(pk=data['batch_id'])
+        self.assertEqual(batch.created_by, self.staff)
+        self.assertEqual(sorted(batch.abiturient_ids), sorted(a.pk for a in self.abits))
+        self.assertEqual(self.client.get(reverse('dashboard')).context['student_count'], 5)
+
+    def test_ids_fixed_group_and_dry_run(self):
+        ids = f"{self.abits[0].pk}, {self.expelled.pk} 999999"
+        data = self.client.post(
+            reverse('enroll_batch') + '?format=json',
+            {'ids': ids, 'group_rule': 'fixed', 'group_value': 'ИС-1', 'dry_run': 'on'},
+        ).json()
+        self.assertEqual((data['enrolled'], data['skipped'], data['batch_id']), (1, 2, None))
+        self.assertFalse(Abiturient.objects.filter(status='student').exists())
+
+        self.client.post(reverse('enroll_batch'), {'ids': ids, 'group_rule': 'fixed', 'group_value': 'ИС-1'})
+        self.assertEqual(Abiturient.objects.get(pk=self.abits[0].pk).student_group, 'ИС-1')
+
+    def test_requires_criteria(self):
+        self.assertContains(self.client.get(reverse('enroll_batch')), 'Массовое зачисление')
+        response = self.client.post(reverse('enroll_batch') + '?format=json', {'group_rule': 'keep'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Abiturient.objects.filter(status='student').exists())
+
+
+class ProfilingTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        profiling.store.clear()
+
+    def test_records_queries_and_render_time(self):
+        make_abiturient()
+        with self.settings(PROFILING_SAMPLE_RATE=1.0):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse('abiturient_list'))
+            queries = len(ctx.captured_queries)
+            self.assertIn('db;dur=', response['Server-Timing'])
+            data = self.client.get(reverse('profiling_json')).json()
+
+        row = data['views']['abiturient_list']
+        self.assertEqual(row['runs'], 1)
+        self.assertEqual(row['queries']['max'], queries)
+        self.assertGreater(row['render_ms']['max'], 0)
+        self.assertGreater(row['size_kb']['max'], 0)
+        self.assertNotIn('profiling_json', data['views'])
+        self.assertContains(self.client.get(reverse('profiling_panel')), 'abiturient_list')
+
+    def test_sampling_off_and_staff_only(self):
+        with self.settings(PROFILING_SAMPLE_RATE=0):
+            response = self.client.get(reverse('abiturient_list'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.client.get(reverse('profiling_json')).json()['views'], {})
+
+        self.client.force_login(User.objects.create_user('plain', password='pass-12345'))
+        self.assertEqual(self.client.get(reverse('profiling_json')).status_code, 403)
+
+
+class TypeaheadTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        make_abiturient('Иванов Иван Иванович', phone='+7 900 111-22-33')
+        make_abiturient('Иваненко Петр Сергеевич', phone='+7 900 444-55-66')
+        make_abiturient('Петров Олег Иванович', phone='+7 900 777-88-99')
+
+    def suggest(self, q):
+        response = self.client.get(reverse('search_students_legacy'), {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [item['fio'] for item in response.json()['results']]
+
+    def test_longer_queries_filtered_from_cached_prefix(self):
+        self.assertEqual(len(self.suggest('ива')), 3)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.suggest('иване'), ['Иваненко Петр Сергеевич'])
+            self.assertEqual(self.suggest('иванов'), ['Иванов Иван Иванович', 'Петров Олег Иванович'])
+            self.assertEqual(self.suggest('ИВАНОВ   ИВ'), ['Иванов Иван Иванович'])
+        tables = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('main_app_abiturient', tables)
+
+        # Телефонного условия у префикса «ива» не было — за номером идем в БД
+        self.assertEqual(self.suggest('900 777'), ['Петров Олег Иванович'])
+
+    def test_invalidated_on_change_and_coalesced(self):
+        self.assertEqual(self.suggest('петров'), ['Петров Олег Иванович'])
+        with self.captureOnCommitCallbacks(execute=True):
+            make_abiturient('Петрова Анна Олеговна')
+        self.assertEqual(len(self.suggest('петров')), 2)
+
+        # Такой же запрос уже выполняется в другом процессе: ждем его результат, а не идем в БД
+        version = typeahead._version()
+        key = typeahead._key(version, 'сидоров')
+        cache.add(key + ':lock', 1)
+        cache.set(key, {'complete': True, 'abiturients': [], 'dogovors': []})
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(typeahead._load(version, 'сидоров')['abiturients'], [])
+        self.assertEqual(app_queries(ctx), [])
+
+
+class AutocompleteIndexTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        autocomplete._local.clear()
+        self.ivanov = make_abiturient('Иванов Иван Иванович')
+        self.petrov = make_abiturient('Петров Иван Сергеевич')
+        make_abiturient('Сидорова Алёна Петровна')
+
+    def complete(self, name, q='', **params):
+        response = self.client.get(reverse(name), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['text'] for item in response.json()['results']]
+
+    def test_word_prefix_lookup_served_from_index(self):
+        self.assertEqual(self.complete('abiturient-autocomplete', 'иван'), ['Иванов Иван Иванович', 'Петров Иван Сергеевич'])
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.complete('abiturient-autocomplete', 'иван петр'), ['Петров Иван Сергеевич'])
+            self.assertEqual(self.complete('abiturient-autocomplete', 'але'), ['Сидорова Алёна Петровна'])
+            self.assertEqual(len(self.complete('abiturient-autocomplete')), 3)
+        tables = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('main_app_abiturient', tables)
+
+    def test_signals_update_snapshot(self):
+        self.assertEqual(self.complete('abiturient-autocomplete', 'ив'), ['Иванов Иван Иванович', 'Петров Иван Сергеевич'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ivanov.fio = 'Смирнов Иван Иванович'
+            self.ivanov.save()
+            self.petrov.delete()
+            Specialnost.objects.create(name='Сетевое администрирование', code='09.02.06')
+            mother = Roditel.objects.create(fio='Смирнова Ольга', phone='1')
+            Roditel.objects.create(fio='Смирнова Анна', phone='2')
+            AbiturientRoditel.objects.create(abiturient=self.ivanov, roditel=mother, relation_type='мать')
+        self.assertEqual(self.complete('abiturient-autocomplete', 'ив'), ['Смирнов Иван Иванович'])
+        self.assertEqual(self.complete('specialnost-autocomplete', '09.02'), ['09.02.06 - Сетевое администрирование'])
+
+        forward = '{"abiturient": "%d"}' % self.ivanov.pk
+        self.assertEqual(self.complete('roditel-autocomplete', 'смир', forward=forward), ['Смирнова Ольга'])
+        self.assertEqual(len(self.complete('roditel-autocomplete', 'смир')), 2)
+
+    def test_saves_are_applied_to_local_index_in_place(self):
+        index = autocomplete.get_index('abiturient')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ivanov.fio = 'Смирнов Иван Иванович'
+            self.ivanov.save()
+            make_abiturient('Иванова Мария Петровна')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertIs(autocomplete.get_index('abiturient'), index)
+        self.assertEqual(app_queries(ctx), [])
+        self.assertEqual(
+            [str(e) for e in index.search('иван')],
+            ['Иванова Мария Петровна', 'Петров Иван Сергеевич', 'Смирнов Иван Иванович'],
+        )
+
+    def test_edit_committed_while_snapshot_is_built(self):
+        build = autocomplete._build_snapshot
+
+        def commit_during_build(kind):
+            snapshot = build(kind)
+            # Правка фиксируется после чтения БД, но до публикации снимка
+            Abiturient.objects.filter(pk=self.petrov.pk).update(fio='Кузнецов Иван Сергеевич')
+            autocomplete.update_entry(kind, self.petrov.pk, 'Кузнецов Иван Сергеевич')
+            return snapshot
+
+        with mock.patch.object(autocomplete, '_build_snapshot', commit_during_build):
+            autocomplete.get_index('abiturient')
+        autocomplete._local.clear()
+        self.assertEqual(self.complete('abiturient-autocomplete', 'кузн'), ['Кузнецов Иван Сергеевич'])
+
+
+class ContractNumberingTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        numbering.reset_pools()
+        self.spec = Specialnost.objects.create(name='Программирование', code='09.02.07')
+
+    def test_numbers_by_series_and_year(self):
+        abit = make_abiturient(specialnost=self.spec)
+        first = Dogovor.objects.create(abiturient=abit, date_of_conclusion=date(2026, 7, 1))
+        second = Dogovor.objects.create(abiturient=abit, date_of_conclusion=date(2026, 7, 1))
+        other_year = Dogovor.objects.create(abiturient=abit, date_of_conclusion=date(2027, 1, 10))
+        no_spec = Dogovor.objects.create(abiturient=make_abiturient('Без Специальности'))
+        manual = Dogovor.objects.create(number='РУЧНОЙ-1', abiturient=abit)
+
+        self.assertEqual([first.number, second.number, other_year.number],
+                         ['09.02.07-2026-0001', '09.02.07-2026-0002', '09.02.07-2027-0001'])
+        self.assertTrue(no_spec.number.startswith('00-'))
+        self.assertEqual(manual.number, 'РУЧНОЙ-1')
+
+    def test_reserve_consecutive_ranges(self):
+        self.assertEqual(numbering.reserve('X', 2026, 3), [1, 2, 3])
+        self.assertEqual(numbering.reserve('X', 2026, 2), [4, 5])
+        self.assertEqual(ContractCounter.objects.get(series='X', year=2026).last_number, 5)
+
+    def test_form_leaves_number_to_server(self):
+        abit = make_abiturient(specialnost=self.spec)
+        response = self.client.post(reverse('dogovor_create'), {
+            'number': '', 'date_of_conclusion': '2026-08-01', 'payment_form': 'monthly', 'abiturient': abit.pk,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Dogovor.objects.get().number, '09.02.07-2026-0001')
+
+
+@override_settings(CONTRACT_NUMBER_BATCH=5)
+class ContractNumberPoolTests(TransactionTestCase):
+    """Пачки номеров в памяти процесса: next_number вне транзакции."""
+
+    def setUp(self):
+        numbering.reset_pools()
+        self.addCleanup(numbering.reset_pools)
+
+    def test_one_reservation_per_batch(self):
+        with mock.patch.object(numbering, 'reserve', wraps=numbering.reserve) as reserve:
+            self.assertEqual([numbering.next_number('P', 2026) for _ in range(5)], [1, 2, 3, 4, 5])
+            reserve.assert_called_once_with('P', 2026, 5)
+            self.assertEqual(numbering.next_number('P', 2026), 6)
+            self.assertEqual(reserve.call_count, 2)
+        self.assertEqual(ContractCounter.objects.get(series='P', year=2026).last_number, 10)
+
+    def test_reset_pools_forgets_reserved_numbers(self):
+        self.assertEqual(numbering.next_number('P', 2026), 1)
+        numbering.reset_pools()
+        # 2..5 зарезервированы, но не выданы — это пропуск в нумерации
+        self.assertEqual(numbering.next_number('P', 2026), 6)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ContractNumberingConcurrencyTests(TransactionTestCase):
+    """Нагрузочная проверка: много потоков берут номера одновременно (нужен PostgreSQL)."""
+    THREADS = 16
+    PER_THREAD = 25
+
+    def test_no_duplicates_under_concurrency(self):
+        numbering.reset_pools()
+        issued, errors = [], []
+        lock = threading.Lock()
+        barrier = threading.Barrier(self.THREADS)
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(self.PER_THREAD):
+                    value = numbering.next_number('STRESS', 2026)
+                    with lock:
+                        issued.append(value)
+            except Exception as e:  # noqa: BLE001 — ошибку покажет assert ниже
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(issued), self.THREADS * self.PER_THREAD)
+        self.assertEqual(len(set(issued)), len(issued))
+
+
+class AbiturientFormQueryCountTests(StaffClientMixin, TestCase):
+    """Число запросов страницы редактирования не зависит от числа связанных форм."""
+
+    def setUp(self):
+        super().setUp()
+        self.spec = Specialnost.objects.create(name='Программирование', code='09.02.07')
+        self.abit = make_abiturient(specialnost=self.spec)
+        for fio, phone, relation in (('Мать', '1', 'мать'), ('Отец', '2', 'отец')):
+            parent = Roditel.objects.create(fio=fio, phone=phone)
+            AbiturientRoditel.objects.create(abiturient=self.abit, roditel=parent, relation_type=relation)
+        Zdorovie.objects.create(abiturient=self.abit)
+        self.url = reverse('abiturient_update', args=[self.abit.pk])
+
+    def post_data(self, **changes):
+        data = {
+            'fio': self.abit.fio, 'date_of_birth': '2008-05-01', 'class_of_entry': '9',
+            'specialnost': self.spec.pk, 'hobby': '', 'phone': self.abit.phone,
+            'address': self.abit.address, 'email': self.abit.email,
+            'mother-fio': 'Мать', 'mother-phone': '1', 'father-fio': 'Отец', 'father-phone': '2',
+            'health-diseases': '', 'health-restrictions': '', 'health-additional_info': '',
+            'documents-TOTAL_FORMS': '0', 'documents-INITIAL_FORMS': '0',
+            'documents-MIN_NUM_FORMS': '0', 'documents-MAX_NUM_FORMS': '1000',
+        }
+        data.update(changes)
+        return data
+
+    def test_get(self):
+        # сессия, пользователь, абитуриент + здоровье, родители, документы, специальности
+        with self.assertNumQueries(6):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['mother_form'].instance.fio, 'Мать')
+
+    def test_post_unchanged_writes_nothing(self):
+        with self.assertNumQueries(8):
+            response = self.client.post(self.url, self.post_data())
+        self.assertEqual(response.status_code, 302)
+
+    def test_post_changed_parent(self):
+        with self.assertNumQueries(9):
+            self.client.post(self.url, self.post_data(**{'father-phone': '22'}))
+        self.assertTrue(Roditel.objects.filter(fio='Отец', phone='22').exists())
+
+    def test_post_invalid_builds_forms_once(self):
+        with self.assertNumQueries(7):
+            response = self.client.post(self.url, self.post_data(email='bad'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_create(self):
+        # + строка сводной таблицы отчетов (reporting.py)
+        with self.assertNumQueries(12):
+            response = self.client.post(reverse('abiturient_create'), self.post_data(fio='Новый Абитуриент'))
+        self.assertEqual(response.status_code, 302)
+        created = Abiturient.objects.get(fio='Новый Абитуриент')
+        self.assertEqual(
+            sorted(AbiturientRoditel.objects.filter(abiturient=created).values_list('relation_type', flat=True)),
+            ['мать', 'отец'],
+        )
+        self.assertTrue(hasattr(created, 'health_info'))
+
+
+class StudentCardTests(StaffClientMixin, TestCase):
+    """Карточка абитуриента: один план запросов и кэш со сбросом по сигналам."""
+
+    def setUp(self):
+        super().setUp()
+        self.spec = Specialnost.objects.create(name='Программирование', code='09.02.07')
+        self.abit = make_abiturient(specialnost=self.spec)
+        self.parent = Roditel.objects.create(fio='Иванова Мария', phone='1')
+        AbiturientRoditel.objects.create(abiturient=self.abit, roditel=self.parent, relation_type='мать')
+        Zdorovie.objects.create(abiturient=self.abit, diseases='нет')
+        Document.objects.create(abiturient=self.abit, type='package')
+        self.dogovor = Dogovor.objects.create(abiturient=self.abit, number='D-1')
+        self.url = reverse('abiturient_detail', args=[self.abit.pk])
+        cache.clear()
+
+    def test_cold_and_warm(self):
+        # сессия, пользователь, абитуриент + специальность + здоровье, родители, документы, договоры
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(len(app_queries(ctx)), 6)
+        self.assertContains(response, 'Иванова Мария')
+        self.assertContains(response, 'D-1')
+        # из кэша: только сессия и пользователь
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(len(app_queries(ctx)), 2)
+        self.assertContains(response, '09.02.07')
+
+    def test_missing(self):
+        response = self.client.get(reverse('abiturient_detail', args=[self.abit.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalidated_on_related_changes(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dogovor.number = 'D-2'
+            self.dogovor.save()
+        self.assertContains(self.client.get(self.url), 'D-2')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.parent.fio = 'Петрова Мария'
+            self.parent.save()
+        self.assertContains(self.client.get(self.url), 'Петрова Мария')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.abit.health_info.diseases = 'астма'
+            self.abit.health_info.save()
+        self.assertContains(self.client.get(self.url), 'астма')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.spec.code = '09.02.08'
+            self.spec.save()
+        self.assertContains(self.client.get(self.url), '09.02.08')
+
+    def test_invalidated_for_both_abiturients_when_dogovor_moves(self):
+        other = make_abiturient('Петров Петр Петрович')
+        other_url = reverse('abiturient_detail', args=[other.pk])
+        self.assertContains(self.client.get(self.url), 'D-1')
+        self.assertNotContains(self.client.get(other_url), 'D-1')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dogovor.abiturient = other
+            self.dogovor.save()
+        self.assertNotContains(self.client.get(self.url), 'D-1')
+        self.assertContains(self.client.get(other_url), 'D-1')
+
+    def test_invalidated_when_parent_added_through_form(self):
+        self.assertNotContains(self.client.get(self.url), 'Иванов Петр')
+        data = {
+            'fio': self.abit.fio, 'date_of_birth': '2008-05-01', 'class_of_entry': '9',
+            'specialnost': self.spec.pk, 'hobby': '', 'phone': self.abit.phone,
+            'address': self.abit.address, 'email': self.abit.email,
+            'mother-fio': 'Иванова Мария', 'mother-phone': '1', 'father-fio': 'Иванов Петр', 'father-phone': '2',
+            'health-diseases': 'нет', 'health-restrictions': '', 'health-additional_info': '',
+            'documents-TOTAL_FORMS': '0', 'documents-INITIAL_FORMS': '0',
+            'documents-MIN_NUM_FORMS': '0', 'documents-MAX_NUM_FORMS': '1000',
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('abiturient_update', args=[self.abit.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertContains(self.client.get(self.url), 'Иванов Петр')
+
+
+class ReportSummaryTests(StaffClientMixin, TestCase):
+    """Сводная таблица отчетов совпадает с живыми данными после любых изменений."""
+
+    def assertNoDrift(self):
+        self.assertEqual(reporting.drift(), {})
+
+    def test_incremental_updates(self):
+        spec = Specialnost.objects.create(name='Дизайн', code='54.02.01')
+        abit = make_abiturient(specialnost=spec)
+        other = make_abiturient('Петров Петр', specialnost=spec)
+        dogovor = Dogovor.objects.create(number='D-1', abiturient=abit, date_of_conclusion=date(2026, 3, 1))
+        self.assertNoDrift()
+
+        abit.status = 'expelled'
+        abit.save()
+        dogovor.payment_form = 'yearly'
+        dogovor.save(update_fields=['payment_form'])
+        self.assertNoDrift()
+
+        enroll({'ids': [other.pk]}, enrollment_date=date(2026, 9, 1))
+        self.assertNoDrift()
+
+        spec.delete()
+        self.assertNoDrift()
+        abit.delete()  # вместе с договором
+        self.assertNoDrift()
+
+    def test_dashboard_report(self):
+        make_abiturient(status='student', enrollment_date=date(2026, 9, 1))
+        call_command('refresh_report_summary')
+        # сессия, пользователь, сводная таблица, названия специальностей
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('dashboard_report'))
+        self.assertEqual(response.context['total_students'], 1)
+        call_command('refresh_report_summary', '--check')
+
+
+@override_settings(DOCUMENT_SENDFILE='')
+class DocumentStorageTests(TempMediaMixin, StaffClientMixin, TestCase):
+    """Сканы: хранение по содержимому, подсчет ссылок, превью и отдача файла."""
+
+    def setUp(self):
+        super().setUp()
+        self.abit = make_abiturient()
+
+    def upload(self, content, name='scan.png'):
+        return Document.objects.create(abiturient=self.abit, type='package', scan=SimpleUploadedFile(name, content))
+
+    def png(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), 'white').save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def test_dedupe_and_refcount(self):
+        first = self.upload(b'%PDF-1.4 same', 'a.pdf')
+        second = self.upload(b'%PDF-1.4 same', 'b.PDF')
+        self.assertEqual(first.scan.name, second.scan.name)
+        self.assertRegex(first.scan.name, r'^documents/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+        self.assertEqual(StoredFile.objects.get().refcount, 2)
+
+        first.delete()
+        second.delete()
+        self.assertEqual(StoredFile.objects.get().refcount, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(filestore.collect_garbage(grace=-60), 1)
+        self.assertFalse(first.scan.storage.exists(first.scan.name))
+
+    def test_thumbnail_and_serving(self):
+        doc = self.upload(self.png())
+        self.assertEqual(filestore.run_pending(), 1)
+        response = self.client.get(reverse('document_thumbnail', args=[doc.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+        url = reverse('document_scan', args=[doc.pk])
+        response = self.client.get(url, HTTP_RANGE='bytes=0-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'\x89PNG')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        with self.settings(DOCUMENT_SENDFILE='nginx'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/' + doc.scan.name)
+
+
+class UploadValidationTests(StaffClientMixin, TestCase):
+    """Сканы проверяются по сигнатуре и размеру еще во время загрузки."""
+
+    def test_handler_stops_buffering(self):
+        handler = UploadLimitHandler()
+        handler.new_file('documents-0-scan', 'big.pdf', 'application/pdf', None)
+        chunk = b'%PDF-1.7' + b'0' * (64 * 1024 - 8)
+        passed = 0
+        for start in range(0, MAX_FILE_SIZE + 10 * len(chunk), len(chunk)):
+            if handler.receive_data_chunk(chunk, start) is not None:
+                passed += 1
+        self.assertLessEqual(passed * len(chunk), MAX_FILE_SIZE)
+        self.assertIsInstance(handler.file_complete(0), RejectedUpload)
+
+        handler.new_file('documents-0-scan', 'fake.pdf', 'application/pdf', None)
+        self.assertIsNone(handler.receive_data_chunk(b'MZ' + b'\0' * 100, 0))
+
+        handler.new_file('file', 'import.csv', 'text/csv', None)
+        self.assertEqual(handler.receive_data_chunk(b'fio;phone', 0), b'fio;phone')
+        self.assertIsNone(handler.file_complete(9))
+
+    def test_fake_pdf_rejected_in_form(self):
+        abit = make_abiturient()
+        data = {
+            'fio': abit.fio, 'date_of_birth': '2008-05-01', 'class_of_entry': '9',
+            'phone': abit.phone, 'address': abit.address, 'email': abit.email,
+            'documents-TOTAL_FORMS': '1', 'documents-INITIAL_FORMS': '0',
+            'documents-MIN_NUM_FORMS': '0', 'documents-MAX_NUM_FORMS': '1000',
+            'documents-0-type': 'package',
+            'documents-0-scan': SimpleUploadedFile('scan.pdf', b'<html>not a pdf</html>'),
+        }
+        response = self.client.post(reverse('abiturient_update', args=[abit.pk]), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'не похоже на PDF')
+        self.assertFalse(Document.objects.exists())
+
+
+class BackupTests(TempMediaMixin, TestCase):
+    """Бэкап по таблицам в JSONL.gz и восстановление из него."""
+
+    def setUp(self):
+        super().setUp()
+        self.root = self.temp_dir()
+
+    def test_round_trip(self):
+        abit = make_abiturient(status='student', enrollment_date=date(2025, 9, 1))
+        created_at = datetime(2025, 6, 1, 12, 30, tzinfo=timezone.utc)
+        News.objects.filter(pk=News.objects.create(content='Прием открыт').pk).update(created_at=created_at)
+        Dogovor.objects.create(abiturient=abit, number='D-1', date_of_conclusion=date(2025, 8, 20), payment_form='yearly')
+        doc = Document.objects.create(abiturient=abit, type='package', scan=SimpleUploadedFile('a.pdf', b'%PDF-1.4 x'))
+
+        path = backup.create_backup(self.root, workers=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            abit.delete()
+        make_abiturient('Лишний Абитуриент')
+        os.remove(doc.scan.path)
+
+        second = backup.create_backup(self.root, workers=0)
+        self.assertNotEqual(path, second)
+        sha = os.path.splitext(os.path.basename(doc.scan.name))[0]
+        # Скан лежит в общем хранилище копий по хэшу содержимого, один раз
+        self.assertEqual(os.listdir(os.path.join(self.root, backup.MEDIA_STORE, sha[:2])), [sha])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            backup.restore_backup(path)
+        self.assertEqual(list(Abiturient.objects.values_list('fio', flat=True)), ['Иванов Иван Иванович'])
+        self.assertEqual(News.objects.get().created_at, created_at)  # auto_now_add не перезаписал дату
+        dogovor = Dogovor.objects.get()
+        self.assertEqual((dogovor.payment_form, dogovor.date_of_conclusion), ('yearly', date(2025, 8, 20)))
+        self.assertTrue(os.path.exists(Document.objects.get().scan.path))
+        self.assertEqual(reporting.drift(), {})
+        make_abiturient('Новый После Восстановления')  # последовательности не конфликтуют
+
+    def test_migration_mismatch(self):
+        path = backup.create_backup(self.root, workers=0, media=False)
+        with open(os.path.join(path, backup.MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest['migrations'].pop()
+        with open(os.path.join(path, backup.MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        with self.assertRaises(backup.BackupError):
+            backup.restore_backup(path)
+
+
+class FastloadTests(TestCase):
+    """Загрузка дампов dumpdata потоковым разбором и bulk_create."""
+
+    def test_stream_parser(self):
+        items = [{'model': 'main_app.specialnost', 'pk': i, 'fields': {'name': 'Дизайн, [ваб] {' * i}} for i in range(20)]
+        text = '[\n' + ',\n'.join(json.dumps(item, ensure_ascii=False) for item in items) + '\n]'
+        self.assertEqual(list(iter_json_array(StringIO(text), chunk_size=7)), items)
+        self.assertEqual(list(iter_json_array(StringIO(' [ ] '))), [])
+        with self.assertRaises(FastloadError):
+            list(iter_json_array(StringIO(text[:-2]), chunk_size=7))
+
+    def test_load_replaces_rows_and_rebuilds_derived_data(self):
+        abit = make_abiturient('Соловьёв Пётр', status='student', enrollment_date=date(2025, 9, 1))
+        Dogovor.objects.create(abiturient=abit, number='D-1', date_of_conclusion=date(2025, 8, 20))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'dump.json.gz')
+            call_command('dumpdata', 'main_app.abiturient', 'main_app.dogovor', output=path)
+            Abiturient.objects.filter(pk=abit.pk).update(fio='Изменен', search_fio='')
+            with self.captureOnCommitCallbacks(execute=True):
+                Dogovor.objects.all().delete()
+            result = load([path], batch_size=1)
+
+        self.assertEqual(dict(result.counts), {'main_app.abiturient': 1, 'main_app.dogovor': 1})
+        abit.refresh_from_db()
+        self.assertEqual((abit.fio, abit.search_fio), ('Соловьёв Пётр', 'соловьев петр'))
+        self.assertEqual(reporting.drift(), {})
+        self.assertEqual(Dogovor.objects.get().number, 'D-1')
+        make_abiturient('Следующий')  # последовательности сброшены
+
+    def test_natural_foreign_keys_to_objects_in_the_same_dump(self):
+        user = User.objects.create_user('abiturient-login')
+        make_abiturient(user=user)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'dump.json')
+            call_command('dumpdata', 'auth.user', 'main_app.abiturient', natural_foreign=True, output=path)
+            user.delete()  # вместе с абитуриентом (CASCADE)
+            result = load([path], batch_size=10)
+
+        self.assertEqual(result.counts['main_app.abiturient'], 1)
+        self.assertEqual(Abiturient.objects.get().user.username, 'abiturient-login')
+
+
+class AsyncAjaxTests(StaffClientMixin, TestCase):
+    """AJAX-эндпоинты — асинхронные представления (профиль ASGI)."""
+
+    async def test_endpoints(self):
+        def create():
+            spec = Specialnost.objects.create(code='09.02.07', name='Информационные системы')
+            abit = make_abiturient('Кузнецов Олег', specialnost=spec)
+            roditel = Roditel.objects.create(fio='Кузнецова Анна', phone='+7 900 000-00-01')
+            AbiturientRoditel.objects.create(abiturient=abit, roditel=roditel, relation_type='мать')
+            News.objects.create(content='Прием документов открыт')
+            return abit, roditel
+
+        abit, roditel = await sync_to_async(create)()
+        await self.async_client.aforce_login(self.staff)
+
+        response = await self.async_client.get(reverse('abit_info_ajax', args=[abit.pk]))
+        self.assertEqual(response.json()['spec_code'], '09.02.07')
+        response = await self.async_client.get(reverse('abit_info_ajax', args=[abit.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(reverse('parents_by_abiturient_ajax', args=[abit.pk]))
+        self.assertEqual(response.json()['parents'], [{'id': roditel.pk, 'fio': 'Кузнецова Анна'}])
+        response = await self.async_client.get(reverse('get_news'))
+        self.assertEqual(response.json()['content'], 'Прием документов открыт')
+        for name in ('search_students', 'search_students_legacy'):
+            response = await self.async_client.get(reverse(name), {'q': 'кузнец'})
+            self.assertEqual([row['fio'] for row in response.json()['results']], ['Кузнецов Олег'])
+
+    async def test_staff_only(self):
+        plain = await sync_to_async(User.objects.create_user)('plain', password='pass-12345')
+        await self.async_client.aforce_login(plain)
+        response = await self.async_client.get(reverse('search_students'), {'q': 'кузнец'})
+        self.assertEqual(response.status_code, 403)
+        await self.async_client.alogout()
+        response = await self.async_client.get(reverse('get_news'))
+        self.assertEqual(response.status_code, 302)
+
+
+class FragmentCacheTests(StaffClientMixin, TestCase):
+    """Фрагменты дашборда и списков берутся из кэша до изменения данных."""
+
+    def test_list_fragment_cached_per_params_and_version(self):
+        make_abiturient('Смирнов Павел')
+        url = reverse('abiturient_list')
+        self.client.get(url, {'status': 'abiturient', 'fio': 'Смирнов'})
+        with CaptureQueriesContext(connection) as ctx:
+            # Порядок параметров не важен
+            response = self.client.get(url, {'fio': 'Смирнов', 'status': 'abiturient'})
+        self.assertContains(response, 'Смирнов Павел')
+        self.assertNotIn('main_app_', ' '.join(q['sql'] for q in ctx.captured_queries))
+
+        self.client.get(url, {'fio': 'Смирнов'})
+        make_abiturient('Смирнова Ольга')  # без фиксации транзакции версия данных не меняется
+        self.assertNotContains(self.client.get(url, {'fio': 'Смирнов'}), 'Смирнова Ольга')
+        self.assertContains(self.client.get(url, {'fio': 'Смирнова'}), 'Смирнова Ольга')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_abiturient('Смирнов Игорь')
+        self.assertContains(self.client.get(url, {'fio': 'Смирнов'}), 'Смирнов Игорь')
+
+    def test_dashboard_fragment_keeps_user_parts_live(self):
+        self.client.get(reverse('dashboard'))
+        editor = User.objects.create_user('editor', password='pass-12345', is_staff=True)
+        self.client.force_login(editor)
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'editor')
+        self.assertContains(response, 'dashboardChartData')
+
+
+class NewsCacheTests(StaffClientMixin, TestCase):
+    """Заметка дашборда отдается из кэша с ETag; повторный запрос — 304."""
+
+    def test_conditional_get_and_replace_on_save(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('save_news'), {'content': 'Собрание в пятницу'})
+        response = self.client.get(reverse('get_news'))
+        self.assertEqual(response.json()['content'], 'Собрание в пятницу')
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('get_news'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertNotIn('main_app_news', ' '.join(q['sql'] for q in ctx.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('save_news'), {'content': 'Собрание перенесено'})
+        response = self.client.get(reverse('get_news'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['content'], 'Собрание перенесено')
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class QueryPlanTests(TestCase):
+    """Основные запросы идут по индексам из Meta.indexes (команда explain_queries)."""
+
+    def test_hot_filters_use_indexes(self):
+        for i in range(5):
+            make_abiturient(f'Абитуриент {i}', status='student' if i % 2 else 'abiturient')
+        plans = {plan.name: plan for plan in queryplans.run()}
+        self.assertEqual(set(plans), set(queryplans.QUERIES))
+        self.assertIn('abiturient_status_fio_idx', plans['list_status'].indexes)
+        self.assertIn('abiturient_status_enroll_idx', plans['recent_students'].indexes)
+        if connection.vendor == 'sqlite':
+            self.assertIn('abiturient_active_search_idx', plans['search'].indexes)
+
+        out = StringIO()
+        call_command('explain_queries', 'list', '--plans', stdout=out)
+        self.assertIn('abiturient_fio_id_idx', out.getvalue())
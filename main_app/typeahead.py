@@ -0,0 +1,174 @@
+# main_app/typeahead.py
+"""
+Подсказки для строки поиска на дашборде (search_students_legacy).
+
+Пока пользователь печатает фамилию, каждый следующий запрос продолжает
+предыдущий. Поэтому для нормализованного запроса в кэш на
+TYPEAHEAD_CACHE_TIMEOUT секунд кладется набор кандидатов (до
+TYPEAHEAD_CANDIDATES абитуриентов и договоров). Если набор полный (в него
+попали все совпадения), более длинный запрос отвечается фильтрацией этого
+набора в памяти, без обращения к БД. Одинаковые запросы, пришедшие
+одновременно, склеиваются: в БД идет первый, остальные ждут его результат
+в кэше.
+
+Ранжирование — по триграммному сходству (utils.trigram_similarity), как
+и в search.py на PostgreSQL. Кэш сбрасывается сигналами при изменении
+абитуриентов и договоров (invalidate()).
+"""
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Abiturient
+from .search import MIN_PHONE_DIGITS, _rank, abiturient_matches, dogovor_matches
+from .utils import normalize_search_text, only_digits, trigram_similarity
+
+KEY_PREFIX = 'typeahead:'
+VERSION_KEY = KEY_PREFIX + 'version'
+MIN_LENGTH = 2
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2.0
+
+
+def _timeout():
+    return getattr(settings, 'TYPEAHEAD_CACHE_TIMEOUT', 30)
+
+
+def _candidates_limit():
+    return getattr(settings, 'TYPEAHEAD_CANDIDATES', 500)
+
+
+def _version():
+    return cache.get_or_set(VERSION_KEY, time.time_ns, None)
+
+
+def _key(version, term):
+    # Запрос хэшируется: в ключах memcached/файлового кэша нельзя пробелы и длину больше 250
+    digest = hashlib.md5(term.encode('utf-8')).hexdigest()
+    return f"{KEY_PREFIX}{version}:{digest}"
+
+
+def invalidate():
+    """Сброс всех закэшированных подсказок (новая версия ключей)."""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def _has_phone_condition(term):
+    return len(only_digits(term)) >= MIN_PHONE_DIGITS
+
+
+def _fetch(term):
+    """Кандидаты для запроса из БД: два запроса, абитуриенты и договоры (без создания моделей)."""
+    limit = _candidates_limit()
+    statuses = dict(Abiturient.STATUS_CHOICES)
+    # Если совпадений больше limit, набор неполный — берем лучшие по рангу
+    abiturients = list(_rank(abiturient_matches(term), 'search_fio', term).values_list(
+        'id', 'fio', 'phone', 'status', 'search_fio', 'phone_digits',
+    )[:limit + 1])
+    dogovors = list(_rank(dogovor_matches(term), 'abiturient__search_fio', term).values_list(
+        'id', 'number', 'abiturient__fio', 'abiturient__search_fio',
+    )[:limit + 1])
+    return {
+        'complete': len(abiturients) <= limit and len(dogovors) <= limit,
+        'abiturients': [
+            (search_fio, phone_digits,
+             {'id': pk, 'fio': fio, 'phone': phone, 'status': statuses.get(status, status), 'type': 'abiturient'})
+            for pk, fio, phone, status, search_fio, phone_digits in abiturients[:limit]
+        ],
+        'dogovors': [
+            (normalize_search_text(number), search_fio or '',
+             {'id': pk, 'number': number, 'abiturient_fio': fio or '', 'type': 'dogovor'})
+            for pk, number, fio, search_fio in dogovors[:limit]
+        ],
+    }
+
+
+def _load(version, term):
+    """Кандидаты из кэша или из БД; параллельные одинаковые запросы ждут первый."""
+    key = _key(version, term)
+    lock = key + ':lock'
+    if cache.add(lock, 1, LOCK_TIMEOUT):
+        try:
+            entry = _fetch(term)
+            cache.set(key, entry, _timeout())
+        finally:
+            cache.delete(lock)
+        return entry
+
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.02)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return _fetch(term)
+
+
+def _lookup(term):
+    """Кандидаты для term: свой ключ, полный набор более короткого префикса или запрос в БД."""
+    version = _version()
+    prefixes = _prefixes(term)
+    cached = cache.get_many([_key(version, prefix) for prefix in prefixes])
+    return _cached_entry(cached, version, term, prefixes) or _load(version, term)
+
+
+def _cached_entry(cached, version, term, prefixes):
+    """Подходящий набор кандидатов среди уже прочитанных из кэша (или None)."""
+    for prefix in prefixes:
+        entry = cached.get(_key(version, prefix))
+        if entry is None:
+            continue
+        if prefix == term:
+            return entry
+        # Фильтровать в памяти можно только полный набор; телефонное условие
+        # у более короткого префикса должно уже действовать
+        if entry['complete'] and (_has_phone_condition(prefix) or not _has_phone_condition(term)):
+            return entry
+    return None
+
+
+def _prefixes(term):
+    return [term[:length] for length in range(len(term), MIN_LENGTH - 1, -1)]
+
+
+def _suggestions(entry, term, limit):
+    digits = only_digits(term) if _has_phone_condition(term) else None
+    abiturients = [
+        (trigram_similarity(search_fio, term), search_fio, payload)
+        for search_fio, phone_digits, payload in entry['abiturients']
+        if term in search_fio or (digits and digits in phone_digits)
+    ]
+    dogovors = [
+        (trigram_similarity(fio, term), fio, payload)
+        for number, fio, payload in entry['dogovors']
+        if term in number or term in fio
+    ]
+    abiturients.sort(key=lambda row: (-row[0], row[1]))
+    dogovors.sort(key=lambda row: (-row[0], row[1]))
+    return [row[2] for row in abiturients[:limit]] + [row[2] for row in dogovors[:limit]]
+
+
+def search(q, limit=5):
+    """Подсказки в формате search_all (до limit абитуриентов и limit договоров)."""
+    term = normalize_search_text(q)
+    if len(term) < MIN_LENGTH:
+        return []
+    return _suggestions(_lookup(term), term, limit)
+
+
+async def asearch(q, limit=5):
+    """search() для асинхронного представления; в поток уходит только промах кэша (_load)."""
+    term = normalize_search_text(q)
+    if len(term) < MIN_LENGTH:
+        return []
+    version = await cache.aget_or_set(VERSION_KEY, time.time_ns, None)
+    prefixes = _prefixes(term)
+    cached = await cache.aget_many([_key(version, prefix) for prefix in prefixes])
+    entry = _cached_entry(cached, version, term, prefixes)
+    if entry is None:
+        # Промах: запрос в БД и склейка одинаковых запросов — синхронный _load в потоке
+        entry = await sync_to_async(_load)(version, term)
+    return _suggestions(entry, term, limit)
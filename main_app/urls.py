@@ -11,12 +11,16 @@ from main_app.views import (
     AbiturientUpdateView, AbiturientDeleteView,
     DogovorListView, DogovorCreateView, DogovorDetailView, 
     DogovorUpdateView, DogovorDeleteView,
-    DocumentCreateView,
+    DocumentCreateView, document_scan, document_thumbnail,
     get_parents_by_abiturient_ajax, get_news, save_news,
     search_students, search_students_legacy,
     AbiturientAutocomplete, RoditelAutocomplete, SpecialnostAutocomplete,
     get_abit_info_ajax,
-    enroll_student 
+    enroll_student, enroll_batch,
+    profiling_panel, profiling_json
+)
+from main_app.reports import (
+    dogovor_report_excel, abiturient_report_pdf, report_job_status, report_job_download, dashboard_report
 )
 
 urlpatterns = [
@@ -56,6 +60,7 @@ urlpatterns = [
     path('abiturients/<int:pk>/edit/', AbiturientUpdateView.as_view(), name='abiturient_update'),
     path('abiturients/<int:pk>/delete/', AbiturientDeleteView.as_view(), name='abiturient_delete'),
     path('abiturients/<int:pk>/enroll/', enroll_student, name='enroll_student'),  
+    path('abiturients/enroll/', enroll_batch, name='enroll_batch'),
 
     # Договоры
     path('dogovors/', DogovorListView.as_view(), name='dogovor_list'),
@@ -65,8 +70,21 @@ urlpatterns = [
     path('dogovors/<int:pk>/edit/', DogovorUpdateView.as_view(), name='dogovor_update'),
     path('dogovors/<int:pk>/delete/', DogovorDeleteView.as_view(), name='dogovor_delete'),
 
+    # Отчеты
+    path('reports/dogovors/excel/', dogovor_report_excel, name='dogovor_report_excel'),
+    path('reports/abiturients/pdf/', abiturient_report_pdf, name='abiturient_report_pdf'),
+    path('reports/dashboard/', dashboard_report, name='dashboard_report'),
+    path('reports/jobs/<int:pk>/', report_job_status, name='report_job_status'),
+    path('reports/jobs/<int:pk>/download/', report_job_download, name='report_job_download'),
+
+    # Профилирование
+    path('profiling/', profiling_panel, name='profiling_panel'),
+    path('profiling/json/', profiling_json, name='profiling_json'),
+
     # Документы
     path('documents/new/', DocumentCreateView.as_view(), name='document_create'),
+    path('documents/<int:pk>/scan/', document_scan, name='document_scan'),
+    path('documents/<int:pk>/thumbnail/', document_thumbnail, name='document_thumbnail'),
 
     # AJAX / API
     path('api/parents_by_abiturient/<int:abiturient_id>/', 
@@ -0,0 +1,53 @@
+# main_app/utils.py
+import re
+from functools import lru_cache
+
+_NON_DIGITS = re.compile(r'\D+')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_search_text(value):
+    """Нормализация строки для поиска: нижний регистр, ё→е, схлопывание пробелов."""
+    if not value:
+        return ''
+    value = value.lower().replace('ё', 'е')
+    return _SPACES.sub(' ', value).strip()
+
+
+def only_digits(value):
+    """Оставляет в строке только цифры (для поиска по телефону)."""
+    if not value:
+        return ''
+    return _NON_DIGITS.sub('', value)
+
+
+def phone_key(value):
+    """Ключ телефона для сравнения: цифры, российские 8XXXXXXXXXX и XXXXXXXXXX приводятся к 7XXXXXXXXXX."""
+    digits = only_digits(value)
+    if len(digits) == 11 and digits.startswith('8'):
+        return '7' + digits[1:]
+    if len(digits) == 10:
+        return '7' + digits
+    return digits
+
+
+_WORDS = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=8192)
+def trigrams(value):
+    """Множество триграмм строки по правилам pg_trgm (слова дополняются пробелами: '  w', 'w ')."""
+    result = set()
+    for word in _WORDS.findall(value.lower()):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(result)
+
+
+def trigram_similarity(a, b):
+    """Аналог similarity() из pg_trgm: доля общих триграмм."""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    shared = len(ta & tb)
+    return shared / (len(ta) + len(tb) - shared)
@@ -1,5 +1,7 @@
 # main_app/views.py
-from django.shortcuts import render, redirect, get_object_or_404
+from functools import partial
+
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.urls import reverse_lazy
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
@@ -12,22 +14,32 @@ from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.views import LoginView
 from django.db import transaction
-from django.db.models import Q
-from django.http import JsonResponse, HttpResponseForbidden
+from django.db.models import Prefetch
+from django.http import Http404, JsonResponse, HttpResponseForbidden
 from django import forms
 from dal_select2.views import Select2QuerySetView 
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
 # Импорты моделей
 from .models import (
-    Abiturient, Dogovor, Document, Roditel, Specialnost,
-    Zdorovie, AbiturientRoditel, News
+    Abiturient, Dogovor, Document,
+    Zdorovie, AbiturientRoditel, News, StoredFile
 )
 # Импорты форм
 from .forms import (
     AbiturientForm, RoditelForm, DocumentForm,
-    DogovorForm, CustomAuthForm, ZdorovieForm
+    DogovorForm, CustomAuthForm, ZdorovieForm, BatchEnrollmentForm
 )
+# Поиск и пагинация
+from .search import asearch_all
+from .pagination import KeysetPaginationMixin
+from .fragments import FragmentCacheMixin, cached_fragment
+from .stats import get_dashboard_stats
+from .enrollment import EnrollmentError, enroll
+from .news import acurrent_news
+from . import autocomplete, cards, filestore, profiling, reporting, typeahead
 
 # -----------------------------
 # Вспомогательные функции и миксины
@@ -73,16 +85,15 @@ def logout_view(request):
 @login_required
 @user_passes_test(is_staff_check)
 def dashboard(request):
-    context = {
-        'abiturient_count': Abiturient.objects.count(),
-        'student_count': Abiturient.objects.filter(status='student').count(),
-        'dogovor_count': Dogovor.objects.count(),
-        'recent_abiturients': Abiturient.objects.all().order_by('-pk')[:3],
-        'recent_dogovors': Dogovor.objects.all().order_by('-pk')[:3],
-        'recent_students': Abiturient.objects.filter(status='student').order_by('-enrollment_date')[:3],
-        'has_any_search_data': Abiturient.objects.exists() or Dogovor.objects.exists(), 
-    }
-    return render(request, 'main_app/dashboard.html', context)
+    # Карточки и график — готовым фрагментом из кэша (fragments.py); при промахе счетчики
+    # и последние записи берутся из кэша показателей (stats.py), график — из сводной таблицы (reporting.py)
+    fragment = cached_fragment(request, 'main_app/fragments/dashboard.html', dashboard_context)
+    return render(request, 'main_app/dashboard.html', {'fragment': fragment})
+
+def dashboard_context():
+    context = get_dashboard_stats()
+    context['chart'] = reporting.monthly_chart(timezone.now().year)
+    return context
 
 # -----------------------------
 # Список и фильтры абитуриентов
@@ -95,27 +106,33 @@ class AbiturientFilter(django_filters.FilterSet):
         model = Abiturient
         fields = ['fio', 'class_of_entry', 'specialnost', 'status']
 
-class AbiturientListView(LoginRequiredMixin, StaffRequiredMixin, FilterView):
+    def __init__(self, data=None, queryset=None, **kwargs):
+        if queryset is None:
+            queryset = Abiturient.objects.for_list()
+        super().__init__(data, queryset=queryset, **kwargs)
+
+class AbiturientListView(LoginRequiredMixin, StaffRequiredMixin, FragmentCacheMixin, KeysetPaginationMixin, FilterView):
     model = Abiturient
     paginate_by = 10
+    keyset_fields = ('fio', 'pk')
     filterset_class = AbiturientFilter
     template_name = 'main_app/abiturient_list.html'
+    fragment_template = 'main_app/fragments/abiturient_list.html'
     context_object_name = 'abiturients'
 
+    def get_queryset(self):
+        return Abiturient.objects.for_list()
+
 class AbiturientDetailView(LoginRequiredMixin, StaffRequiredMixin, DetailView):
     model = Abiturient
     template_name = 'main_app/abiturient_detail.html'
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['health_info'] = getattr(self.object, 'health_info', None)
-        context['documents'] = self.object.documents.all()
-        context['dogovors'] = self.object.dogovors.all()
-        
-        parent_relations = AbiturientRoditel.objects.filter(abiturient=self.object).select_related('roditel')
-        context['mother_info'] = next((r.roditel for r in parent_relations if r.relation_type.lower() == 'мать'), None)
-        context['father_info'] = next((r.roditel for r in parent_relations if r.relation_type.lower() == 'отец'), None)
-        return context
+    def get(self, request, *args, **kwargs):
+        # Карточка целиком из кэша; при промахе — один план запросов (см. cards.py)
+        card = cards.get_card(self.kwargs['pk'])
+        if card is None:
+            raise Http404("Абитуриент не найден")
+        return self.render_to_response({'card': card, 'view': self})
 
 # -----------------------------
 # Создание и редактирование абитуриентов
@@ -124,58 +141,102 @@ class AbiturientFormViewMixin(LoginRequiredMixin, StaffRequiredMixin):
     form_class = AbiturientForm
     template_name = 'main_app/abiturient_form.html'
     success_url = reverse_lazy('abiturient_list')
+    PARENT_FORMS = (('mother', 'мать'), ('father', 'отец'))
+
+    def get_queryset(self):
+        # Здоровье — JOIN-ом, родители с их связями — одним prefetch-запросом
+        return Abiturient.objects.select_related('health_info').prefetch_related(
+            Prefetch('abiturientroditel_set', queryset=AbiturientRoditel.objects.select_related('roditel'))
+        )
+
+    def parent_links(self):
+        """{тип родства: связь AbiturientRoditel} из prefetch (без запросов)."""
+        links = {}
+        obj = getattr(self, 'object', None)
+        if obj is not None and obj.pk:
+            for link in obj.abiturientroditel_set.all():
+                links.setdefault(link.relation_type.lower(), link)
+        return links
+
+    def get_related_forms(self):
+        """Формы родителей, здоровья и документов; создаются один раз за запрос."""
+        if not hasattr(self, '_related_forms'):
+            obj = getattr(self, 'object', None)
+            links = self.parent_links()
+            data = self.request.POST if self.request.method == 'POST' else None
+            files = self.request.FILES if self.request.method == 'POST' else None
+            forms_ = {}
+            for prefix, relation in self.PARENT_FORMS:
+                link = links.get(relation)
+                forms_[f'{prefix}_form'] = RoditelForm(data, prefix=prefix, instance=link.roditel if link else None)
+            forms_['health_form'] = ZdorovieForm(data, prefix='health', instance=getattr(obj, 'health_info', None))
+            forms_['formset'] = DocumentFormSet(data, files, instance=obj)
+            self._related_forms = forms_
+        return self._related_forms
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        obj = getattr(self, 'object', None)
-        
-        mother_inst = father_inst = None
-        if obj:
-            m_rel = AbiturientRoditel.objects.filter(abiturient=obj, relation_type__iexact='мать').first()
-            f_rel = AbiturientRoditel.objects.filter(abiturient=obj, relation_type__iexact='отец').first()
-            if m_rel: mother_inst = m_rel.roditel
-            if f_rel: father_inst = f_rel.roditel
-
-        if self.request.method == 'POST':
-            context['mother_form'] = RoditelForm(self.request.POST, prefix='mother', instance=mother_inst)
-            context['father_form'] = RoditelForm(self.request.POST, prefix='father', instance=father_inst)
-            context['health_form'] = ZdorovieForm(self.request.POST, prefix='health', instance=getattr(obj, 'health_info', None))
-            context['formset'] = DocumentFormSet(self.request.POST, self.request.FILES, instance=obj)
-        else:
-            context['mother_form'] = RoditelForm(prefix='mother', instance=mother_inst)
-            context['father_form'] = RoditelForm(prefix='father', instance=father_inst)
-            context['health_form'] = ZdorovieForm(prefix='health', instance=getattr(obj, 'health_info', None))
-            context['formset'] = DocumentFormSet(instance=obj)
-        
+        context.update(self.get_related_forms())
         return context
 
+    def save_parents(self, abiturient, forms_):
+        """
+        Сохраняет только измененных родителей; новые связи — одним bulk_create.
+        Возвращает True, если что-то записано.
+        """
+        links = self.parent_links()
+        new_links = []
+        written = False
+        for prefix, relation in self.PARENT_FORMS:
+            r_form = forms_[f'{prefix}_form']
+            if not (r_form.cleaned_data.get('fio') or r_form.cleaned_data.get('phone')):
+                continue
+            if r_form.instance.pk is None or r_form.has_changed():
+                parent = r_form.save()
+                written = True
+            else:
+                parent = r_form.instance
+            link = links.get(relation)
+            if link is None:
+                new_links.append(AbiturientRoditel(abiturient=abiturient, roditel=parent, relation_type=relation))
+            elif link.roditel_id != parent.pk:
+                link.roditel = parent
+                link.save(update_fields=['roditel'])
+                written = True
+        if new_links:
+            AbiturientRoditel.objects.bulk_create(new_links)
+            written = True
+        return written
+
     def post(self, request, *args, **kwargs):
         self.object = self.get_object() if 'pk' in kwargs else None
-        context = self.get_context_data()
         form = self.get_form()
-        m_form = context['mother_form']
-        f_form = context['father_form']
-        h_form = context['health_form']
-        formset = context['formset']
+        forms_ = self.get_related_forms()
+        h_form = forms_['health_form']
+        formset = forms_['formset']
+
+        valid = [form.is_valid()] + [f.is_valid() for f in forms_.values()]
+        if not all(valid):
+            return self.render_to_response(self.get_context_data(form=form))
 
-        if all([form.is_valid(), m_form.is_valid(), f_form.is_valid(), h_form.is_valid(), formset.is_valid()]):
-            with transaction.atomic():
+        with transaction.atomic():
+            if self.object is None or form.has_changed():
                 abiturient = form.save()
-                for r_form, r_type in [(m_form, 'мать'), (f_form, 'отец')]:
-                    if r_form.cleaned_data.get('fio') or r_form.cleaned_data.get('phone'):
-                        parent = r_form.save()
-                        AbiturientRoditel.objects.update_or_create(
-                            abiturient=abiturient, relation_type=r_type, defaults={'roditel': parent}
-                        )
+            else:
+                abiturient = self.object
+            if self.save_parents(abiturient, forms_):
+                # bulk_create связей сигналов не шлет, а новый родитель карточку не сбрасывает (signals.py)
+                transaction.on_commit(partial(cards.invalidate, abiturient.pk))
+            # Запись о здоровье создается всегда, существующая — только при изменениях
+            if h_form.instance.pk is None or h_form.has_changed():
                 health = h_form.save(commit=False)
                 health.abiturient = abiturient
                 health.save()
-                formset.instance = abiturient
-                formset.save()
+            formset.instance = abiturient
+            formset.save()  # сохраняет только измененные формы
 
-            messages.success(request, "Данные успешно сохранены!")
-            return redirect(self.success_url)
-        return self.render_to_response(self.get_context_data(form=form))
+        messages.success(request, "Данные успешно сохранены!")
+        return redirect(self.success_url)
 
 class AbiturientCreateView(AbiturientFormViewMixin, CreateView):
     model = Abiturient
@@ -191,11 +252,16 @@ class AbiturientDeleteView(LoginRequiredMixin, StaffRequiredMixin, DeleteView):
 # ---------
 # Договоры
 # ---------
-class DogovorListView(LoginRequiredMixin, StaffRequiredMixin, ListView):
+class DogovorListView(LoginRequiredMixin, StaffRequiredMixin, FragmentCacheMixin, KeysetPaginationMixin, ListView):
     model = Dogovor
     template_name = 'main_app/dogovor_list.html'
+    fragment_template = 'main_app/fragments/dogovor_list.html'
     context_object_name = 'dogovors'
     paginate_by = 10
+    keyset_fields = ('date_of_conclusion', 'pk')
+
+    def get_queryset(self):
+        return Dogovor.objects.for_list()
 
 class DogovorDetailView(LoginRequiredMixin, StaffRequiredMixin, DetailView):
     model = Dogovor
@@ -247,6 +313,42 @@ def enroll_student(request, pk):
         messages.warning(request, f"{abiturient.fio} уже имеет статус {abiturient.get_status_display()}")
     return redirect('abiturient_detail', pk=pk)
 
+@login_required
+@user_passes_test(is_staff_check)
+def enroll_batch(request):
+    """Массовое зачисление по специальности/классу или списку id (см. enrollment.py)"""
+    wants_json = request.GET.get('format') == 'json'
+    form = BatchEnrollmentForm(request.POST or None)
+    summary = None
+    if request.method == 'POST':
+        if not form.is_valid():
+            if wants_json:
+                return JsonResponse({'success': False, 'errors': form.errors.get_json_data()}, status=400)
+            return render(request, 'main_app/enroll_batch.html', {'form': form})
+        try:
+            summary = enroll(
+                form.criteria(),
+                rule=form.cleaned_data['group_rule'],
+                group_value=form.cleaned_data['group_value'],
+                enrollment_date=form.cleaned_data['enrollment_date'],
+                user=request.user,
+                dry_run=form.cleaned_data['dry_run'],
+            )
+        except EnrollmentError as e:
+            if wants_json:
+                return JsonResponse({'success': False, 'errors': {'__all__': [{'message': str(e)}]}}, status=400)
+            form.add_error(None, str(e))
+            return render(request, 'main_app/enroll_batch.html', {'form': form})
+
+        batch = summary.pop('batch')
+        summary['batch_id'] = batch.pk if batch else None
+        summary['dry_run'] = form.cleaned_data['dry_run']
+        if wants_json:
+            return JsonResponse({'success': True, **summary})
+        if batch:
+            messages.success(request, f"Зачислено в студенты: {summary['enrolled']}, пропущено: {summary['skipped']}")
+    return render(request, 'main_app/enroll_batch.html', {'form': form, 'summary': summary})
+
 # --------------------
 # Документы и Новости
 # --------------------
@@ -259,10 +361,37 @@ class DocumentCreateView(LoginRequiredMixin, StaffRequiredMixin, CreateView):
         return reverse_lazy('abiturient_list')
 
 @login_required
-def get_news(request):
-    """Информация о новостях (доступна всем авторизованным)."""
-    news = News.objects.first()
-    return JsonResponse({'success': True, 'content': news.content if news else ""})
+@user_passes_test(is_staff_check)
+@require_GET
+def document_scan(request, pk):
+    """Скан документа (через веб-сервер при DOCUMENT_SENDFILE, см. filestore.py)."""
+    document = get_object_or_404(Document.objects.only('scan'), pk=pk)
+    return filestore.serve(request, document.scan.storage, document.scan.name)
+
+@login_required
+@user_passes_test(is_staff_check)
+@require_GET
+def document_thumbnail(request, pk):
+    """Превью скана; 404, пока фоновый обработчик его не построил."""
+    name = Document.objects.filter(pk=pk).values_list('scan', flat=True).first()
+    stored = StoredFile.objects.filter(name=name, thumbnail_status='done').first() if name else None
+    if stored is None:
+        raise Http404("Превью нет")
+    return filestore.serve(request, stored.thumbnail.storage, stored.thumbnail.name)
+
+@login_required
+async def get_news(request):
+    """Информация о новостях (доступна всем авторизованным); из кэша, повторный запрос — 304."""
+    current = await acurrent_news()
+    response = get_conditional_response(request, etag=current['etag'], last_modified=current['last_modified'])
+    if response is None:
+        response = JsonResponse({'success': True, 'content': current['content']})
+    response.headers['ETag'] = current['etag']
+    if current['last_modified']:
+        response.headers['Last-Modified'] = http_date(current['last_modified'])
+    # Браузер хранит ответ, но каждый раз сверяет ETag (fetch сам отправляет If-None-Match)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 @login_required
 @require_POST
@@ -281,83 +410,89 @@ def save_news(request):
 # -----------------------
 @login_required
 @require_GET
-def search_students(request):
-    if not request.user.is_staff:
+async def search_students(request):
+    user = await request.auser()
+    if not user.is_staff:
         return JsonResponse({'results': [], 'error': 'Forbidden'}, status=403)
     
     q = request.GET.get('q', '').strip()
-    results = []
-    if q:
-        # Ищем абитуриентов и студентов (исключая отчисленных)
-        abits = Abiturient.objects.filter(
-            Q(fio__icontains=q) | Q(phone__icontains=q)
-        ).exclude(status='expelled')[:5]
-        for a in abits:
-            results.append({
-                'id': a.id, 
-                'fio': a.fio, 
-                'phone': a.phone, 
-                'status': a.get_status_display(),
-                'type': 'abiturient'
-            })
-        dogs = Dogovor.objects.filter(Q(number__icontains=q) | Q(abiturient__fio__icontains=q))[:5]
-        for d in dogs:
-            results.append({
-                'id': d.id, 
-                'number': d.number, 
-                'abiturient_fio': d.abiturient.fio if d.abiturient else '', 
-                'type': 'dogovor'
-            })
+    # Ищем абитуриентов и студентов (исключая отчисленных) и договоры
+    results = await asearch_all(q) if q else []
     return JsonResponse({'results': results})
 
 @login_required
-def search_students_legacy(request):
-    return search_students(request)
+@require_GET
+async def search_students_legacy(request):
+    """Подсказки для строки поиска на дашборде (кэш по префиксам, см. typeahead.py)."""
+    user = await request.auser()
+    if not user.is_staff:
+        return JsonResponse({'results': [], 'error': 'Forbidden'}, status=403)
+    return JsonResponse({'results': await typeahead.asearch(request.GET.get('q', ''))})
+
+# -----------------------------
+# Профилирование (см. profiling.py)
+# -----------------------------
+@login_required
+@user_passes_test(is_staff_check)
+def profiling_panel(request):
+    if request.method == 'POST':
+        profiling.store.clear()
+        return redirect('profiling_panel')
+    return render(request, 'main_app/profiling.html', {
+        'stats': profiling.store.summary(),
+        'sample_rate': profiling.sample_rate(),
+        'window': profiling.window_size(),
+    })
+
+@login_required
+@require_GET
+def profiling_json(request):
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    return JsonResponse({
+        'sample_rate': profiling.sample_rate(),
+        'window': profiling.window_size(),
+        'views': profiling.store.summary(),
+    })
 
 # -----------------------------
 # Autocomplete (DAL) - Только для персонала
 # -----------------------------
 class AbiturientAutocomplete(LoginRequiredMixin, StaffRequiredMixin, Select2QuerySetView):
     def get_queryset(self):
-        qs = Abiturient.objects.all().order_by('fio') 
-        if self.q: 
-            qs = qs.filter(fio__icontains=self.q)
-        return qs
+        return autocomplete.search('abiturient', self.q)
 
 class RoditelAutocomplete(LoginRequiredMixin, StaffRequiredMixin, Select2QuerySetView):
     def get_queryset(self):
-        qs = Roditel.objects.all()
         forwarded = self.forwarded.get('abiturient', None)
+        pks = None
         if forwarded: 
-            qs = qs.filter(abiturientroditel__abiturient_id=forwarded)
-        if self.q: 
-            qs = qs.filter(fio__icontains=self.q)
-        return qs
+            pks = set(AbiturientRoditel.objects.filter(abiturient_id=forwarded).values_list('roditel_id', flat=True))
+        return autocomplete.search('roditel', self.q, pks)
 
 class SpecialnostAutocomplete(LoginRequiredMixin, StaffRequiredMixin, Select2QuerySetView):
     def get_queryset(self):
-        qs = Specialnost.objects.all()
-        if self.q: 
-            qs = qs.filter(Q(name__icontains=self.q) | Q(code__icontains=self.q))
-        return qs
+        return autocomplete.search('specialnost', self.q)
 
 # -----------------------------
 # AJAX-инфо (Только для персонала)
 # -----------------------------
 @login_required
 @require_GET
-def get_parents_by_abiturient_ajax(request, abiturient_id):
-    if not request.user.is_staff: 
+async def get_parents_by_abiturient_ajax(request, abiturient_id):
+    user = await request.auser()
+    if not user.is_staff: 
         return JsonResponse({'parents': []}, status=403)
     relations = AbiturientRoditel.objects.filter(abiturient_id=abiturient_id).select_related('roditel')
-    parents = [{'id': r.roditel.id, 'fio': r.roditel.fio} for r in relations]
+    parents = [{'id': r.roditel.id, 'fio': r.roditel.fio} async for r in relations]
     return JsonResponse({'parents': parents})
 
 @login_required
-def get_abit_info_ajax(request, abit_id):
-    if not request.user.is_staff: 
+async def get_abit_info_ajax(request, abit_id):
+    user = await request.auser()
+    if not user.is_staff: 
         return JsonResponse({'error': 'Forbidden'}, status=403)
-    abit = get_object_or_404(Abiturient, pk=abit_id)
+    abit = await aget_object_or_404(Abiturient.objects.select_related('specialnost'), pk=abit_id)
     spec_code = abit.specialnost.code if abit.specialnost and abit.specialnost.code else "00"
     return JsonResponse({
         'spec_code': spec_code,
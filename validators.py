@@ -1,15 +1,136 @@
 import os
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+VALID_EXTENSIONS = ['.pdf', '.doc', '.docx', '.jpg', '.png', '.jpeg']
+MAX_FILE_SIZE = 5 * 1024 * 1024
+
+# Сигнатуры начала файла для каждого расширения (docx — это zip, doc — контейнер OLE2)
+SIGNATURES = {
+    '.pdf': (b'%PDF-',),
+    '.jpg': (b'\xff\xd8\xff',),
+    '.jpeg': (b'\xff\xd8\xff',),
+    '.png': (b'\x89PNG\r\n\x1a\n',),
+    '.docx': (b'PK\x03\x04',),
+    '.doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+}
+SNIFF_SIZE = 16
+
+EXTENSION_ERROR = f'❌ Недопустимый тип файла. Разрешены только: {", ".join(VALID_EXTENSIONS)}'
+SIZE_ERROR = '❌ Файл слишком большой. Максимальный размер — 5 МБ.'
+
+def upload_error(value):
+    """Причина, по которой UploadLimitHandler отбросил файл при загрузке (или None)"""
+    return getattr(value, 'upload_error', None) or getattr(getattr(value, 'file', None), 'upload_error', None)
 
 def validate_file_extension(value):
     """Проверяет, что расширение файла входит в список разрешенных"""
-    ext = os.path.splitext(value.name)[1]  
-    valid_extensions = ['.pdf', '.doc', '.docx', '.jpg', '.png', '.jpeg']
-    if not ext.lower() in valid_extensions:
-        raise ValidationError(f'❌ Недопустимый тип файла. Разрешены только: {", ".join(valid_extensions)}')
+    if upload_error(value):
+        return  # ошибку покажет validate_file_content
+    ext = os.path.splitext(value.name)[1]
+    if not ext.lower() in VALID_EXTENSIONS:
+        raise ValidationError(EXTENSION_ERROR)
 
 def validate_file_size(value):
     """Ограничивает размер файла до 5 МБ"""
-    limit = 5 * 1024 * 1024 
-    if value.size > limit:
-        raise ValidationError('❌ Файл слишком большой. Максимальный размер — 5 МБ.')
\ No newline at end of file
+    if upload_error(value):
+        return
+    if value.size > MAX_FILE_SIZE:
+        raise ValidationError(SIZE_ERROR)
+
+def content_error(name, head):
+    """Текст ошибки, если начало файла не соответствует расширению, иначе None"""
+    ext = os.path.splitext(name)[1].lower()
+    signatures = SIGNATURES.get(ext)
+    if signatures and not head.startswith(signatures):
+        return f'❌ Содержимое файла не похоже на {ext[1:].upper()}. Загрузите настоящий файл этого типа.'
+    return None
+
+def validate_file_content(value):
+    """Проверяет настоящий тип файла по первым байтам (читается только начало)"""
+    error = upload_error(value)
+    if error:
+        raise ValidationError(error)
+    if getattr(value, '_committed', False):
+        return  # уже сохраненный файл не перепроверяем
+    position = value.tell() if hasattr(value, 'tell') else 0
+    value.seek(0)
+    head = value.read(SNIFF_SIZE)
+    value.seek(position)
+    error = content_error(value.name, head)
+    if error:
+        raise ValidationError(error)
+
+
+class RejectedUpload(UploadedFile):
+    """Файл, отброшенный UploadLimitHandler во время загрузки: данных нет, только причина."""
+
+    def __init__(self, name, content_type, size, upload_error):
+        super().__init__(None, name, content_type, size)
+        self.upload_error = upload_error
+
+    def open(self, mode=None):
+        raise ValueError(self.upload_error)
+
+    def chunks(self, chunk_size=None):
+        raise ValueError(self.upload_error)
+
+    def read(self, *args, **kwargs):
+        return b''
+
+    def seek(self, *args, **kwargs):
+        return 0
+
+    def tell(self):
+        return 0
+
+    def close(self):
+        pass
+
+
+class UploadLimitHandler(FileUploadHandler):
+    """
+    Первый обработчик загрузок (FILE_UPLOAD_HANDLERS): для полей сканов
+    (UPLOAD_LIMITED_FIELDS) проверяет расширение, сигнатуру первого куска и
+    размер прямо по ходу приема тела запроса. Как только файл превысил
+    MAX_FILE_SIZE или оказался не тем, за что себя выдает, остаток перестает
+    попадать в память и во временный файл, а в форму приходит RejectedUpload
+    с текстом ошибки (его покажет validate_file_content).
+    """
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        fields = getattr(settings, 'UPLOAD_LIMITED_FIELDS', ['scan'])
+        self.active = field_name.rsplit('-', 1)[-1] in fields
+        self.received = 0
+        self.head = b''
+        self.error = None
+        if self.active and os.path.splitext(file_name)[1].lower() not in VALID_EXTENSIONS:
+            self.error = EXTENSION_ERROR
+        elif self.active and content_length and content_length > MAX_FILE_SIZE:
+            self.error = SIZE_ERROR
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        self.received += len(raw_data)
+        if self.error:
+            return None
+        if len(self.head) < SNIFF_SIZE:
+            self.head += raw_data[:SNIFF_SIZE - len(self.head)]
+            if len(self.head) >= SNIFF_SIZE:
+                self.error = content_error(self.file_name, self.head)
+        if not self.error and self.received > MAX_FILE_SIZE:
+            self.error = SIZE_ERROR
+        return None if self.error else raw_data
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        if not self.error and len(self.head) < SNIFF_SIZE:
+            self.error = content_error(self.file_name, self.head)  # файл короче SNIFF_SIZE
+        if self.error:
+            return RejectedUpload(self.file_name, self.content_type, self.received, self.error)
+        return None